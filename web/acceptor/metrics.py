@@ -0,0 +1,233 @@
+"""
+Per-view requests instrumentation, that is exposed in the Prometheus text format.
+
+`MetricsMiddleware` records latency, database queries amount and time and response size of every request
+by the view class or function name. Metrics are kept in memory per process, so every worker process
+is scraped separately, e.g. with the gunicorn `--workers 1` or by the worker port.
+"""
+
+from bisect import bisect_left
+from collections import OrderedDict
+import threading
+from timeit import default_timer
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse, HttpResponseForbidden
+
+from olga.analytics.cache import installation_cache
+
+# Histogram name to its help text and upper bounds of the buckets.
+HISTOGRAMS = OrderedDict([
+    ('olga_request_duration_seconds', (
+        'Request latency in seconds.', (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    )),
+    ('olga_request_db_queries', (
+        'Database queries per request.', (0, 1, 2, 5, 10, 20, 50, 100, 200),
+    )),
+    ('olga_request_db_duration_seconds', (
+        'Database queries time per request in seconds.', (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+    )),
+    ('olga_response_size_bytes', (
+        'Response body size in bytes.', (100, 1000, 10000, 100000, 1000000, 10000000),
+    )),
+])
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    """
+    Cumulative histogram of the observed values with the fixed buckets.
+    """
+
+    def __init__(self, buckets):
+        """
+        Initialize an empty histogram with the upper bounds of the buckets, the last infinite one is implied.
+        """
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        """
+        Count the value in the first bucket, that it fits.
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def get_samples(self):
+        """
+        Provide the cumulative counts of the buckets, the infinite one included, by their upper bounds.
+        """
+        count = 0
+
+        for bound, bucket_count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            count += bucket_count
+            yield bound, count
+
+
+class MetricsRegistry:
+    """
+    Thread safe storage of the requests metrics by the view.
+    """
+
+    def __init__(self):
+        """
+        Initialize empty metrics.
+        """
+        self.lock = threading.Lock()
+        self.requests = {}
+        self.histograms = {name: {} for name in HISTOGRAMS}
+
+    def observe(self, view, method, status, values):
+        """
+        Record the request.
+
+        :param values: histogram name to the request value, e.g. its duration.
+        """
+        with self.lock:
+            key = view, method, str(status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+
+            for name, value in values.items():
+                histograms = self.histograms[name]
+
+                if view not in histograms:
+                    histograms[view] = Histogram(HISTOGRAMS[name][1])
+
+                histograms[view].observe(value)
+
+    def clear(self):
+        """
+        Remove all the recorded metrics.
+        """
+        with self.lock:
+            self.requests.clear()
+
+            for histograms in self.histograms.values():
+                histograms.clear()
+
+    def render(self):
+        """
+        Provide the metrics and the installation cache counters in the Prometheus text format.
+        """
+        lines = [
+            '# HELP olga_requests_total Requests by view, method and response status.',
+            '# TYPE olga_requests_total counter',
+        ]
+
+        with self.lock:
+            for (view, method, status), count in sorted(self.requests.items()):
+                lines.append('olga_requests_total{{view="{}",method="{}",status="{}"}} {}'.format(
+                    view, method, status, count
+                ))
+
+            for name, (help_text, _) in HISTOGRAMS.items():
+                lines.extend(['# HELP {} {}'.format(name, help_text), '# TYPE {} histogram'.format(name)])
+
+                for view, histogram in sorted(self.histograms[name].items()):
+                    for bound, count in histogram.get_samples():
+                        lines.append('{}_bucket{{view="{}",le="{}"}} {}'.format(name, view, bound, count))
+
+                    lines.append('{}_sum{{view="{}"}} {}'.format(name, view, histogram.sum))
+                    lines.append('{}_count{{view="{}"}} {}'.format(name, view, sum(histogram.counts)))
+
+        cache_stats = installation_cache.stats()
+        lines.extend([
+            '# HELP olga_installation_cache_hits_total Access tokens found in the installation cache.',
+            '# TYPE olga_installation_cache_hits_total counter',
+            'olga_installation_cache_hits_total {}'.format(cache_stats['hits']),
+            '# HELP olga_installation_cache_misses_total Access tokens queried from the database.',
+            '# TYPE olga_installation_cache_misses_total counter',
+            'olga_installation_cache_misses_total {}'.format(cache_stats['misses']),
+            '# HELP olga_installation_cache_size Installations kept by the installation cache.',
+            '# TYPE olga_installation_cache_size gauge',
+            'olga_installation_cache_size {}'.format(cache_stats['size']),
+        ])
+
+        return '\n'.join(lines) + '\n'
+
+
+metrics_registry = MetricsRegistry()  # pylint: disable=invalid-name
+
+
+class QueriesTimer:  # pylint: disable=too-few-public-methods
+    """
+    Database execute wrapper, that counts the queries and their time.
+    """
+
+    def __init__(self):
+        """
+        Initialize zero counters.
+        """
+        self.amount = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):  # pylint: disable=too-many-arguments
+        """
+        Execute the query and count its time.
+        """
+        start = default_timer()
+
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.amount += 1
+            self.duration += default_timer() - start
+
+
+class MetricsMiddleware:
+    """
+    Record latency, database queries and response size of the requests by the view.
+
+    Should be the first middleware, so the other middlewares are measured as well.
+    """
+
+    def __init__(self, get_response):
+        """
+        Initialize the middleware.
+        """
+        self.get_response = get_response
+
+    def __call__(self, request):
+        """
+        Measure the request processing.
+        """
+        queries_timer = QueriesTimer()
+        start = default_timer()
+
+        with connection.execute_wrapper(queries_timer):
+            response = self.get_response(request)
+
+        values = {
+            'olga_request_duration_seconds': default_timer() - start,
+            'olga_request_db_queries': queries_timer.amount,
+            'olga_request_db_duration_seconds': queries_timer.duration,
+        }
+
+        if not response.streaming:
+            values['olga_response_size_bytes'] = len(response.content)
+
+        metrics_registry.observe(
+            getattr(request, 'metrics_view', 'unresolved'), request.method, response.status_code, values
+        )
+
+        return response
+
+    @staticmethod
+    def process_view(request, view_func, view_args, view_kwargs):  # pylint: disable=unused-argument
+        """
+        Remember the name of the view class or function the request is resolved to.
+        """
+        request.metrics_view = getattr(view_func, 'view_class', view_func).__name__
+
+
+def metrics_view(request):
+    """
+    Provide the process metrics in the Prometheus text format to the allowed addresses.
+    """
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_ADDRESSES:
+        return HttpResponseForbidden()
+
+    return HttpResponse(metrics_registry.render(), content_type=CONTENT_TYPE)
@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'acceptor.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,11 +85,31 @@ DATABASES = {
         'USER': os.environ.get('POSTGRES_USER', 'postgres'),
         'HOST': os.environ.get('POSTGRES_HOST', 'postgres'),
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'password'),
-        'PORT': 5432,
+        'PORT': int(os.environ.get('POSTGRES_PORT', 5432)),
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/2.1/topics/cache/
+# Charts contexts are cached per process by default, they are recomputed once per statistics generation, that is
+# kept in the database. Use a shared backend, e.g. memcached, for several processes to compute them only once.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Seconds to serve the cached charts, if the statistics are not changed, and to wait for their recomputation.
+CHARTS_CACHE_MAX_AGE = int(os.environ.get('CHARTS_CACHE_MAX_AGE', 3600))
+CHARTS_CACHE_LOCK_TIMEOUT = int(os.environ.get('CHARTS_CACHE_LOCK_TIMEOUT', 60))
+
+# Amount of the last days, that graphs show by default.
+CHARTS_DEFAULT_DAYS = int(os.environ.get('CHARTS_DEFAULT_DAYS', 90))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/1.10/ref/settings/#auth-password-validators
 
@@ -122,6 +143,93 @@ USE_L10N = True
 USE_TZ = True
 
 
+# Statistics ingestion
+
+# Accept received statistics with status 202 and store them for the `process_statistics_queue` command
+# instead of processing them within the request.
+STATISTICS_ASYNC_INGESTION = os.environ.get('STATISTICS_ASYNC_INGESTION', '').lower() in ('1', 'true', 'yes')
+
+# Amount of failed attempts after which a queued statistics report is no longer processed.
+STATISTICS_QUEUE_MAX_ATTEMPTS = int(os.environ.get('STATISTICS_QUEUE_MAX_ATTEMPTS', 5))
+
+# Maximal amount of the statistics reports received by a single batch request.
+STATISTICS_BATCH_MAX_REPORTS = int(os.environ.get('STATISTICS_BATCH_MAX_REPORTS', 100))
+
+# Amount of the next months, that the `manage_partitions` command creates statistics table partitions for.
+STATISTICS_PARTITIONS_AHEAD = int(os.environ.get('STATISTICS_PARTITIONS_AHEAD', 3))
+
+# Amount of the months, that installation statistics are kept for before the `downsample_statistics` command
+# summarizes them per installation and month.
+STATISTICS_RETENTION_MONTHS = int(os.environ.get('STATISTICS_RETENTION_MONTHS', 24))
+
+
+# Maximal amount of the installations and seconds to keep them in the per process access token cache.
+INSTALLATION_CACHE_MAX_SIZE = int(os.environ.get('INSTALLATION_CACHE_MAX_SIZE', 10000))
+INSTALLATION_CACHE_TIMEOUT = int(os.environ.get('INSTALLATION_CACHE_TIMEOUT', 300))
+
+
+# Remote addresses, that are allowed to scrape the per process requests metrics from `/metrics`.
+METRICS_ALLOWED_ADDRESSES = os.environ.get('METRICS_ALLOWED_ADDRESSES', '127.0.0.1,::1').split(',')
+
+
+# Logging
+
+# Level of the application loggers, e.g. `DEBUG` to log the registrations, authorizations and received statistics.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+
+# Share of the received statistics requests, that are logged with the debug level.
+STATISTICS_LOG_SAMPLE_RATE = float(os.environ.get('STATISTICS_LOG_SAMPLE_RATE', 1))
+
+# Received statistics fields, that are logged, the access token and the long histories are omitted by default.
+STATISTICS_LOG_FIELDS = os.environ.get(
+    'STATISTICS_LOG_FIELDS',
+    'statistics_level,courses_amount,active_students_amount_day,active_students_amount_week,'
+    'active_students_amount_month,platform_name,platform_url'
+).split(',')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {
+            'format': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'simple',
+        },
+    },
+    'loggers': {
+        'olga': {
+            'handlers': ['console'],
+            'level': LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
+
+
+# Geocoding of the platform city names
+
+# Seconds to wait for the Nominatim service connection and response.
+GEOCODING_TIMEOUT = float(os.environ.get('GEOCODING_TIMEOUT', 5))
+
+# Minimal seconds between requests of the `resolve_coordinates` command, Nominatim allows one request per second.
+GEOCODING_REQUEST_INTERVAL = float(os.environ.get('GEOCODING_REQUEST_INTERVAL', 1))
+
+# Amount of failed geocoding attempts after which coordinates of an installation are no longer resolved.
+GEOCODING_MAX_ATTEMPTS = int(os.environ.get('GEOCODING_MAX_ATTEMPTS', 5))
+
+# Days to keep found and not found city coordinates in the cache.
+GEOCODING_CACHE_TTL_DAYS = int(os.environ.get('GEOCODING_CACHE_TTL_DAYS', 90))
+GEOCODING_NEGATIVE_CACHE_TTL_DAYS = int(os.environ.get('GEOCODING_NEGATIVE_CACHE_TTL_DAYS', 1))
+
+# Optional offline gazetteer CSV file with `city_name,latitude,longitude` rows, that is looked up before the service.
+GEOCODING_GAZETTEER_PATH = os.environ.get('GEOCODING_GAZETTEER_PATH')
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/1.10/howto/static-files/
 
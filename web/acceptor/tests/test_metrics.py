@@ -0,0 +1,68 @@
+"""
+Tests for the requests metrics.
+"""
+
+from django.test import TestCase
+
+from acceptor.metrics import Histogram, metrics_registry
+from olga.analytics.tests.factories import EdxInstallationFactory
+
+# pylint: disable=invalid-name
+
+
+class TestHistogram(TestCase):
+    """
+    Tests for the histogram buckets.
+    """
+
+    def test_samples_are_cumulative(self):
+        """
+        Verify that values are counted in the fitting buckets and the samples are cumulative.
+        """
+        histogram = Histogram((1, 10))
+
+        for value in (0.5, 1, 5, 20):
+            histogram.observe(value)
+
+        self.assertEqual([(1, 2), (10, 3), ('+Inf', 4)], list(histogram.get_samples()))
+        self.assertEqual(26.5, histogram.sum)
+
+
+class TestMetricsMiddleware(TestCase):
+    """
+    Tests for the requests metrics middleware and endpoint.
+    """
+
+    def setUp(self):
+        """
+        Clear the metrics of the previous tests.
+        """
+        metrics_registry.clear()
+
+    def test_requests_are_measured_by_view(self):
+        """
+        Verify that requests, their database queries and response size are recorded by the view.
+        """
+        access_token = EdxInstallationFactory().access_token
+
+        self.client.post('/api/token/authorization/', data={'access_token': access_token})
+        self.client.post('/api/token/authorization/', data={'access_token': 'unknown'})
+        metrics = self.client.get('/metrics').content.decode()
+
+        self.assertIn(
+            'olga_requests_total{view="AccessTokenAuthorization",method="POST",status="200"} 1\n', metrics
+        )
+        self.assertIn(
+            'olga_requests_total{view="AccessTokenAuthorization",method="POST",status="401"} 1\n', metrics
+        )
+        self.assertIn('olga_request_duration_seconds_count{view="AccessTokenAuthorization"} 2\n', metrics)
+        self.assertIn('olga_request_db_queries_bucket{view="AccessTokenAuthorization",le="0"} 1\n', metrics)
+        self.assertIn('olga_request_db_queries_bucket{view="AccessTokenAuthorization",le="1"} 2\n', metrics)
+        self.assertIn('olga_response_size_bytes_sum{view="AccessTokenAuthorization"} 0\n', metrics)
+        self.assertIn('olga_installation_cache_size ', metrics)
+
+    def test_metrics_are_not_exposed_to_remote_addresses(self):
+        """
+        Verify that metrics are provided only to the allowed addresses.
+        """
+        self.assertEqual(403, self.client.get('/metrics', REMOTE_ADDR='10.0.0.1').status_code)
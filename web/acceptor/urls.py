@@ -5,8 +5,11 @@ Acceptor URL Configuration.
 from django.conf.urls import include, url
 from django.contrib import admin
 
+from acceptor.metrics import metrics_view
+
 urlpatterns = [  # pylint: disable=invalid-name
     url(r'^admin/', admin.site.urls),
+    url(r'^metrics$', metrics_view, name='metrics'),
     url(r'^', include('olga.charts.urls')),
     url(r'^', include('olga.analytics.urls')),
 ]
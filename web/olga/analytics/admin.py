@@ -18,6 +18,8 @@ class EdxInstallationAdmin(admin.ModelAdmin):
         'longitude',
         'platform_url',
         'platform_name',
+        'platform_city_name',
+        'coordinates_pending',
     ]
 
 
@@ -13,3 +13,18 @@ class AnalyticsConfig(AppConfig):
     """
 
     name = 'olga.analytics'
+
+    def ready(self):
+        """
+        Connect the installation cache invalidation signals.
+        """
+        # Models can't be imported until the application registry is ready,
+        # bad-option-value is disabled for pylint versions without the import-outside-toplevel check.
+        # pylint: disable=bad-option-value, import-outside-toplevel
+        from django.db.models.signals import post_delete, post_save
+
+        from olga.analytics.cache import invalidate_installation_cache
+        from olga.analytics.models import EdxInstallation
+
+        post_save.connect(invalidate_installation_cache, sender=EdxInstallation)
+        post_delete.connect(invalidate_installation_cache, sender=EdxInstallation)
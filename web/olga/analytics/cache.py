@@ -0,0 +1,193 @@
+"""
+In-process caches and the statistics data generation for the analytics application.
+"""
+
+from collections import OrderedDict
+import copy
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db import connection
+
+from olga.analytics.models import EdxInstallation
+
+# Sequence, that is kept in the database, so all the processes see the same generation and it survives restarts.
+STATISTICS_GENERATION_SEQUENCE = 'analytics_statistics_generation'
+
+
+class InstallationCache:
+    """
+    Least recently used cache of the installations by their access tokens, which entries expire after a timeout.
+
+    Cache is kept per process, so it is invalidated by the installation changes made within the same process
+    and by the timeout for the changes made by the other processes.
+    """
+
+    def __init__(self, max_size, timeout):
+        """
+        Initialize an empty cache.
+
+        :param max_size: maximal amount of the cached installations.
+        :param timeout: seconds to keep the cached installation.
+        """
+        self.max_size = max_size
+        self.timeout = timeout
+        self.hits = self.misses = 0
+        self.installations = OrderedDict()
+        self.keys_by_id = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_key(access_token):
+        """
+        Provide the cache key for the access token, that may be received in any UUID string form.
+
+        :return: canonical access token string or None if the access token is not a valid UUID.
+        """
+        try:
+            return str(uuid.UUID(str(access_token)))
+        except ValueError:
+            return None
+
+    def get(self, access_token):
+        """
+        Provide the installation by the access token, querying the database only if it is not cached.
+
+        :return: copy of the installation, so the cached one is not changed by the callers, or None if
+            there is no installation with the access token.
+        """
+        key = self.get_key(access_token)
+
+        if key is None:
+            return None
+
+        with self.lock:
+            cached = self.installations.get(key)
+
+            if cached is not None and cached[1] > time.monotonic():
+                self.installations.move_to_end(key)
+                self.hits += 1
+                return copy.copy(cached[0])
+
+            self.misses += 1
+
+        try:
+            installation = EdxInstallation.objects.get(access_token=key)
+        except EdxInstallation.DoesNotExist:
+            return None
+
+        with self.lock:
+            self.store(key, installation)
+
+        return copy.copy(installation)
+
+    def get_many(self, access_tokens):
+        """
+        Provide the installations by the access tokens, querying all the not cached ones in a single query.
+
+        :return: dictionary of the canonical access tokens and the copies of the found installations.
+        """
+        keys = set(key for key in map(self.get_key, access_tokens) if key is not None)
+        installations = {}
+
+        with self.lock:
+            for key in keys:
+                cached = self.installations.get(key)
+
+                if cached is not None and cached[1] > time.monotonic():
+                    self.installations.move_to_end(key)
+                    installations[key] = copy.copy(cached[0])
+
+            self.hits += len(installations)
+            self.misses += len(keys) - len(installations)
+
+        not_cached_keys = keys.difference(installations)
+
+        if not not_cached_keys:
+            return installations
+
+        found_installations = list(EdxInstallation.objects.filter(access_token__in=not_cached_keys))
+
+        with self.lock:
+            for installation in found_installations:
+                key = str(installation.access_token)
+                self.store(key, installation)
+                installations[key] = copy.copy(installation)
+
+        return installations
+
+    def store(self, key, installation):
+        """
+        Cache the installation by the key, evicting the least recently used installations, should be called locked.
+        """
+        self.installations[key] = installation, time.monotonic() + self.timeout
+        self.installations.move_to_end(key)
+        self.keys_by_id[installation.pk] = key
+
+        while len(self.installations) > self.max_size:
+            _, (evicted_installation, __) = self.installations.popitem(last=False)
+            self.keys_by_id.pop(evicted_installation.pk, None)
+
+    def invalidate(self, installation_id):
+        """
+        Remove the installation from the cache, the previous access token of the changed installation is unknown.
+        """
+        with self.lock:
+            key = self.keys_by_id.pop(installation_id, None)
+
+            if key is not None:
+                self.installations.pop(key, None)
+
+    def clear(self):
+        """
+        Remove all the installations from the cache and reset the counters.
+        """
+        with self.lock:
+            self.installations.clear()
+            self.keys_by_id.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """
+        Provide the cache hits and misses counters and the amount of the cached installations.
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self.installations)}
+
+
+installation_cache = InstallationCache(  # pylint: disable=invalid-name
+    settings.INSTALLATION_CACHE_MAX_SIZE, settings.INSTALLATION_CACHE_TIMEOUT
+)
+
+
+def invalidate_installation_cache(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Remove the changed or deleted installation from the cache, e.g. after the admin edits.
+    """
+    installation_cache.invalidate(instance.pk)
+
+
+def get_statistics_generation():
+    """
+    Provide the statistics data generation, that is changed every time new statistics are saved.
+
+    Generation is kept in the database, so responses computed from the statistics can be cached by it
+    in any process and their ETags are the same for all the processes.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT last_value, is_called FROM {}'.format(STATISTICS_GENERATION_SEQUENCE))
+        last_value, is_called = cursor.fetchone()
+
+    return last_value if is_called else 0
+
+
+def bump_statistics_generation():
+    """
+    Change the statistics data generation after new statistics are saved.
+
+    Sequence is changed outside of the transactions, so it should be bumped after the statistics are committed.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT nextval('{}')".format(STATISTICS_GENERATION_SEQUENCE))
@@ -0,0 +1,23 @@
+"""
+Compact countries table, that is shipped with the application and is used instead of the pycountry databases.
+"""
+
+from functools import lru_cache
+import json
+import os
+
+# Compact alpha-2 country code to the alpha-3 code and name table, that is generated from the pycountry databases.
+COUNTRIES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'countries.json')
+
+
+@lru_cache(maxsize=None)
+def get_countries():
+    """
+    Get the alpha-2 country code to the alpha-3 code and name accordance, that is loaded once per process.
+
+    Countries are loaded on the first use from the compact table shipped with the application instead of
+    the pycountry databases, so processes, that only receive statistics, do not keep them in memory.
+    The table is updated with `python manage.py update_countries`.
+    """
+    with open(COUNTRIES_PATH, encoding='utf-8') as countries_file:
+        return {alpha_2: tuple(country) for alpha_2, country in json.load(countries_file).items()}
@@ -1,145 +1,272 @@
 """
-Utilities, that create test data for charts and map.
-They create fixtures in `olga/analytics/test_fixture.json` file.
+Synthetic statistics of the edX installations for the load tests and the charts development.
 
-Fixtures have few problems:
-    - have same data for courses and students.
-      If we go ahead and bound all the charts in one, Developer will no see courses or students chart's line.
-      First overlaps second.
-    - many pylint and flake8 issues.
+`LoadTestModel` describes small, middle and large installation clusters. Every installation joins at a random day
+of the history and grows from the cluster minimums to its own maximums, sending statistics almost every day.
 
-So it needs to be rewritten.
-
-How to:
-    - from `olga/analytics` folder run `python create_test_fixture.py`.
-    - from root folder (contains `local-compose.yml` file) run `docker-compose -f local-compose.yml run olga python \
-                                                                manage.py loaddata olga/analytics/test_fixture.json`
+Data is generated lazily, so it is streamed to the database with `COPY` by the `generate_statistics` command
+or sent to a running server by the `load_test` command without keeping it in memory.
 """
 
-import datetime
+from collections import OrderedDict
+import csv
+from datetime import timedelta
 import json
+import random
 import uuid
-from random import random
-
-# pylint: disable-all
-# flake8: noqa
-
-
-class LoadTestModel(object):
-    """
-    Model that describes test data
-
-    end_date is always today.
-    """
-
-    # clusters of instances
-    clusters = {
-        "small": {
-            'courses': (1, 10),
-            'students': (1, 1000),
-            'quantity': (1, 100),
-        },
-        "middle": {
-            'courses': (10, 50),  # min / max
-            'students': (500, 2500),
-            'quantity': 10,
-        },
-        "large": {
-            'courses': (50, 150),
-            'students': (2500, 10000),
-            'quantity': (1, 100),
-        },
-    }
-
-    # history of data
-    days = 600
-
-    # probability to send data per day per instance
-    send_data = 0.95
-
-    @classmethod
-    def probability_to_add_course(cls):
-        return probability(
-            0.5 * (cls.clusters['middle']['courses'][0] + cls.clusters['middle']['courses'][1])/cls.days
-        )
-
-    @classmethod
-    def probability_to_add_student(cls):
-        return probability(
-            0.5 * (cls.clusters['middle']['students'][0] + cls.clusters['middle']['students'][1])/cls.days
-        )
 
+from django.utils import timezone
 
-def probability(x):
-    return random() < x
+from olga.analytics.models import get_day_start
 
+INSTALLATION_COLUMNS = (
+    'id', 'access_token', 'platform_name', 'platform_url', 'latitude', 'longitude', 'coordinates_pending',
+    'coordinates_attempts',
+)
 
-def generate_model():
+STATISTICS_COLUMNS = (
+    'edx_installation_id', 'data_created_datetime', 'statistics_level',
+    'active_students_amount_day', 'active_students_amount_week', 'active_students_amount_month', 'courses_amount',
+    'registered_students', 'enthusiastic_students', 'generated_certificates',
+    'students_per_country',
+)
 
-    cl = LoadTestModel()
-    # for middle cluster
 
-    instance_list = []
-    number_of_instances = cl.clusters['middle']['quantity']
-
-    instance_dict = {}
-    students_dict = {}
-
-    for instance_num in range(number_of_instances):
-        for day in range(cl.days):
-            if probability(cl.send_data):
-                end_date = datetime.datetime.today() + datetime.timedelta(days=31)
-                dt = (end_date - datetime.timedelta(days=cl.days - day)).strftime('%Y-%m-%dT%H:%M:%SZ')
-
-                if cl.probability_to_add_course:
-                    instance_dict[instance_num] = instance_dict.get(instance_num, 0) + 1
-                    students_dict[instance_num] = students_dict.get(instance_num, 0) + 25
-
-                courses = instance_dict.get(instance_num, 0)
-
-                if cl.probability_to_add_student:
-                    students_dict[instance_num] = students_dict.get(instance_num, 0) + 0
+class LoadTestModel:
+    """
+    Model that describes the edX installations and generates their statistics.
 
-                students = students_dict.get(instance_num, 0)
+    History ends on the previous calendar day, so it doesn't overlap with the statistics received today.
+    """
 
-                pk = instance_num * cl.days + day
+    # Cluster name to the courses and students ranges and the share of the installations accordance.
+    clusters = OrderedDict([
+        ('small', {'courses': (1, 10), 'students': (1, 1000), 'share': 0.7}),
+        ('middle', {'courses': (10, 50), 'students': (500, 2500), 'share': 0.25}),
+        ('large', {'courses': (50, 150), 'students': (2500, 10000), 'share': 0.05}),
+    ])
 
-                edx_installation = {
-                    "model": "analytics.edxinstallation",
-                    "pk": pk,
-                    "fields": {
-                        "access_token": uuid.uuid4().hex,
-                        "latitude": 1.0,
-                        "longitude": 1.0,
-                        "platform_name": "test",
-                        "platform_url": "test",
-                    }
-                }
+    # Students countries with their popularity weights, `null` is the students without country.
+    countries = OrderedDict([
+        ('US', 30), ('IN', 15), ('CN', 10), ('BR', 8), ('RU', 6), ('UA', 5), ('GB', 5), ('ES', 5), ('MX', 4),
+        ('CA', 4), ('DE', 3), ('FR', 3), ('null', 2),
+    ])
 
-                installation_statistics = {
-                    "model": "analytics.installationstatistics",
-                    "pk": pk,
-                    "fields": {
-                        "active_students_amount_day": students,
-                        "active_students_amount_week": 1000,
-                        "active_students_amount_month": 1000,
-                        "courses_amount": courses,
-                        "data_created_datetime": dt,
-                        "edx_installation": pk,
-                        "statistics_level": 1,
-                        "students_per_country": {"RU": 2632, "CA": 18543, "UA": 2011, "null": 1}
-                    }
-                }
+    # Probability to send statistics per day per installation.
+    send_data = 0.95
 
-                instance_list.append(installation_statistics)
-                instance_list.append(edx_installation)
+    # Probability of the installation to send the students per country and the platform details.
+    enthusiast = 0.8
+
+    def __init__(self, days=365, seed=None):
+        """
+        Initialize the model for the days of history.
+
+        :param days: amount of the history days.
+        :param seed: random generator seed, so the same data can be generated again.
+        """
+        self.days = days
+        self.random = random.Random(seed)
+        self.last_day = timezone.localdate() - timedelta(days=1)
+        self.first_day = self.last_day - timedelta(days=days - 1)
+
+    def get_installation(self, index):
+        """
+        Get the installation, that is described by its cluster, history and growth targets.
+        """
+        cluster_name = self.random.choices(
+            list(self.clusters), weights=[cluster['share'] for cluster in self.clusters.values()]
+        )[0]
+        cluster = self.clusters[cluster_name]
+        countries = self.random.sample(list(self.countries), self.random.randint(1, 5))
+
+        return {
+            'index': index,
+            'cluster': cluster_name,
+            'access_token': uuid.UUID(int=self.random.getrandbits(128), version=4),
+            'first_day': self.random.randrange(self.days),
+            'courses': (cluster['courses'][0], self.random.randint(*cluster['courses'])),
+            'students': (cluster['students'][0], self.random.randint(*cluster['students'])),
+            'statistics_level': 'enthusiast' if self.random.random() < self.enthusiast else 'paranoid',
+            'countries': {country: self.countries[country] for country in countries},
+            'latitude': round(self.random.uniform(-60, 70), 4),
+            'longitude': round(self.random.uniform(-180, 180), 4),
+        }
+
+    def get_statistics(self, installation, day):
+        """
+        Get the installation statistics for the history day or None, if the statistics aren't sent that day.
+
+        :param day: index of the history day, the first one is 0.
+        """
+        if day < installation['first_day'] or self.random.random() > self.send_data:
+            return None
+
+        return self.create_statistics(installation, day)
+
+    def create_statistics(self, installation, day):
+        """
+        Create the installation statistics for the history day, the installation is grown up to the day.
+        """
+        growth = min(1, max(1, day - installation['first_day'] + 1) / max(1, self.days - installation['first_day']))
+        courses = round(installation['courses'][0] + (installation['courses'][1] - installation['courses'][0]) * growth)
+        students = installation['students'][0] + (installation['students'][1] - installation['students'][0]) * growth
+        students_per_day = (installation['students'][1] - installation['students'][0]) / self.days
+
+        active_students_amount_month = int(students * self.random.uniform(0.3, 0.6))
+        active_students_amount_week = int(active_students_amount_month * self.random.uniform(0.4, 0.7))
+        active_students_amount_day = int(active_students_amount_week * self.random.uniform(0.2, 0.5))
+        registered_students = int(students_per_day * self.random.uniform(0.5, 1.5))
+
+        return {
+            'data_created_datetime': get_day_start(self.first_day + timedelta(days=day)),
+            'statistics_level': installation['statistics_level'],
+            'active_students_amount_day': active_students_amount_day,
+            'active_students_amount_week': active_students_amount_week,
+            'active_students_amount_month': active_students_amount_month,
+            'courses_amount': courses,
+            'registered_students': registered_students,
+            'enthusiastic_students': int(registered_students * self.random.uniform(0, 0.3)),
+            'generated_certificates': int(courses * self.random.uniform(0, 0.2)),
+            'students_per_country': (
+                self.get_students_per_country(installation, active_students_amount_day)
+                if installation['statistics_level'] == 'enthusiast' else None
+            ),
+        }
+
+    @staticmethod
+    def get_students_per_country(installation, students):
+        """
+        Split the students among the installation countries proportionally to the countries weights.
+        """
+        total_weight = sum(installation['countries'].values())
+        students_per_country = {
+            country: int(students * weight / total_weight) for country, weight in installation['countries'].items()
+        }
+        students_per_country['null'] = (
+            students_per_country.get('null', 0) + students - sum(students_per_country.values())
+        )
 
-    return json.dumps(instance_list)
+        return students_per_country
+
+    def get_payload(self, installation, access_token, day, history_days=1):
+        """
+        Get the statistics POST data of the history day, as the edX platform sends it.
+
+        :param history_days: amount of the previous days, which history values are sent along with the day ones.
+        """
+        history = [
+            self.create_statistics(installation, history_day) for history_day in range(max(0, day - history_days), day)
+        ]
+        statistics = self.create_statistics(installation, day)
+        history.append(statistics)
+
+        payload = {
+            'access_token': access_token,
+            'statistics_level': installation['statistics_level'],
+            'active_students_amount_day': statistics['active_students_amount_day'],
+            'active_students_amount_week': statistics['active_students_amount_week'],
+            'active_students_amount_month': statistics['active_students_amount_month'],
+            'courses_amount': statistics['courses_amount'],
+        }
+
+        for field in ('registered_students', 'enthusiastic_students', 'generated_certificates'):
+            payload[field] = json.dumps({
+                '{:%Y-%m-%d}'.format(history_statistics['data_created_datetime']): history_statistics[field]
+                for history_statistics in history
+            })
+
+        if installation['statistics_level'] == 'enthusiast':
+            payload.update({
+                'latitude': installation['latitude'],
+                'longitude': installation['longitude'],
+                'platform_name': 'Load test {}'.format(installation['index']),
+                'platform_url': 'https://load-test-{}.example.com'.format(installation['index']),
+                'platform_city_name': '',
+                'students_per_country': json.dumps(statistics['students_per_country']),
+            })
+
+        return payload
+
+    @staticmethod
+    def get_installation_row(installation, installation_id):
+        """
+        Get the installation row values in the `INSTALLATION_COLUMNS` order.
+        """
+        return (
+            installation_id,
+            installation['access_token'],
+            'Load test {}'.format(installation['index']),
+            'https://load-test-{}.example.com'.format(installation['index']),
+            installation['latitude'],
+            installation['longitude'],
+            False,
+            0,
+        )
 
+    def get_statistics_rows(self, installation, installation_id):
+        """
+        Get the installation statistics rows values in the `STATISTICS_COLUMNS` order for the whole history.
+        """
+        for day in range(installation['first_day'], self.days):
+            statistics = self.get_statistics(installation, day)
+
+            if statistics is None:
+                continue
+
+            yield (
+                installation_id,
+                statistics['data_created_datetime'].isoformat(),
+                statistics['statistics_level'],
+                statistics['active_students_amount_day'],
+                statistics['active_students_amount_week'],
+                statistics['active_students_amount_month'],
+                statistics['courses_amount'],
+                statistics['registered_students'],
+                statistics['enthusiastic_students'],
+                statistics['generated_certificates'],
+                None if statistics['students_per_country'] is None else json.dumps(statistics['students_per_country']),
+            )
+
+
+class CopyFile:
+    """
+    File-like object, that provides rows as CSV lines to the `COPY ... FROM STDIN` command while they are read.
 
-if __name__ == '__main__':
+    None values are written as empty unquoted values, that are NULL for the CSV format.
+    """
 
-    data = generate_model()
-    f = open('test_fixture.json', 'w')
-    f.write(data)
-    f.close()
+    def __init__(self, rows):
+        """
+        Initialize the file with the rows iterable.
+        """
+        self.rows = iter(rows)
+        self.writer = csv.writer(self, lineterminator='\n')
+        self.buffer = []
+        self.buffer_size = 0
+        self.rows_amount = 0
+
+    def write(self, line):
+        """
+        Buffer the line written by the CSV writer.
+        """
+        self.buffer.append(line)
+        self.buffer_size += len(line)
+
+    def read(self, size=-1):
+        """
+        Read the lines of the next rows, at least the given size if there are enough rows.
+        """
+        while size < 0 or self.buffer_size < size:
+            row = next(self.rows, None)
+
+            if row is None:
+                break
+
+            self.writer.writerow(row)
+            self.rows_amount += 1
+
+        data = ''.join(self.buffer)
+        self.buffer, self.buffer_size = [], 0
+
+        return data
@@ -16,7 +16,16 @@ class AccessTokenForm(forms.Form):
     access_token = forms.UUIDField()
 
 
-class EdxInstallationParanoidLevelForm(forms.ModelForm):
+class EdxInstallationForm(forms.ModelForm):
+    """
+    Validate received data of an already registered installation, so unique fields are not checked.
+    """
+
+    def validate_unique(self):
+        pass
+
+
+class EdxInstallationParanoidLevelForm(EdxInstallationForm):
     class Meta(object):
         model = EdxInstallation
         fields = [
@@ -24,7 +33,7 @@ class EdxInstallationParanoidLevelForm(forms.ModelForm):
         ]
 
 
-class EdxInstallationEnthusiastLevelForm(forms.ModelForm):
+class EdxInstallationEnthusiastLevelForm(EdxInstallationForm):
     class Meta(object):
         model = EdxInstallation
         fields = [
@@ -0,0 +1,252 @@
+"""
+Management command, that benchmarks statistics aggregations on a seeded dataset.
+
+The dataset is inserted inside a transaction, that is rolled back after the benchmark, so the command can be run
+against a development database without leaving any data behind.
+
+How to:
+    - `python manage.py benchmark_statistics` to run all the scenarios on a million statistics rows.
+    - `python manage.py benchmark_statistics overall_counts --installations 100 --days 100` to run a single one.
+"""
+
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+import json
+from timeit import default_timer
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.http import QueryDict
+from django.test.utils import CaptureQueriesContext
+
+from olga.analytics.create_test_fixture import LoadTestModel
+from olga.analytics.forms import (
+    EdxInstallationEnthusiastLevelForm,
+    EdxInstallationParanoidLevelForm,
+    InstallationStatisticsEnthusiastLevelForm,
+    InstallationStatisticsParanoidLevelForm,
+)
+from olga.analytics.models import (
+    DailyStatistics,
+    InstallationStatistics,
+    MonthlyCountryStatistics,
+    get_last_calendar_day,
+)
+from olga.analytics.schema import validate_statistics
+
+SEED_INSTALLATIONS_SQL = '''
+    INSERT INTO analytics_edxinstallation (
+        access_token, platform_name, platform_url, uid, coordinates_pending, coordinates_attempts
+    )
+    SELECT md5(random()::text || n::text)::uuid, 'benchmark', 'https://benchmark.example.com', NULL, FALSE, 0
+    FROM generate_series(1, %(installations)s) AS n
+    RETURNING id
+'''
+
+SEED_STATISTICS_SQL = '''
+    INSERT INTO analytics_installationstatistics (
+        active_students_amount_day, active_students_amount_week, active_students_amount_month,
+        registered_students, enthusiastic_students, generated_certificates, courses_amount,
+        data_created_datetime, edx_installation_id, statistics_level, students_per_country
+    )
+    SELECT
+        (random() * 1000)::int, (random() * 2000)::int, (random() * 3000)::int,
+        (random() * 10)::int, (random() * 10)::int, (random() * 5)::int, (random() * 50)::int,
+        %(first_day)s::date + day, installation.id, 'enthusiast',
+        '{"RU": 2632, "CA": 18543, "UA": 2011, "null": 1}'::jsonb
+    FROM analytics_edxinstallation AS installation
+    CROSS JOIN generate_series(0, %(days)s - 1) AS day
+    WHERE installation.id = ANY(%(installation_ids)s)
+'''
+
+# Amount of the validated payloads per payload validation run, a single validation is too fast to be timed.
+VALIDATED_PAYLOADS = 1000
+
+
+def legacy_overall_counts():
+    """
+    Calculate overall counts the way it was done before the single query aggregation, one query per counter.
+    """
+    start_of_day, end_of_day = get_last_calendar_day()
+
+    all_unique_instances = InstallationStatistics.objects.filter(
+        data_created_datetime__gte=start_of_day, data_created_datetime__lt=end_of_day
+    )
+
+    return {
+        'instances_count': all_unique_instances.count(),
+        'courses_count': all_unique_instances.aggregate(Sum('courses_amount'))['courses_amount__sum'],
+        'students_count': all_unique_instances.aggregate(
+            Sum('active_students_amount_day')
+        )['active_students_amount_day__sum'],
+        'generated_certificates_count': all_unique_instances.aggregate(
+            Sum('generated_certificates')
+        )['generated_certificates__sum'],
+        'registered_students_count': all_unique_instances.aggregate(
+            Sum('registered_students')
+        )['registered_students__sum'],
+    }
+
+
+def legacy_get_charts_data():
+    """
+    Provide charts data the way it was done before the grouped aggregation, instantiating every statistics row.
+    """
+    charts = dict()
+
+    for item in InstallationStatistics.objects.all():
+        charts[item.data_created_datetime.strftime('%y-%m-%d')] = [
+            item.registered_students,
+            item.generated_certificates,
+            item.enthusiastic_students
+        ]
+
+    return charts
+
+
+@lru_cache()
+def get_payload():
+    """
+    Provide the enthusiast statistics payload with a month of history, as the edX platform sends it.
+    """
+    model = LoadTestModel(days=30, seed=0)
+    installation = model.get_installation(0)
+    installation['statistics_level'] = 'enthusiast'
+    payload = QueryDict(mutable=True)
+    payload.update({
+        field: str(value) for field, value in model.get_payload(installation, str(uuid.uuid4()), 29, 29).items()
+    })
+
+    return payload
+
+
+def legacy_validate_payloads():
+    """
+    Validate payloads the way it was done before the schema, with the forms of both levels, and parse them again.
+    """
+    payload = get_payload()
+
+    for _ in range(VALIDATED_PAYLOADS):
+        paranoid_installation_form = EdxInstallationParanoidLevelForm(payload)
+        enthusiast_installation_form = EdxInstallationEnthusiastLevelForm(payload)
+        paranoid_statistics_form = InstallationStatisticsParanoidLevelForm(payload)
+        enthusiast_statistics_form = InstallationStatisticsEnthusiastLevelForm(payload)
+
+        level_valid_forms = {
+            'paranoid': paranoid_installation_form.is_valid() and paranoid_statistics_form.is_valid(),
+            'enthusiast': enthusiast_installation_form.is_valid() and enthusiast_statistics_form.is_valid(),
+        }
+
+        if not level_valid_forms[payload['statistics_level']]:
+            raise ValueError('Benchmark payload is not valid.')
+
+        int(payload['active_students_amount_day'])
+        int(payload['active_students_amount_week'])
+        int(payload['active_students_amount_month'])
+        int(payload['courses_amount'])
+        json.loads(payload['students_per_country'])
+
+        for field in ('registered_students', 'enthusiastic_students', 'generated_certificates'):
+            for str_date in json.loads(payload[field]):
+                datetime.strptime(str_date, '%Y-%m-%d')
+
+
+def validate_payloads():
+    """
+    Validate payloads with the schema, that provides the typed values at once.
+    """
+    payload = get_payload()
+
+    for _ in range(VALIDATED_PAYLOADS):
+        validate_statistics(payload)
+
+
+class Command(BaseCommand):
+    """
+    Benchmark statistics aggregations, comparing the current implementation with the legacy one.
+    """
+
+    help = 'Benchmark statistics aggregations on a seeded dataset, that is rolled back afterwards.'
+
+    # Scenario name to the (legacy implementation, current implementation) accordance.
+    scenarios = OrderedDict([
+        ('overall_counts', (legacy_overall_counts, InstallationStatistics.overall_counts)),
+        ('charts_data', (legacy_get_charts_data, InstallationStatistics.get_charts_data)),
+        ('students_per_country', (
+            InstallationStatistics.get_students_per_country_stats, MonthlyCountryStatistics.get_months
+        )),
+        ('payload_validation', (legacy_validate_payloads, validate_payloads)),
+    ])
+
+    def add_arguments(self, parser):
+        """
+        Add benchmark scenarios and dataset size arguments.
+        """
+        parser.add_argument(
+            'scenario', nargs='*', help='Scenarios to run: {}. All by default.'.format(', '.join(self.scenarios))
+        )
+        parser.add_argument('--installations', type=int, default=1000, help='Amount of seeded installations.')
+        parser.add_argument('--days', type=int, default=1000, help='Amount of seeded statistics days per installation.')
+        parser.add_argument('--repeat', type=int, default=5, help='Amount of runs per implementation.')
+
+    def handle(self, *args, **options):
+        """
+        Seed the dataset, run the scenarios and roll the dataset back.
+        """
+        scenarios = options['scenario'] or list(self.scenarios)
+        unknown_scenarios = set(scenarios) - set(self.scenarios)
+
+        if unknown_scenarios:
+            raise CommandError('Unknown scenarios: {}'.format(', '.join(sorted(unknown_scenarios))))
+
+        with transaction.atomic():
+            self.seed(options['installations'], options['days'])
+
+            for scenario in scenarios:
+                legacy_implementation, current_implementation = self.scenarios[scenario]
+                self.stdout.write('{}:'.format(scenario))
+                self.report('legacy', legacy_implementation, options['repeat'])
+                self.report('current', current_implementation, options['repeat'])
+
+            transaction.set_rollback(True)
+
+    def seed(self, installations, days):
+        """
+        Insert installations with daily statistics, that end on the previous calendar day, and rebuild their rollups.
+        """
+        start = default_timer()
+
+        with connection.cursor() as cursor:
+            cursor.execute(SEED_INSTALLATIONS_SQL, {'installations': installations})
+            installation_ids = [row[0] for row in cursor.fetchall()]
+
+            cursor.execute(SEED_STATISTICS_SQL, {
+                'first_day': date.today() - timedelta(days=days),
+                'days': days,
+                'installation_ids': installation_ids,
+            })
+            cursor.execute('ANALYZE analytics_installationstatistics')
+
+        DailyStatistics.rebuild()
+        MonthlyCountryStatistics.rebuild()
+
+        self.stdout.write('Seeded {} statistics rows in {:.2f}s.'.format(installations * days, default_timer() - start))
+
+    def report(self, label, implementation, repeat):
+        """
+        Run the implementation several times and write its best time and the amount of queries per run.
+        """
+        timings = []
+
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as queries:
+                start = default_timer()
+                implementation()
+                timings.append(default_timer() - start)
+
+        self.stdout.write('    {:<8} {:>4} queries, best {:.4f}s, mean {:.4f}s'.format(
+            label, len(queries), min(timings), sum(timings) / len(timings)
+        ))
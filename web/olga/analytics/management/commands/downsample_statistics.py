@@ -0,0 +1,61 @@
+"""
+Management command, that downsamples installation statistics older than the retention period to monthly statistics.
+
+Statistics are moved in batches, every batch is deleted and summarized per installation and month within its own
+short transaction, so the command can be interrupted and run from cron at any time.
+
+How to:
+    - `python manage.py downsample_statistics` to downsample statistics older than `STATISTICS_RETENTION_MONTHS`.
+    - `python manage.py downsample_statistics --months 12 --batch-size 5000` to keep only the last year.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from olga.analytics.models import MonthlyInstallationStatistics, add_months, get_day_start
+
+
+class Command(BaseCommand):
+    """
+    Downsample installation statistics older than the retention period to monthly statistics.
+    """
+
+    help = 'Summarize installation statistics older than the retention period per month and delete them in batches.'
+
+    def add_arguments(self, parser):
+        """
+        Add retention period and batch arguments.
+        """
+        parser.add_argument(
+            '--months', type=int, default=settings.STATISTICS_RETENTION_MONTHS,
+            help='Amount of the months to keep installation statistics for, the current month included.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Amount of statistics per transaction.')
+        parser.add_argument('--sleep', type=float, default=0, help='Seconds to wait between batches.')
+
+    def handle(self, *args, **options):
+        """
+        Downsample batches until there are no statistics older than the retention period.
+        """
+        if options['months'] < 1:
+            raise CommandError('At least the current month statistics should be kept.')
+
+        before = get_day_start(add_months(timezone.localdate().replace(day=1), 1 - options['months']))
+        downsampled_amount = 0
+
+        while True:
+            with transaction.atomic():
+                batch_amount = MonthlyInstallationStatistics.downsample(before, options['batch_size'])
+
+            downsampled_amount += batch_amount
+
+            if batch_amount < options['batch_size']:
+                break
+
+            time.sleep(options['sleep'])
+
+        self.stdout.write('Downsampled {} statistics before {:%Y-%m-%d}.'.format(downsampled_amount, before))
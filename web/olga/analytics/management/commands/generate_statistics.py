@@ -0,0 +1,129 @@
+"""
+Management command, that generates synthetic installations statistics for the load tests and the charts development.
+
+Installations and their statistics are streamed to the database with `COPY`, so tens of millions of rows
+are generated without model instances creation. Monthly partitions are created for the generated history,
+then the daily and monthly country statistics are rebuilt.
+
+How to:
+    - `python manage.py generate_statistics` to generate a year of statistics for 1000 installations.
+    - `python manage.py generate_statistics --installations 10000 --days 1095 --seed 1` for 10k installations
+      and three years of history.
+"""
+
+from timeit import default_timer
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from olga.analytics.cache import bump_statistics_generation
+from olga.analytics.create_test_fixture import INSTALLATION_COLUMNS, STATISTICS_COLUMNS, CopyFile, LoadTestModel
+from olga.analytics.models import (
+    DailyStatistics,
+    EdxInstallation,
+    MonthlyCountryStatistics,
+    add_months,
+)
+from olga.analytics.partitions import STATISTICS_TABLE, create_partition
+
+INSTALLATIONS_TABLE = EdxInstallation._meta.db_table  # pylint: disable=protected-access
+
+COPY_SQL = 'COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv)'
+
+RESERVE_IDS_SQL = 'SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)'
+
+
+class Command(BaseCommand):
+    """
+    Generate synthetic installations statistics with COPY.
+    """
+
+    help = 'Stream synthetic installations and their statistics history to the database with COPY.'
+
+    def add_arguments(self, parser):
+        """
+        Add dataset size and generation arguments.
+        """
+        parser.add_argument('--installations', type=int, default=1000, help='Amount of generated installations.')
+        parser.add_argument('--days', type=int, default=365, help='Amount of statistics history days.')
+        parser.add_argument('--seed', type=int, help='Random generator seed to generate the same data again.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=500, help='Amount of installations generated per transaction.'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Create partitions for the history, stream the installations chunks and rebuild the rollups.
+        """
+        start = default_timer()
+        model = LoadTestModel(options['days'], options['seed'])
+
+        self.create_partitions(model)
+
+        statistics_amount = 0
+
+        for first_index in range(0, options['installations'], options['chunk_size']):
+            with transaction.atomic():
+                statistics_amount += self.copy_installations(
+                    model, range(first_index, min(first_index + options['chunk_size'], options['installations']))
+                )
+
+            self.stdout.write('Generated {} installations and {} statistics in {:.1f}s.'.format(
+                min(first_index + options['chunk_size'], options['installations']),
+                statistics_amount,
+                default_timer() - start,
+            ))
+
+        with transaction.atomic():
+            DailyStatistics.rebuild()
+            MonthlyCountryStatistics.rebuild()
+
+        bump_statistics_generation()
+        self.stdout.write('Rebuilt statistics rollups in {:.1f}s.'.format(default_timer() - start))
+
+    @staticmethod
+    def create_partitions(model):
+        """
+        Create the statistics table partitions for the history months, so rows are not copied to the default one.
+        """
+        month = model.first_day.replace(day=1)
+
+        with transaction.atomic():
+            while month <= model.last_day:
+                create_partition(month)
+                month = add_months(month, 1)
+
+    @staticmethod
+    def copy_installations(model, indexes):
+        """
+        Copy the installations and their statistics history.
+
+        Installations ids are reserved from their sequence, so statistics refer to them without reading them back.
+
+        :return: amount of the copied statistics.
+        """
+        installations = [model.get_installation(index) for index in indexes]
+
+        with connection.cursor() as cursor:
+            cursor.execute(RESERVE_IDS_SQL, [INSTALLATIONS_TABLE, 'id', len(installations)])
+            installation_ids = [row[0] for row in cursor.fetchall()]
+
+            cursor.copy_expert(
+                COPY_SQL.format(table=INSTALLATIONS_TABLE, columns=', '.join(INSTALLATION_COLUMNS)),
+                CopyFile(
+                    model.get_installation_row(installation, installation_id)
+                    for installation, installation_id in zip(installations, installation_ids)
+                )
+            )
+
+            statistics_file = CopyFile(
+                row
+                for installation, installation_id in zip(installations, installation_ids)
+                for row in model.get_statistics_rows(installation, installation_id)
+            )
+            cursor.copy_expert(
+                COPY_SQL.format(table=STATISTICS_TABLE, columns=', '.join(STATISTICS_COLUMNS)),
+                statistics_file
+            )
+
+        return statistics_file.rows_amount
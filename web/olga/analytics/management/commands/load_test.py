@@ -0,0 +1,163 @@
+"""
+Management command, that replays the edX installations traffic against a running server and reports its performance.
+
+Every synthetic installation registers its access token, then sends the daily reports: the token authorization
+and the statistics, as the edX platform does. Installations are run concurrently, the throughput and the latency
+percentiles are reported per endpoint.
+
+How to:
+    - `python manage.py runserver 7000` or `gunicorn` in another shell.
+    - `python manage.py load_test --installations 100 --reports 7 --concurrency 10` to send 700 reports.
+"""
+
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import math
+from timeit import default_timer
+
+from django.core.management.base import BaseCommand, CommandError
+import requests
+
+from olga.analytics.create_test_fixture import LoadTestModel
+
+ENDPOINTS = OrderedDict([
+    ('registration', '/api/token/registration/'),
+    ('authorization', '/api/token/authorization/'),
+    ('statistics', '/api/installation/statistics/'),
+])
+
+PERCENTILES = (50, 90, 99)
+
+
+def get_percentile(sorted_values, percentile):
+    """
+    Get the nearest-rank percentile of the sorted values.
+    """
+    return sorted_values[max(0, int(math.ceil(percentile / 100 * len(sorted_values))) - 1)]
+
+
+class Command(BaseCommand):
+    """
+    Replay the edX installations registration, authorization and statistics traffic.
+    """
+
+    help = 'Send synthetic installations traffic to a running server and report throughput and latency percentiles.'
+
+    def __init__(self, *args, **kwargs):
+        """
+        Initialize the command with empty latencies and errors per endpoint.
+        """
+        super(Command, self).__init__(*args, **kwargs)
+        self.url = None
+        self.timeout = None
+        self.latencies = {endpoint: [] for endpoint in ENDPOINTS}
+        self.errors = {endpoint: 0 for endpoint in ENDPOINTS}
+
+    def add_arguments(self, parser):
+        """
+        Add server, traffic size and concurrency arguments.
+        """
+        parser.add_argument('--url', default='http://localhost:7000', help='Base URL of the running server.')
+        parser.add_argument('--installations', type=int, default=100, help='Amount of simulated installations.')
+        parser.add_argument('--reports', type=int, default=7, help='Amount of daily reports per installation.')
+        parser.add_argument('--concurrency', type=int, default=10, help='Amount of concurrently sending installations.')
+        parser.add_argument('--timeout', type=float, default=30, help='Request timeout in seconds.')
+        parser.add_argument('--seed', type=int, help='Random generator seed to send the same data again.')
+
+    def handle(self, *args, **options):
+        """
+        Prepare the installations payloads, replay them concurrently and report the results.
+        """
+        if options['installations'] < 1 or options['reports'] < 1 or options['concurrency'] < 1:
+            raise CommandError('Installations, reports and concurrency should be positive.')
+
+        self.url = options['url'].rstrip('/')
+        self.timeout = options['timeout']
+
+        # Payloads are generated before sending, so the generation doesn't affect the measured throughput.
+        model = LoadTestModel(options['reports'], options['seed'])
+        installations = []
+
+        for index in range(options['installations']):
+            installation = model.get_installation(index)
+            installation['first_day'] = 0
+            installations.append((
+                index, [model.get_payload(installation, None, day) for day in range(options['reports'])]
+            ))
+
+        start = default_timer()
+
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            list(executor.map(self.replay_installation, installations))
+
+        self.report(default_timer() - start)
+
+    def replay_installation(self, installation):
+        """
+        Register the installation access token and send its reports.
+        """
+        index, payloads = installation
+
+        with requests.Session() as session:
+            response = self.send(
+                session, 'registration', headers={
+                    'X-Forwarded-For': '10.{}.{}.{}'.format(index // 65536 % 256, index // 256 % 256, index % 256),
+                }
+            )
+
+            if response is None:
+                return
+
+            access_token = response.json()['access_token']
+
+            for payload in payloads:
+                payload['access_token'] = access_token
+
+                if self.send(session, 'authorization', data={'access_token': access_token}) is not None:
+                    self.send(session, 'statistics', data=payload)
+
+    def send(self, session, endpoint, **kwargs):
+        """
+        Send the endpoint request and record its latency.
+
+        :return: the response or None, if the request failed.
+        """
+        start = default_timer()
+
+        try:
+            response = session.post(self.url + ENDPOINTS[endpoint], timeout=self.timeout, **kwargs)
+            response.raise_for_status()
+        except requests.RequestException:
+            self.errors[endpoint] += 1
+            return None
+        finally:
+            self.latencies[endpoint].append(default_timer() - start)
+
+        return response
+
+    def report(self, duration):
+        """
+        Write the throughput and the latency percentiles in milliseconds per endpoint.
+        """
+        requests_amount = sum(len(latencies) for latencies in self.latencies.values())
+
+        self.stdout.write('Sent {} requests in {:.1f}s, {:.1f} requests per second.'.format(
+            requests_amount, duration, requests_amount / duration
+        ))
+        self.stdout.write('{:<15}{:>10}{:>10}{}{:>10}'.format(
+            'endpoint', 'requests', 'errors', ''.join('{:>10}'.format('p{}'.format(p)) for p in PERCENTILES), 'max'
+        ))
+
+        for endpoint in ENDPOINTS:
+            latencies = sorted(self.latencies[endpoint])
+
+            if not latencies:
+                continue
+
+            self.stdout.write('{:<15}{:>10}{:>10}{}{:>10.1f}'.format(
+                endpoint,
+                len(latencies),
+                self.errors[endpoint],
+                ''.join('{:>10.1f}'.format(get_percentile(latencies, p) * 1000) for p in PERCENTILES),
+                latencies[-1] * 1000,
+            ))
@@ -0,0 +1,81 @@
+"""
+Management command, that creates the statistics table monthly partitions in advance and archives the old ones.
+
+Statistics of the months without partitions are kept by the default partition, they are moved to the partitions
+created for their months. Archived partitions are detached from the statistics table and kept as standalone tables,
+so they can be dumped and dropped.
+
+How to:
+    - `python manage.py manage_partitions` to create partitions for the current and the next months, e.g. from cron.
+    - `python manage.py manage_partitions --archive-before 2018-01` to archive partitions of the months before 2018.
+"""
+
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from olga.analytics.cache import bump_statistics_generation
+from olga.analytics.models import add_months
+from olga.analytics.partitions import (
+    archive_partition,
+    create_partition,
+    get_default_partition_months,
+    get_partition_months,
+    get_partition_name,
+)
+
+
+class Command(BaseCommand):
+    """
+    Create the statistics table monthly partitions in advance and archive the old ones.
+    """
+
+    help = 'Create statistics partitions for the next months and the default partition months, archive old ones.'
+
+    def add_arguments(self, parser):
+        """
+        Add months ahead and archived months arguments.
+        """
+        parser.add_argument(
+            '--ahead', type=int, default=settings.STATISTICS_PARTITIONS_AHEAD,
+            help='Amount of the next months to create partitions for.'
+        )
+        parser.add_argument(
+            '--archive-before', help='Archive partitions of the months before the given one, in YYYY-MM format.'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Create missing partitions, then archive the old ones if requested.
+        """
+        archive_before = None
+
+        if options['archive_before']:
+            try:
+                archive_before = datetime.strptime(options['archive_before'], '%Y-%m').date()
+            except ValueError as error:
+                raise CommandError('Archived months should be given in YYYY-MM format.') from error
+
+        current_month = timezone.now().date().replace(day=1)
+        months = set(add_months(current_month, months) for months in range(options['ahead'] + 1))
+        months.update(get_default_partition_months())
+
+        for month in sorted(months):
+            with transaction.atomic():
+                if create_partition(month):
+                    self.stdout.write('Created partition {}.'.format(get_partition_name(month)))
+
+        if archive_before is None:
+            return
+
+        archived_months = [month for month in get_partition_months() if month < archive_before]
+
+        for month in archived_months:
+            with transaction.atomic():
+                self.stdout.write('Archived partition {}.'.format(archive_partition(month)))
+
+        if archived_months:
+            bump_statistics_generation()
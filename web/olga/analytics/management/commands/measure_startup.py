@@ -0,0 +1,93 @@
+"""
+Management command, that measures the cold start of a worker process.
+
+Every run imports the modules in a fresh interpreter, the same way a gunicorn worker does, and reports
+the import time and the resident memory of the process.
+
+How to:
+    - `python manage.py measure_startup` to measure the WSGI application with all the views imported.
+    - `python manage.py measure_startup olga.analytics.views --repeat 10` to measure particular modules.
+"""
+
+import json
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Script, that is run by a fresh interpreter with the modules to import as arguments.
+MEASURE_STARTUP_SCRIPT = '''
+import importlib
+import json
+import resource
+import sys
+import time
+
+start = time.perf_counter()
+
+import django
+django.setup()
+
+for module in sys.argv[1:]:
+    importlib.import_module(module)
+
+print(json.dumps({
+    'import_time': time.perf_counter() - start,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'pycountry_loaded': 'pycountry' in sys.modules,
+}))
+'''
+
+
+class Command(BaseCommand):
+    """
+    Measure import time and memory of a fresh worker process.
+    """
+
+    help = 'Report import time and resident memory of a fresh worker process, that imports the modules.'
+
+    def add_arguments(self, parser):
+        """
+        Add modules and runs amount arguments.
+        """
+        parser.add_argument(
+            'module', nargs='*', default=['acceptor.wsgi', 'acceptor.urls'],
+            help='Modules to import. WSGI application and URLs with all the views by default.'
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Amount of fresh processes to measure.')
+
+    def handle(self, *args, **options):
+        """
+        Run the fresh processes and write the best and mean import time and the maximal memory.
+        """
+        runs = [self.measure(options['module']) for _ in range(options['repeat'])]
+        import_times = [run['import_time'] for run in runs]
+
+        self.stdout.write('Imported {} in {} processes:'.format(', '.join(options['module']), len(runs)))
+        self.stdout.write('    import time best {:.3f}s, mean {:.3f}s'.format(
+            min(import_times), sum(import_times) / len(import_times)
+        ))
+        self.stdout.write('    max RSS {:.1f} MB'.format(max(run['max_rss_kb'] for run in runs) / 1024))
+        self.stdout.write('    pycountry loaded: {}'.format(
+            'yes' if any(run['pycountry_loaded'] for run in runs) else 'no'
+        ))
+
+    @staticmethod
+    def measure(modules):
+        """
+        Import the modules in a fresh interpreter and return its measurements.
+        """
+        try:
+            process = subprocess.run(
+                [sys.executable, '-c', MEASURE_STARTUP_SCRIPT] + list(modules),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=settings.BASE_DIR,
+                universal_newlines=True,
+                check=True,
+            )
+        except subprocess.CalledProcessError as error:
+            raise CommandError('Worker process failed: {}'.format(error.stderr.strip())) from error
+
+        return json.loads(process.stdout.strip().splitlines()[-1])
@@ -0,0 +1,99 @@
+"""
+Management command, that processes statistics reports queued by the asynchronous ingestion.
+
+Reports are claimed with `SELECT ... FOR UPDATE SKIP LOCKED`, so several workers can drain the queue concurrently.
+
+How to:
+    - `python manage.py process_statistics_queue` to process all the queued reports and exit, e.g. from cron.
+    - `python manage.py process_statistics_queue --loop` to keep a worker process running.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from olga.analytics.cache import bump_statistics_generation
+from olga.analytics.models import ReceivedStatistics
+from olga.analytics.schema import validate_statistics
+from olga.analytics.views import ReceiveInstallationStatistics
+
+logger = logging.getLogger(__name__)
+
+
+def process_statistics_batch(batch_size, max_attempts):
+    """
+    Apply a batch of queued statistics reports within a single transaction.
+
+    Every report is applied in its own savepoint, a failed report is kept in the queue with the error
+    and the increased attempts amount, processed reports are deleted.
+
+    :return: tuple with amounts of processed and failed reports.
+    """
+    processed_amount = failed_amount = 0
+
+    with transaction.atomic():
+        reports = ReceivedStatistics.objects.select_for_update(skip_locked=True).filter(
+            attempts__lt=max_attempts
+        ).order_by('pk')[:batch_size]
+
+        for report in reports:
+            try:
+                ReceiveInstallationStatistics().process_instance_datas(
+                    validate_statistics(report.payload),
+                    report.access_token,
+                    timezone.make_naive(report.received_datetime),
+                )
+            except Exception as error:  # pylint: disable=broad-except
+                logger.exception('Queued statistics %s were not processed.', report.pk)
+                report.attempts += 1
+                report.error = repr(error)
+                report.save(update_fields=['attempts', 'error'])
+                failed_amount += 1
+            else:
+                report.delete()
+                processed_amount += 1
+
+    if processed_amount:
+        bump_statistics_generation()
+
+    return processed_amount, failed_amount
+
+
+class Command(BaseCommand):
+    """
+    Process statistics reports queued by the asynchronous ingestion.
+    """
+
+    help = 'Apply queued statistics reports to the statistics tables in batches.'
+
+    def add_arguments(self, parser):
+        """
+        Add batch size and worker loop arguments.
+        """
+        parser.add_argument('--batch-size', type=int, default=100, help='Amount of reports per transaction.')
+        parser.add_argument('--loop', action='store_true', help='Keep waiting for new reports when queue is empty.')
+        parser.add_argument('--sleep', type=float, default=5, help='Seconds to wait for new reports in loop mode.')
+
+    def handle(self, *args, **options):
+        """
+        Process batches until the queue is drained, then exit or wait for new reports.
+        """
+        while True:
+            processed_amount, failed_amount = process_statistics_batch(
+                options['batch_size'], settings.STATISTICS_QUEUE_MAX_ATTEMPTS
+            )
+
+            if processed_amount or failed_amount:
+                self.stdout.write('Processed {} reports, {} failed.'.format(processed_amount, failed_amount))
+
+            if processed_amount + failed_amount == options['batch_size']:
+                continue
+
+            if not options['loop']:
+                break
+
+            time.sleep(options['sleep'])
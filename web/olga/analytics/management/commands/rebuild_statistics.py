@@ -0,0 +1,36 @@
+"""
+Management command, that recalculates the statistics rollups from the installation statistics.
+
+Rollups are maintained incrementally only while statistics are received, so they have to be rebuilt after
+the installation statistics are changed or deleted in another way, e.g. in the admin or by the installation deletion.
+
+How to:
+    - `python manage.py rebuild_statistics` to recalculate the daily statistics and the monthly countries.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from olga.analytics.cache import bump_statistics_generation
+from olga.analytics.models import DailyStatistics, MonthlyCountryStatistics
+
+
+class Command(BaseCommand):
+    """
+    Recalculate the daily statistics and the monthly countries rollups.
+    """
+
+    help = 'Recalculate the statistics rollups from the installation statistics.'
+
+    def handle(self, *args, **options):
+        """
+        Rebuild the rollups within a single transaction, so charts never see partially rebuilt ones.
+        """
+        with transaction.atomic():
+            DailyStatistics.rebuild()
+            MonthlyCountryStatistics.rebuild()
+
+        bump_statistics_generation()
+        self.stdout.write('Rebuilt {} days and {} month countries.'.format(
+            DailyStatistics.objects.count(), MonthlyCountryStatistics.objects.count()
+        ))
@@ -0,0 +1,136 @@
+"""
+Management command, that resolves coordinates of the installations by their platform city names.
+
+Statistics endpoint does not request the geocoding service, installations with a not cached platform city name
+are marked as pending and resolved by this command in batches. Each city is requested once per batch and
+requests are sent no more often than `GEOCODING_REQUEST_INTERVAL` seconds, as Nominatim usage policy requires.
+Installations, that failed to be resolved, e.g. on the service timeout, stay pending and are retried on the next
+command run or loop iteration, up to `GEOCODING_MAX_ATTEMPTS` times.
+
+How to:
+    - `python manage.py resolve_coordinates` to resolve all the pending installations and exit, e.g. from cron.
+    - `python manage.py resolve_coordinates --loop` to keep a worker process running.
+"""
+
+from collections import defaultdict
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import BooleanField, Case, F, Value, When
+
+from olga.analytics.models import EdxInstallation, GeocodedCity
+from olga.analytics.utils import (
+    GeocodingError,
+    get_cached_coordinates_by_platform_city_name,
+    get_coordinates_by_platform_city_name,
+)
+
+
+class Command(BaseCommand):
+    """
+    Resolve coordinates of the pending installations by their platform city names.
+    """
+
+    help = 'Geocode platform city names of the pending installations in batches, respecting the service rate limit.'
+
+    last_request_time = None
+
+    def __init__(self, *args, **kwargs):
+        """
+        Initialize the installations, that failed to be resolved since the last wait.
+        """
+        super(Command, self).__init__(*args, **kwargs)
+        self.failed_installation_ids = set()
+
+    def add_arguments(self, parser):
+        """
+        Add batch size and worker loop arguments.
+        """
+        parser.add_argument('--batch-size', type=int, default=100, help='Amount of installations per batch.')
+        parser.add_argument('--loop', action='store_true', help='Keep waiting for new pending installations.')
+        parser.add_argument(
+            '--sleep', type=float, default=60, help='Seconds to wait for new installations in loop mode.'
+        )
+
+    def handle(self, *args, **options):
+        """
+        Resolve batches until there are no pending installations, then exit or wait for new ones.
+        """
+        while True:
+            resolved_amount, failed_amount = self.resolve_batch(options['batch_size'])
+
+            if resolved_amount:
+                self.stdout.write('Resolved coordinates for {} installations.'.format(resolved_amount))
+
+            if failed_amount:
+                self.stdout.write('Failed to resolve coordinates for {} installations.'.format(failed_amount))
+
+            if resolved_amount or failed_amount:
+                continue
+
+            if not options['loop']:
+                break
+
+            # Failed installations are retried after the wait, so the service isn't requested for them in a row.
+            self.failed_installation_ids.clear()
+            time.sleep(options['sleep'])
+
+    def resolve_batch(self, batch_size):
+        """
+        Resolve coordinates for a batch of the pending installations, grouped by the platform city name.
+
+        Installations, that failed to be resolved, stay pending with the increased attempts amount
+        until they reach `GEOCODING_MAX_ATTEMPTS`, and are skipped until the next wait.
+
+        :return: tuple with amounts of installations, that are not pending anymore, and that failed to be resolved.
+        """
+        installations_by_city = defaultdict(list)
+
+        for installation_id, city_name in EdxInstallation.objects.filter(
+                coordinates_pending=True
+        ).exclude(id__in=self.failed_installation_ids).order_by('pk').values_list(
+            'id', 'platform_city_name'
+        )[:batch_size]:
+            installations_by_city[GeocodedCity.normalize_city_name(city_name or '')].append(installation_id)
+
+        resolved_amount = 0
+        failed_amount = 0
+
+        for city_name, installation_ids in installations_by_city.items():
+            installations = EdxInstallation.objects.filter(id__in=installation_ids, coordinates_pending=True)
+
+            try:
+                coordinates = self.get_coordinates(city_name) if city_name else ('', '')
+            except GeocodingError as error:
+                self.stderr.write(str(error))
+                self.failed_installation_ids.update(installation_ids)
+                failed_amount += installations.update(
+                    coordinates_attempts=F('coordinates_attempts') + 1,
+                    coordinates_pending=Case(
+                        When(coordinates_attempts__gte=settings.GEOCODING_MAX_ATTEMPTS - 1, then=Value(False)),
+                        default=Value(True),
+                        output_field=BooleanField(),
+                    ),
+                )
+                continue
+
+            resolved_coordinates = {'latitude': coordinates[0], 'longitude': coordinates[1]} if all(coordinates) else {}
+            resolved_amount += installations.update(coordinates_pending=False, **resolved_coordinates)
+
+        return resolved_amount, failed_amount
+
+    def get_coordinates(self, city_name):
+        """
+        Provide coordinates of the city from the cache or from the geocoding service, keeping the rate limit.
+        """
+        coordinates = get_cached_coordinates_by_platform_city_name(city_name)
+
+        if coordinates is not None:
+            return coordinates
+
+        if self.last_request_time is not None:
+            time.sleep(max(0, self.last_request_time + settings.GEOCODING_REQUEST_INTERVAL - time.monotonic()))
+
+        self.last_request_time = time.monotonic()
+        return get_coordinates_by_platform_city_name(city_name)
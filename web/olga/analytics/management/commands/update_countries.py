@@ -0,0 +1,40 @@
+"""
+Management command, that updates the compact countries table from the pycountry databases.
+
+How to:
+    - `python manage.py update_countries` after the pycountry upgrade.
+"""
+
+import json
+
+from django.core.management.base import BaseCommand
+import pycountry
+
+from olga.analytics.countries import COUNTRIES_PATH
+
+
+class Command(BaseCommand):
+    """
+    Update the compact countries table, that is shipped with the application.
+    """
+
+    help = 'Write the alpha-2 country code to the alpha-3 code and name table from the pycountry databases.'
+
+    def handle(self, *args, **options):
+        """
+        Write the countries table.
+        """
+        countries = sorted(
+            (country.alpha_2, [country.alpha_3, country.name]) for country in pycountry.countries
+        )
+
+        # One country per line keeps the table compact and its changes readable.
+        with open(COUNTRIES_PATH, 'w', encoding='utf-8') as countries_file:
+            countries_file.write('{\n')
+            countries_file.write(',\n'.join(
+                '{}:{}'.format(json.dumps(alpha_2), json.dumps(country, ensure_ascii=False, separators=(',', ':')))
+                for alpha_2, country in countries
+            ))
+            countries_file.write('\n}\n')
+
+        self.stdout.write('Wrote {} countries to {}.'.format(len(countries), COUNTRIES_PATH))
@@ -0,0 +1,44 @@
+# Generated by Django 2.1.7 on 2026-10-18 01:18
+
+from django.db import migrations, models
+
+
+FILL_DAILY_STATISTICS_SQL = '''
+    INSERT INTO analytics_dailystatistics (
+        day, students, courses, instances, registered_students, enthusiastic_students, generated_certificates
+    )
+    SELECT
+        date_trunc('day', data_created_datetime)::date,
+        SUM(active_students_amount_day),
+        SUM(courses_amount),
+        COUNT(id),
+        SUM(registered_students),
+        SUM(enthusiastic_students),
+        SUM(generated_certificates)
+    FROM analytics_installationstatistics
+    GROUP BY 1
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0010_auto_20180525_1312'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStatistics',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('students', models.IntegerField(default=0)),
+                ('courses', models.IntegerField(default=0)),
+                ('instances', models.IntegerField(default=0)),
+                ('registered_students', models.IntegerField(default=0)),
+                ('enthusiastic_students', models.IntegerField(default=0)),
+                ('generated_certificates', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunSQL(FILL_DAILY_STATISTICS_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 2.1.7 on 2026-10-18 01:20
+
+from django.db import migrations, models
+
+
+FILL_MONTHLY_COUNTRY_STATISTICS_SQL = '''
+    INSERT INTO analytics_monthlycountrystatistics (month, country, students)
+    SELECT date_trunc('month', statistics.data_created_datetime)::date, country.key, SUM(country.value::text::numeric)
+    FROM analytics_installationstatistics AS statistics
+    CROSS JOIN LATERAL jsonb_each(
+        CASE WHEN jsonb_typeof(statistics.students_per_country) = 'object' THEN statistics.students_per_country END
+    ) AS country
+    WHERE jsonb_typeof(country.value) = 'number'
+    GROUP BY 1, 2
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0011_dailystatistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyCountryStatistics',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month.')),
+                ('country', models.CharField(help_text='Country code as it is received. Example: RU', max_length=255)),
+                ('students', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='monthlycountrystatistics',
+            unique_together={('month', 'country')},
+        ),
+        migrations.RunSQL(FILL_MONTHLY_COUNTRY_STATISTICS_SQL, migrations.RunSQL.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 2.1.7 on 2026-10-18 01:22
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+# Installations with the same value can't be told apart by it, so they have to be merged or fixed manually.
+DUPLICATED_VALUES_SQL = '''
+    SELECT {field}, COUNT(*), array_agg(id ORDER BY id)
+    FROM analytics_edxinstallation
+    WHERE {field} IS NOT NULL
+    GROUP BY {field}
+    HAVING COUNT(*) > 1
+    ORDER BY {field}
+'''
+
+
+def check_duplicated_installations(apps, schema_editor):
+    """
+    Report installations with the same access token or uid, that can't be made unique.
+    """
+    duplicates = []
+
+    with schema_editor.connection.cursor() as cursor:
+        for field in ('access_token', 'uid'):
+            cursor.execute(DUPLICATED_VALUES_SQL.format(field=field))
+            duplicates.extend(
+                '{} {} is used by {} installations with ids {}'.format(field, value, amount, ids)
+                for value, amount, ids in cursor
+            )
+
+    if duplicates:
+        raise RuntimeError(
+            'Installations access tokens and uids should be unique, resolve the duplicates before '
+            'the migration:\n{}'.format('\n'.join(duplicates))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0012_monthlycountrystatistics'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicated_installations, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='edxinstallation',
+            name='access_token',
+            field=models.UUIDField(null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='edxinstallation',
+            name='uid',
+            field=models.CharField(max_length=32, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='installationstatistics',
+            index=models.Index(fields=['edx_installation', 'data_created_datetime'], name='statistics_installation_date'),
+        ),
+        migrations.AddIndex(
+            model_name='installationstatistics',
+            index=django.contrib.postgres.indexes.BrinIndex(fields=['data_created_datetime'], name='statistics_created_brin'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 2.1.7 on 2026-10-18 01:24
+
+from importlib import import_module
+
+from django.db import migrations
+
+
+DELETE_DUPLICATED_STATISTICS_SQL = '''
+    DELETE FROM analytics_installationstatistics AS statistics
+    USING analytics_installationstatistics AS newer_statistics
+    WHERE statistics.edx_installation_id = newer_statistics.edx_installation_id
+        AND statistics.data_created_datetime = newer_statistics.data_created_datetime
+        AND statistics.id < newer_statistics.id
+'''
+
+
+def delete_duplicated_statistics(apps, schema_editor):
+    """
+    Keep only the latest statistics for the same installation and datetime, then refill the aggregated statistics.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(DELETE_DUPLICATED_STATISTICS_SQL)
+
+        if not cursor.rowcount:
+            return
+
+        cursor.execute('DELETE FROM analytics_dailystatistics')
+        cursor.execute(import_module('olga.analytics.migrations.0011_dailystatistics').FILL_DAILY_STATISTICS_SQL)
+        cursor.execute('DELETE FROM analytics_monthlycountrystatistics')
+        cursor.execute(
+            import_module('olga.analytics.migrations.0012_monthlycountrystatistics').FILL_MONTHLY_COUNTRY_STATISTICS_SQL
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0013_statistics_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='installationstatistics',
+            name='statistics_installation_date',
+        ),
+        migrations.RunPython(delete_duplicated_statistics, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='installationstatistics',
+            unique_together={('edx_installation', 'data_created_datetime')},
+        ),
+    ]
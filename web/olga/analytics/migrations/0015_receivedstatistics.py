@@ -0,0 +1,26 @@
+# Generated by Django 2.1.7 on 2026-10-18 01:25
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0014_statistics_unique_installation_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReceivedStatistics',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('access_token', models.UUIDField()),
+                ('payload', django.contrib.postgres.fields.jsonb.JSONField(help_text='Received statistics as they were posted by the edx-platform.')),
+                ('received_datetime', models.DateTimeField(default=django.utils.timezone.now)),
+                ('attempts', models.IntegerField(default=0, help_text='Amount of failed processing attempts.')),
+                ('error', models.TextField(blank=True, help_text='Last processing error.')),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.1.7 on 2026-10-18 01:26
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0015_receivedstatistics'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodedCity',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('city_name', models.CharField(help_text='Normalized city name. Example: kiev', max_length=255, unique=True)),
+                ('latitude', models.FloatField(blank=True, null=True)),
+                ('longitude', models.FloatField(blank=True, null=True)),
+                ('updated_datetime', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
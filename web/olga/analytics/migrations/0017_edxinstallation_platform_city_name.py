@@ -0,0 +1,23 @@
+# Generated by Django 2.1.7 on 2026-10-18 01:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0016_geocodedcity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='edxinstallation',
+            name='coordinates_pending',
+            field=models.BooleanField(default=False, help_text='Coordinates have to be resolved by the platform city name in the background.'),
+        ),
+        migrations.AddField(
+            model_name='edxinstallation',
+            name='platform_city_name',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.1.7 on 2026-10-18 01:37
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0017_edxinstallation_platform_city_name'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='installationstatistics',
+            name='country_ids',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.SmallIntegerField(), blank=True, default=list, help_text='ISO 3166-1 numeric codes of the students countries, 0 is the unspecified country.', size=None),
+        ),
+        migrations.AddField(
+            model_name='installationstatistics',
+            name='country_students',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.IntegerField(), blank=True, default=list, help_text='Students amounts in the `country_ids` order.', size=None),
+        ),
+    ]
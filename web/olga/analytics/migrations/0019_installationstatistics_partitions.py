@@ -0,0 +1,115 @@
+from datetime import date, datetime
+
+from django.db import NotSupportedError, migrations
+from django.utils import timezone
+
+
+TABLE = 'analytics_installationstatistics'
+
+# Partitions are created for the months of the existing statistics and for the next months.
+PARTITIONS_AHEAD = 3
+
+CONSTRAINTS_SQL = '''
+    SELECT conname, contype, pg_get_constraintdef(oid)
+    FROM pg_constraint
+    WHERE conrelid = %s::regclass AND contype <> 'c'
+    ORDER BY contype DESC
+'''
+
+INDEXES_SQL = '''
+    SELECT pg_get_indexdef(indexrelid)
+    FROM pg_index
+    WHERE indrelid = %s::regclass AND NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conindid = indexrelid)
+'''
+
+
+def add_months(month, months):
+    """
+    Get the first day of the month, that is the given amount of months after the given one.
+    """
+    month_index = month.year * 12 + month.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def get_month_start(month):
+    """
+    Get the UTC datetime the month starts at.
+    """
+    return datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+
+
+def convert_statistics_table(schema_editor, partitioned):
+    """
+    Recreate the statistics table as the partitioned or the plain one, keeping its data, constraints and indexes.
+
+    Primary key of the partitioned table has to include the partition key, so it is the id and the datetime.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(CONSTRAINTS_SQL, [TABLE])
+        constraints = cursor.fetchall()
+        cursor.execute(INDEXES_SQL, [TABLE])
+        indexes = [row[0].replace(' ON ONLY ', ' ON ') for row in cursor.fetchall()]
+        cursor.execute('SELECT pg_get_serial_sequence(%s, %s)', [TABLE, 'id'])
+        sequence = cursor.fetchone()[0]
+
+        cursor.execute('ALTER TABLE {table} RENAME TO {table}_previous'.format(table=TABLE))
+        cursor.execute('CREATE TABLE {table} (LIKE {table}_previous INCLUDING DEFAULTS INCLUDING CONSTRAINTS){}'.format(
+            ' PARTITION BY RANGE (data_created_datetime)' if partitioned else '', table=TABLE
+        ))
+        cursor.execute('ALTER SEQUENCE {} OWNED BY {}.id'.format(sequence, TABLE))
+
+        if partitioned:
+            cursor.execute('CREATE TABLE {table}_default PARTITION OF {table} DEFAULT'.format(table=TABLE))
+            cursor.execute('SELECT MIN(data_created_datetime) FROM {}_previous'.format(TABLE))
+            first_datetime = cursor.fetchone()[0] or timezone.now()
+            month = first_datetime.astimezone(timezone.utc).date().replace(day=1)
+            last_month = add_months(timezone.now().date().replace(day=1), PARTITIONS_AHEAD)
+
+            while month <= last_month:
+                cursor.execute(
+                    'CREATE TABLE {table}_y{month:%Y}m{month:%m} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)'.format(
+                        table=TABLE, month=month
+                    ),
+                    [get_month_start(month), get_month_start(add_months(month, 1))]
+                )
+                month = add_months(month, 1)
+
+        cursor.execute('INSERT INTO {table} SELECT * FROM {table}_previous'.format(table=TABLE))
+        cursor.execute('DROP TABLE {}_previous'.format(TABLE))
+
+        for name, constraint_type, definition in constraints:
+            if constraint_type == 'p':
+                definition = 'PRIMARY KEY (id, data_created_datetime)' if partitioned else 'PRIMARY KEY (id)'
+
+            cursor.execute('ALTER TABLE {} ADD CONSTRAINT {} {}'.format(TABLE, name, definition))
+
+        for index in indexes:
+            cursor.execute(index)
+
+
+def partition_statistics_table(apps, schema_editor):
+    """
+    Partition the statistics table by the months of the statistics datetime.
+    """
+    if schema_editor.connection.pg_version < 110000:
+        raise NotSupportedError('Statistics table partitioning requires PostgreSQL 11 or newer.')
+
+    convert_statistics_table(schema_editor, partitioned=True)
+
+
+def unpartition_statistics_table(apps, schema_editor):
+    """
+    Recreate the statistics table as the plain one, archived partitions are kept as they are.
+    """
+    convert_statistics_table(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0018_installationstatistics_compact_countries'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_statistics_table, unpartition_statistics_table),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 2.1.7 on 2026-10-18 01:45
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0019_installationstatistics_partitions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyInstallationStatistics',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month.')),
+                ('days', models.IntegerField(default=0, help_text='Amount of the summarized installation statistics.')),
+                ('first_data_created_datetime', models.DateTimeField()),
+                ('last_data_created_datetime', models.DateTimeField()),
+                ('active_students_amount_day', models.BigIntegerField(default=0)),
+                ('active_students_amount_week', models.BigIntegerField(default=0)),
+                ('active_students_amount_month', models.BigIntegerField(default=0)),
+                ('courses_amount', models.BigIntegerField(default=0)),
+                ('registered_students', models.BigIntegerField(default=0)),
+                ('enthusiastic_students', models.BigIntegerField(default=0)),
+                ('generated_certificates', models.BigIntegerField(default=0)),
+                ('students_per_country', django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, help_text='Students country-count accordance summed up for the month.')),
+                ('edx_installation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='analytics.EdxInstallation')),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='monthlyinstallationstatistics',
+            unique_together={('edx_installation', 'month')},
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 2.1.7 on 2026-10-18 02:16
+
+import django.contrib.postgres.fields.jsonb
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0020_monthlyinstallationstatistics'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='edxinstallation',
+            name='latitude',
+            field=models.FloatField(blank=True, help_text='Latitude coordinate of edX platform follows `float` type. Example: 50.10', null=True),
+        ),
+        migrations.AlterField(
+            model_name='edxinstallation',
+            name='longitude',
+            field=models.FloatField(blank=True, help_text='Longitude coordinate of edX platform follows `float` type. Example: 40.05', null=True),
+        ),
+        migrations.AlterField(
+            model_name='installationstatistics',
+            name='statistics_level',
+            field=models.CharField(choices=[('enthusiast', 'enthusiast'), ('paranoid', 'paranoid')], default='paranoid', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='installationstatistics',
+            name='students_per_country',
+            field=django.contrib.postgres.fields.jsonb.JSONField(blank=True, default=dict, help_text='This field has students country-count accordance. It follows `json` type. Example: {"RU": 2632, "CA": 18543, "UA": 2011, "null": 1}', null=True),
+        ),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 2.1.7 on 2026-10-18 02:40
+
+from django.conf import settings
+from django.db import migrations
+
+
+DELETE_SAME_DAY_STATISTICS_SQL = '''
+    DELETE FROM analytics_installationstatistics AS statistics
+    USING analytics_installationstatistics AS newer_statistics
+    WHERE statistics.edx_installation_id = newer_statistics.edx_installation_id
+        AND date_trunc('day', statistics.data_created_datetime AT TIME ZONE %(time_zone)s)
+            = date_trunc('day', newer_statistics.data_created_datetime AT TIME ZONE %(time_zone)s)
+        AND statistics.id < newer_statistics.id
+'''
+
+MOVE_TO_DAY_START_SQL = '''
+    UPDATE analytics_installationstatistics
+    SET data_created_datetime = date_trunc('day', data_created_datetime AT TIME ZONE %(time_zone)s)
+        AT TIME ZONE %(time_zone)s
+    WHERE data_created_datetime
+        <> date_trunc('day', data_created_datetime AT TIME ZONE %(time_zone)s) AT TIME ZONE %(time_zone)s
+'''
+
+# Days of the months downsampled by the retention don't have the installation statistics anymore,
+# so the daily statistics are rebuilt starting from the first day after the last downsampled month.
+DOWNSAMPLED_UNTIL_SQL = '''(
+    SELECT COALESCE(MAX(month) + interval '1 month', '-infinity')::date
+    FROM analytics_monthlyinstallationstatistics
+)'''
+
+DELETE_DAILY_STATISTICS_SQL = '''
+    DELETE FROM analytics_dailystatistics WHERE day >= {downsampled_until}
+'''.format(downsampled_until=DOWNSAMPLED_UNTIL_SQL)
+
+FILL_DAILY_STATISTICS_SQL = '''
+    INSERT INTO analytics_dailystatistics (
+        day, students, courses, instances, registered_students, enthusiastic_students, generated_certificates
+    )
+    SELECT
+        (data_created_datetime AT TIME ZONE %(time_zone)s)::date,
+        SUM(active_students_amount_day),
+        SUM(courses_amount),
+        COUNT(id),
+        SUM(registered_students),
+        SUM(enthusiastic_students),
+        SUM(generated_certificates)
+    FROM analytics_installationstatistics
+    WHERE (data_created_datetime AT TIME ZONE %(time_zone)s)::date >= {downsampled_until}
+    GROUP BY 1
+'''.format(downsampled_until=DOWNSAMPLED_UNTIL_SQL)
+
+DELETE_MONTHLY_COUNTRY_STATISTICS_SQL = '''
+    DELETE FROM analytics_monthlycountrystatistics
+'''
+
+FILL_MONTHLY_COUNTRY_STATISTICS_SQL = '''
+    INSERT INTO analytics_monthlycountrystatistics (month, country, students)
+    SELECT countries.month, countries.key, SUM(countries.students)
+    FROM (
+        SELECT
+            date_trunc('month', statistics.data_created_datetime AT TIME ZONE %(time_zone)s)::date AS month,
+            country.key,
+            country.value::text::numeric AS students
+        FROM analytics_installationstatistics AS statistics
+        CROSS JOIN LATERAL jsonb_each(
+            CASE WHEN jsonb_typeof(statistics.students_per_country) = 'object' THEN statistics.students_per_country END
+        ) AS country
+        WHERE jsonb_typeof(country.value) = 'number'
+        UNION ALL
+        SELECT summary.month, country.key, country.value::text::numeric
+        FROM analytics_monthlyinstallationstatistics AS summary
+        CROSS JOIN LATERAL jsonb_each(summary.students_per_country) AS country
+        WHERE jsonb_typeof(country.value) = 'number'
+    ) AS countries
+    GROUP BY 1, 2
+    HAVING SUM(countries.students) <> 0
+'''
+
+
+def move_statistics_to_day_start(apps, schema_editor):
+    """
+    Keep only the latest statistics for the same installation and day and move them to the start of the day.
+
+    Unique installation and datetime constraint can't be built on the truncated day of the partitioned table,
+    so it is a day-based one as long as the statistics are saved at the start of their day.
+    If any statistics are deleted, the daily and monthly country rollups are rebuilt.
+    """
+    params = {'time_zone': settings.TIME_ZONE}
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(DELETE_SAME_DAY_STATISTICS_SQL, params)
+        deleted_amount = cursor.rowcount
+        cursor.execute(MOVE_TO_DAY_START_SQL, params)
+
+        if deleted_amount:
+            for sql in (
+                DELETE_DAILY_STATISTICS_SQL,
+                FILL_DAILY_STATISTICS_SQL,
+                DELETE_MONTHLY_COUNTRY_STATISTICS_SQL,
+                FILL_MONTHLY_COUNTRY_STATISTICS_SQL,
+            ):
+                cursor.execute(sql, params)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0021_field_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_statistics_to_day_start, migrations.RunPython.noop),
+    ]
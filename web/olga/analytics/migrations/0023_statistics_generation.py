@@ -0,0 +1,17 @@
+# Generated by Django 2.1.7 on 2026-10-18 02:55
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0022_statistics_day_start'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE SEQUENCE analytics_statistics_generation MINVALUE 1',
+            'DROP SEQUENCE analytics_statistics_generation',
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.1.7 on 2026-10-18 02:38
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0023_statistics_generation'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='installationstatistics',
+            name='country_ids',
+        ),
+        migrations.RemoveField(
+            model_name='installationstatistics',
+            name='country_students',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.1.7 on 2026-10-18 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0024_remove_compact_countries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='edxinstallation',
+            name='coordinates_attempts',
+            field=models.IntegerField(default=0, help_text='Amount of failed coordinates resolving attempts.'),
+        ),
+    ]
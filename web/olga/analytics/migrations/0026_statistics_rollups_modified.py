@@ -0,0 +1,39 @@
+# Generated by Django 2.1.7 on 2026-10-18 04:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0025_edxinstallation_coordinates_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailystatistics',
+            name='modified',
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now, help_text='Last time the day statistics were changed.'
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='monthlycountrystatistics',
+            name='modified',
+            field=models.DateTimeField(
+                auto_now=True, default=django.utils.timezone.now,
+                help_text='Last time the month country students were changed.'
+            ),
+            preserve_default=False,
+        ),
+        # Rollups are filled by the raw SQL too, e.g. while the same day statistics migration is applied.
+        migrations.RunSQL(
+            [
+                'ALTER TABLE analytics_dailystatistics ALTER COLUMN modified SET DEFAULT now()',
+                'ALTER TABLE analytics_monthlycountrystatistics ALTER COLUMN modified SET DEFAULT now()',
+            ],
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -1,19 +1,37 @@
 """
 Models for analytics application. Models used to store and operate all data received from the edx platform.
 """
+# pylint: disable=too-many-lines
 
 from __future__ import division
 
-from datetime import date, timedelta
-
-import operator
-import pycountry
+from collections import OrderedDict
+from copy import copy
+from datetime import date, datetime, timedelta
+from functools import reduce
+from operator import or_
 
 from django.contrib.postgres.fields import JSONField
-from django.db import models
-from django.db.models import Sum, Count, DateField
-from django.db.models.expressions import F, Func, Value
-from django.db.models.functions import Trunc
+from django.contrib.postgres.indexes import BrinIndex
+from django.db import connection, models
+from django.db.models import Avg, Sum, Count, DateField, F, IntegerField, Max, Q
+from django.db.models.functions import Cast, Trunc
+from django.utils import timezone
+
+from olga.analytics.countries import get_countries
+from olga.analytics.queries import (
+    ADD_DAILY_STATISTICS_SQL,
+    ADD_MONTHLY_COUNTRY_STATISTICS_SQL,
+    DOWNSAMPLE_STATISTICS_SQL,
+    STUDENTS_PER_COUNTRY_BY_MONTHS_SQL,
+    UPSERT_STATISTICS_SQL,
+)
+
+# Statistics levels, that edX installations send the statistics with.
+STATISTICS_LEVEL_CHOICES = (
+    ('enthusiast', 'enthusiast'),
+    ('paranoid', 'paranoid'),
+)
 
 
 def get_last_calendar_day():
@@ -31,15 +49,61 @@ def get_last_calendar_day():
     return start_of_day, end_of_day
 
 
+def get_statistics_day(statistics_datetime):
+    """
+    Get the calendar day the statistics datetime belongs to, in the same timezone the database truncates it.
+
+    Naive datetimes are treated as already being in the current timezone, as Django does on saving.
+    """
+    if timezone.is_aware(statistics_datetime):
+        statistics_datetime = timezone.localtime(statistics_datetime)
+
+    return statistics_datetime.date()
+
+
+def get_day_start(day):
+    """
+    Get the datetime the calendar day starts at in the current timezone, as the database truncates it.
+
+    Statistics are filtered by the datetime rather than by the truncated date, so the partitions are pruned.
+    """
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def get_statistics_day_start(statistics_datetime):
+    """
+    Get the start of the calendar day the statistics datetime belongs to, that the statistics are saved at.
+    """
+    return get_day_start(get_statistics_day(statistics_datetime))
+
+
+def add_months(month, months):
+    """
+    Get the first day of the month, that is the given amount of months after the given one.
+    """
+    month_index = month.year * 12 + month.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def get_json_number(value):
+    """
+    Cast a decimal summed up from JSON numbers back to the integer or float JSON number.
+    """
+    if value == value.to_integral_value():
+        return int(value)
+
+    return float(value)
+
+
 class EdxInstallation(models.Model):
     """
     Model that stores overall data received from the edx-platform.
     """
 
-    access_token = models.UUIDField(null=True)
+    access_token = models.UUIDField(null=True, unique=True)
     platform_name = models.CharField(max_length=255, null=True, blank=True)
     platform_url = models.URLField(null=True, blank=True)
-    uid = models.CharField(null=True, max_length=32)
+    uid = models.CharField(null=True, max_length=32, unique=True)
 
     latitude = models.FloatField(
         null=True, blank=True, help_text='Latitude coordinate of edX platform follows `float` type. Example: 50.10'
@@ -49,6 +113,12 @@ class EdxInstallation(models.Model):
         null=True, blank=True, help_text='Longitude coordinate of edX platform follows `float` type. Example: 40.05'
     )
 
+    platform_city_name = models.CharField(max_length=255, null=True, blank=True)
+    coordinates_pending = models.BooleanField(
+        default=False, help_text='Coordinates have to be resolved by the platform city name in the background.'
+    )
+    coordinates_attempts = models.IntegerField(default=0, help_text='Amount of failed coordinates resolving attempts.')
+
 
 class InstallationStatistics(models.Model):
     """
@@ -65,10 +135,7 @@ class InstallationStatistics(models.Model):
     data_created_datetime = models.DateTimeField()
     edx_installation = models.ForeignKey(EdxInstallation, on_delete=models.CASCADE)
     statistics_level = models.CharField(
-        choices=(
-            ('enthusiast', 'enthusiast'),
-            ('paranoid', 'paranoid'),
-        ),
+        choices=STATISTICS_LEVEL_CHOICES,
         max_length=255,
         default='paranoid'
     )
@@ -81,6 +148,41 @@ class InstallationStatistics(models.Model):
     )
     unspecified_country_name = 'Country is not specified'
 
+    class Meta:  # pylint: disable=too-few-public-methods
+        """
+        Meta options for InstallationStatistics model.
+
+        Unique installation and date index serves per installation day lookups and history upserts,
+        BRIN index serves date range scans over the whole table, that is physically ordered by the received date.
+        Unique index of the partitioned table can't be built on the truncated day, so statistics are always saved
+        at the start of their day to keep a single statistics per installation and day.
+        """
+
+        unique_together = ('edx_installation', 'data_created_datetime')
+        indexes = [
+            BrinIndex(fields=['data_created_datetime'], name='statistics_created_brin'),
+        ]
+
+    # Overall counter name to the aggregation over the previous calendar day statistics accordance.
+    # A new dashboard counter is added here and gets calculated within the same `overall_counts` query.
+    overall_counters = OrderedDict([
+        ('instances_count', Count('id')),
+        ('courses_count', Sum('courses_amount')),
+        ('students_count', Sum('active_students_amount_day')),
+        ('generated_certificates_count', Sum('generated_certificates')),
+        ('registered_students_count', Sum('registered_students')),
+    ])
+
+    # Fields, that are received with the dates history.
+    history_fields = ('registered_students', 'enthusiastic_students', 'generated_certificates')
+
+    # Fields, that are written by the statistics upsert in its columns order.
+    saved_fields = (
+        'statistics_level', 'registered_students', 'enthusiastic_students', 'generated_certificates',
+        'active_students_amount_day', 'active_students_amount_week', 'active_students_amount_month', 'courses_amount',
+        'students_per_country',
+    )
+
     @staticmethod
     def get_statistics_top_country(tabular_countries_list):
         """
@@ -111,196 +213,261 @@ class InstallationStatistics(models.Model):
         return stat_item
 
     @classmethod
-    def timeline(cls):
+    def save_history(cls, edx_installation_object, dates):
         """
-        Provide timeline in days for plotting on x axis.
+        Save the installation history statistics for many dates at once and update the daily statistics rollup.
+
+        :param edx_installation_object: EdxInstallation instance for current platform.
+        :param dates: dictionary with the statistics datetime as a key and the dictionary with `registered_students`,
+            `enthusiastic_students`, `generated_certificates` and `statistics_level` as a value.
+        :return: tuple with amounts of created and updated statistics.
         """
-        timeline_datetimes = cls.objects.order_by(
-            'data_created_datetime'
-        ).values_list('data_created_datetime', flat=True).distinct()
+        return cls.save_statistics([(edx_installation_object, dates)])
 
-        timeline_dates = [x.date().strftime('%Y-%m-%d') for x in timeline_datetimes]
+    @classmethod
+    def save_statistics(cls, installations_dates):
+        """
+        Save the statistics of many installations and dates at once and update the daily and month country rollups.
+
+        Existing statistics of all the installations for the whole dates range are fetched with one query, then all
+        the dates are written with a single `INSERT ... ON CONFLICT DO UPDATE` query and the rollups are shifted
+        by the summarized changes. As for a single date, the received history values replace the previous ones
+        only if they are not empty, the other received values replace the previous ones. Statistics of the same
+        installation and day are applied in the given order. Statistics of the months, that are already downsampled
+        for the installation by the retention, are skipped.
+
+        :param installations_dates: list of EdxInstallation instance and dates pairs. Dates is a dictionary with
+            the statistics datetime as a key and the dictionary with `statistics_level` and the statistics fields
+            to save as a value.
+        :return: tuple with amounts of created and updated statistics.
+        """
+        if not any(dates for _, dates in installations_dates):
+            return 0, 0
+
+        installations_dates = MonthlyInstallationStatistics.exclude_downsampled_dates([
+            (edx_installation_object, {
+                get_statistics_day_start(statistics_date): stats for statistics_date, stats in dates.items()
+            })
+            for edx_installation_object, dates in installations_dates
+        ])
+        statistics_dates = [statistics_date for _, dates in installations_dates for statistics_date in dates]
+
+        if not statistics_dates:
+            return 0, 0
+
+        previous_stats_per_day = {
+            (stats.edx_installation_id, get_statistics_day(stats.data_created_datetime)): stats
+            for stats in cls.objects.filter(
+                edx_installation__in=set(installation.pk for installation, _ in installations_dates),
+                data_created_datetime__gte=min(statistics_dates),
+                data_created_datetime__lt=max(statistics_dates) + timedelta(days=1),
+            ).order_by('pk').only('edx_installation', 'data_created_datetime', *cls.saved_fields)
+        }
+
+        current_stats_per_day, countries_received_days = cls.merge_statistics(
+            installations_dates, previous_stats_per_day
+        )
 
-        # Support case, when data are sent more often, for example when testing every 15 seconds.
-        # Then filter unique and sort back, because timeline should be ordered.
-        timeline_dates = sorted(set(timeline_dates))
+        cls.upsert_statistics(current_stats_per_day.values())
+        DailyStatistics.apply_statistics_changes(
+            (previous_stats_per_day.get(key), current_stats) for key, current_stats in current_stats_per_day.items()
+        )
+        MonthlyCountryStatistics.apply_statistics_changes(
+            (previous_stats_per_day.get(key), current_stats_per_day[key]) for key in countries_received_days
+        )
 
-        return timeline_dates
+        updated_amount = len(set(previous_stats_per_day) & set(current_stats_per_day))
+        return len(current_stats_per_day) - updated_amount, updated_amount
 
     @classmethod
-    def data_per_period(cls):
+    def merge_statistics(cls, installations_dates, previous_stats_per_day):
         """
-        Provide total students, courses and instances, from all services per period, day by default.
+        Apply the received statistics to the previous ones in the given order.
+
+        :param installations_dates: list of EdxInstallation instance and dates pairs as `save_statistics` takes it.
+        :param previous_stats_per_day: dictionary with the installation id and day pair as a key and the existing
+            InstallationStatistics instance as a value.
+        :return: tuple with the dictionary of the InstallationStatistics instances to save by the installation id
+            and day pairs and the set of the pairs, which students per country were received.
+        """
+        current_stats_per_day = OrderedDict()
+        countries_received_days = set()
+
+        for edx_installation_object, dates in installations_dates:
+            for statistics_date, stats in sorted(dates.items()):
+                key = edx_installation_object.pk, get_statistics_day(statistics_date)
+                previous_stats = current_stats_per_day.get(key) or previous_stats_per_day.get(key)
+                current_stats = copy(previous_stats) if previous_stats else cls(
+                    edx_installation_id=edx_installation_object.pk, data_created_datetime=statistics_date
+                )
+
+                for field, value in stats.items():
+                    if field in cls.history_fields:
+                        value = value or getattr(current_stats, field)
+
+                    setattr(current_stats, field, value)
+
+                current_stats_per_day[key] = current_stats
+
+                if 'students_per_country' in stats:
+                    countries_received_days.add(key)
+
+        return current_stats_per_day, countries_received_days
+
+    @classmethod
+    def upsert_statistics(cls, statistics):
+        """
+        Write the installation statistics with a single `INSERT ... ON CONFLICT DO UPDATE` query.
+
+        :param statistics: InstallationStatistics instances, one per installation and day at most.
+        """
+        params = []
+
+        for stats in statistics:
+            params.extend([stats.edx_installation_id, stats.data_created_datetime])
+            params.extend(
+                cls._meta.get_field(field).get_prep_value(getattr(stats, field)) for field in cls.saved_fields
+            )
+
+        with connection.cursor() as cursor:
+            cursor.execute(UPSERT_STATISTICS_SQL.format(
+                table=cls._meta.db_table,
+                values=', '.join(['({})'.format(', '.join(['%s'] * (len(cls.saved_fields) + 2)))] * len(statistics)),
+            ), params)
+
+    @classmethod
+    def timeline(cls, period_from=None, period_to=None, resolution='day'):
+        """
+        Provide timeline in periods for plotting on x axis, days of the whole history by default.
+
+        Periods are read from the daily statistics rollup, that has exactly one row per day with received statistics.
+
+        :param period_from: first date of the range or None for the history start.
+        :param period_to: last date of the range or None for the history end.
+        :param resolution: one of the `DailyStatistics.resolutions`, every period is labeled by its first day.
+        """
+        periods = DailyStatistics.get_periods(period_from, period_to, resolution).values_list('period', flat=True)
+
+        return [period.strftime('%Y-%m-%d') for period in periods]
 
-        We summarize values per day, because in same day we can receive data from multiple different instances.
-        We suppose, that every instance send data only once per day.
+    @classmethod
+    def data_per_period(cls, period_from=None, period_to=None, resolution='day'):
         """
-        subquery = cls.objects.annotate(
-            date_in_days=Trunc('data_created_datetime', 'day', output_field=DateField())
-        ).values('date_in_days').order_by('date_in_days')
+        Provide total students, courses and instances, from all services per period, day by default.
 
-        students_per_day = subquery.annotate(
-            students=Sum('active_students_amount_day')
-        ).values_list('students', flat=True)
+        Values are summarized per day across all the instances in the daily statistics rollup, because in same day
+        we can receive data from multiple different instances. We suppose, that every instance send data only once
+        per day. For the coarser resolutions daily values are averaged per period.
+        """
+        rows = DailyStatistics.get_periods(period_from, period_to, resolution).values_list(
+            'period_students', 'period_courses', 'period_instances'
+        )
 
-        courses_per_day = subquery.annotate(courses=Sum('courses_amount')).values_list('courses', flat=True)
+        students_per_day, courses_per_day, instances_per_day = [], [], []
 
-        instances_per_day = subquery.annotate(
-            instances=Count('edx_installation__access_token')
-        ).values_list('instances', flat=True)
+        for students, courses, instances in rows:
+            students_per_day.append(students)
+            courses_per_day.append(courses)
+            instances_per_day.append(instances)
 
-        return list(students_per_day), list(courses_per_day), list(instances_per_day)
+        return students_per_day, courses_per_day, instances_per_day
 
     @classmethod
     def overall_counts(cls):
         """
         Provide total count of all instances, courses and students from all instances per previous calendar day.
 
+        All the counters from `overall_counters` are calculated with a single aggregation query.
+
         Returns overall counts as dict.
         {
             "instances_count": <int:instances_count>,
             "courses_count": <int:courses_count>,
             "students_count": <int:students_count>,
             "generated_certificates_count": <int:generated_certificates_count>,
+            "registered_students_count": <int:registered_students_count>,
         }
         """
         start_of_day, end_of_day = get_last_calendar_day()
 
-        all_unique_instances = cls.objects.filter(
+        overall_counts = cls.objects.filter(
             data_created_datetime__gte=start_of_day, data_created_datetime__lt=end_of_day
-        )
-
-        instances_count = all_unique_instances.count()
+        ).aggregate(**cls.overall_counters)
 
-        courses_count = all_unique_instances.aggregate(
-            Sum('courses_amount')
-        )['courses_amount__sum']
-
-        students_count = all_unique_instances.aggregate(
-            Sum('active_students_amount_day')
-        )['active_students_amount_day__sum']
-
-        generated_certificates_count = all_unique_instances.aggregate(
-            Sum('generated_certificates')
-        )['generated_certificates__sum']
-
-        registered_students_count = all_unique_instances.aggregate(
-            Sum('registered_students')
-        )['registered_students__sum']
-
-        return {
-            "instances_count": instances_count or 0,
-            "courses_count": courses_count or 0,
-            "students_count": students_count or 0,
-            "generated_certificates_count": generated_certificates_count or 0,
-            "registered_students_count": registered_students_count or 0,
-        }
+        return {counter: count or 0 for counter, count in overall_counts.items()}
 
     @classmethod
-    def get_charts_data(cls):
+    def get_charts_data(cls, period_from=None, period_to=None, resolution='day'):
         """
         Provide data about certificates and users for chart.
 
-        :return: dict
+        Values are summed per period, day by default, across all the installations in the daily statistics rollup,
+        so the charts are the same for the days, which statistics are downsampled by the retention.
+        Parameters are the same as the `timeline` ones.
+
+        :return: dict ordered by day
         {
-            "19-01-28": [0, 1, 0],
             "19-01-22": [0, 7, 0],
+            "19-01-28": [0, 1, 0],
             "19-01-31": [0, 0, 0],
         }
         """
-        statistics = cls.objects.all()
-
-        charts = dict()
-        for item in statistics:
-            charts[item.data_created_datetime.strftime('%y-%m-%d')] = [
-                item.registered_students,
-                item.generated_certificates,
-                item.enthusiastic_students
-            ]
+        days = DailyStatistics.objects.filter(instances__gt=0)
+
+        if period_from:
+            days = days.filter(day__gte=period_from)
+
+        if period_to:
+            days = days.filter(day__lte=period_to)
+
+        charts_per_day = days.annotate(
+            period=Trunc('day', resolution, output_field=DateField())
+        ).values('period').order_by('period').annotate(
+            registered_students_per_day=Sum('registered_students'),
+            generated_certificates_per_day=Sum('generated_certificates'),
+            enthusiastic_students_per_day=Sum('enthusiastic_students'),
+        ).values_list(
+            'period', 'registered_students_per_day', 'generated_certificates_per_day', 'enthusiastic_students_per_day'
+        )
 
-        return charts
+        return OrderedDict(
+            (day.strftime('%y-%m-%d'), [registered_students, generated_certificates, enthusiastic_students])
+            for day, registered_students, generated_certificates, enthusiastic_students in charts_per_day
+        )
 
     @classmethod
     def get_students_per_country_stats(cls):
         """
         Total of students amount per country to display on world map from all instances per month.
 
-        Returns:
-            world_students_per_country (dict): Country-count accordance as pair of key-value.
-        """
-        # Get list of instances's students per country data as unicode strings.
-        queryset = cls.objects.annotate(
-            month_verbose=Func(
-                F('data_created_datetime'), Value('TMMonth YYYY'), function='to_char'
-            ),
-            month_ordering=Func(
-                F('data_created_datetime'), Value('YYYY-MM'), function='to_char'
-            ),
-        )
-        result_rows = queryset.values_list(
-            'month_ordering', 'month_verbose', 'students_per_country'
-        )
-
-        return cls.aggregate_countries_by_months(result_rows)
-
-    @classmethod
-    def aggregate_countries_by_months(cls, values_list):
-        """
-        Aggregate all the months and countries data by the month.
+        Countries JSON objects are expanded and summed per month and country inside the database,
+        so the result size is bounded by months and countries amount rather than by the statistics rows amount.
+        Months, that have statistics without any country data, are present with empty countries.
 
-        :param values_list: list queryset result with three elements for every row
-        :return: dictionary of months with the student countries statistics
+        Returns:
+            months (dict): Month ordering key to the month label and country-count accordance. Example:
+                {'2017-06': {'label': 'June 2017', 'countries': {'RU': 2632, 'CA': 18543}}}
         """
         months = {}
 
-        for month_ordering, month_verbose, countries in values_list:
-            cls.add_month_countries_data(
-                month_ordering, month_verbose, countries, months
-            )
+        with connection.cursor() as cursor:
+            cursor.execute(STUDENTS_PER_COUNTRY_BY_MONTHS_SQL.format(table=cls._meta.db_table))
 
-        return months
-
-    @classmethod
-    def add_month_countries_data(
-            cls, month_ordering, month_verbose, countries, months
-    ):
-        """
-        Add a month data to the months dictionary.
-
-        :param month_ordering: sortable date key represented as a string
-        :param month_verbose: human friendly date represented as a string
-        :param countries: dictionary of countries where the key is the country code and
-            the value is the amount of the students
-        :param months: dictionary that needs to be updated by the data, passed to the method
-        """
-        if month_ordering not in months:
-            months[month_ordering] = {
-                'countries': countries,
-                'label': month_verbose,
-            }
-            return
-
-        cls.add_up_new_month_data(months[month_ordering]['countries'], countries)
-
-    @classmethod
-    def add_up_new_month_data(cls, existing_data, new_data):
-        """
-        Add a new month data to the resulting data dictionary.
+            for month_ordering, month_verbose, country, students_amount in cursor:
+                month = months.setdefault(month_ordering, {'countries': {}, 'label': month_verbose})
 
-        Adds the counts from the new countries data dictionary to the existing ones or adds
-        new countries if the don't exist in the existing_data
-        """
-        for existent_key in existing_data.keys():
-            existing_data[existent_key] += new_data.pop(existent_key, 0)
+                if country is not None:
+                    month['countries'][country] = get_json_number(students_amount)
 
-        existing_data.update(new_data)
+        return months
 
     @classmethod
     def create_students_per_country(cls, worlds_students_per_country):
         """
         Create convenient and necessary data formats to render it from view.
 
-        Graphs require list-format data.
+        Graphs require list-format data. Datamap and tabular lists are filled in a single pass with the countries
+        looked up in the table built once per process, unknown country codes are summed up as the unspecified country.
         """
         datamap_format_countries_list = []
         tabular_format_countries_map = {}
@@ -310,31 +477,25 @@ class InstallationStatistics(models.Model):
             return datamap_format_countries_list, list(tabular_format_countries_map.items())
 
         all_active_students = sum(worlds_students_per_country.values())
+        countries = get_countries()
+        unspecified_country_values = None
 
         for country, count in worlds_students_per_country.items():
             student_amount_percentage = cls.get_student_amount_percentage(count, all_active_students)
+            country_info = countries.get(country)
 
-            try:
-                country_info = pycountry.countries.get(alpha_2=country)
-                country_alpha_3 = country_info.alpha_3
-                datamap_format_countries_list += [[country_alpha_3, count]]
-
-                country_name = country_info.name
-            except KeyError:
+            if country_info is None:
                 # Create students without country amount.
-                country_name = cls.unspecified_country_name
+                if unspecified_country_values is None:
+                    unspecified_country_values = [0, 0]
 
-            if country_name in tabular_format_countries_map:
-                tabular_format_countries_map[country_name] = list(map(
-                    operator.add,
-                    tabular_format_countries_map[country_name],
-                    [count, student_amount_percentage]
-                ))
-            else:
-                tabular_format_countries_map[country_name] = [count, student_amount_percentage]
+                unspecified_country_values[0] += count
+                unspecified_country_values[1] += student_amount_percentage
+                continue
 
-        # Pop out the unspecified country
-        unspecified_country_values = tabular_format_countries_map.pop(cls.unspecified_country_name, None)
+            country_alpha_3, country_name = country_info
+            datamap_format_countries_list.append([country_alpha_3, count])
+            tabular_format_countries_map[country_name] = [count, student_amount_percentage]
 
         # Sort in descending order.
         tabular_format_countries_list = sorted(
@@ -353,8 +514,10 @@ class InstallationStatistics(models.Model):
     def get_students_per_country(cls):
         """
         Gather convenient and necessary data formats to render it from view.
+
+        Months are read from the pre-aggregated monthly country statistics.
         """
-        months = cls.get_students_per_country_stats()
+        months = MonthlyCountryStatistics.get_months()
 
         for month in months.values():
             datamap_list, tabular_list = cls.create_students_per_country(month['countries'])
@@ -399,6 +562,13 @@ class InstallationStatistics(models.Model):
 
         return countries_amount
 
+    def save(self, *args, **kwargs):  # pylint: disable=arguments-differ
+        """
+        Save the statistics at the start of their day, so there is a single statistics per installation and day.
+        """
+        self.data_created_datetime = get_statistics_day_start(self.data_created_datetime)
+        super(InstallationStatistics, self).save(*args, **kwargs)
+
     def update(self, stats):
         """
         Update model from given dictionary and save it.
@@ -408,3 +578,466 @@ class InstallationStatistics(models.Model):
         for (key, value) in stats.items():
             setattr(self, key, value)
         self.save()
+
+
+class DailyStatistics(models.Model):
+    """
+    Model that stores statistics of all the edx installations summarized per day.
+
+    It is a rollup of the InstallationStatistics table, that is maintained incrementally while statistics are received,
+    so charts do not need to scan and group the whole statistics history.
+    """
+
+    day = models.DateField(unique=True)
+    students = models.IntegerField(default=0)
+    courses = models.IntegerField(default=0)
+    instances = models.IntegerField(default=0)
+    registered_students = models.IntegerField(default=0)
+    enthusiastic_students = models.IntegerField(default=0)
+    generated_certificates = models.IntegerField(default=0)
+    modified = models.DateTimeField(auto_now=True, help_text='Last time the day statistics were changed.')
+
+    # Rollup field to the summarized InstallationStatistics field accordance.
+    summarized_fields = (
+        ('students', 'active_students_amount_day'),
+        ('courses', 'courses_amount'),
+        ('registered_students', 'registered_students'),
+        ('enthusiastic_students', 'enthusiastic_students'),
+        ('generated_certificates', 'generated_certificates'),
+    )
+
+    # Chart data resolutions, that are the Trunc function kinds.
+    resolutions = ('day', 'week', 'month', 'quarter')
+
+    @classmethod
+    def get_periods(cls, period_from=None, period_to=None, resolution='day'):
+        """
+        Provide rollup values per period of the resolution within the date range, ordered by period.
+
+        Daily values are averaged for the coarser resolutions, so a period is comparable to a day.
+
+        :return: queryset with `period` first day date, `period_students`, `period_courses`
+            and `period_instances` values.
+        """
+        days = cls.objects.filter(instances__gt=0)
+
+        if period_from:
+            days = days.filter(day__gte=period_from)
+
+        if period_to:
+            days = days.filter(day__lte=period_to)
+
+        if resolution == 'day':
+            return days.order_by('day').values(
+                period=F('day'), period_students=F('students'), period_courses=F('courses'),
+                period_instances=F('instances'),
+            )
+
+        return days.annotate(
+            period=Trunc('day', resolution, output_field=DateField())
+        ).values('period').order_by('period').annotate(
+            period_students=Cast(Avg('students'), IntegerField()),
+            period_courses=Cast(Avg('courses'), IntegerField()),
+            period_instances=Cast(Avg('instances'), IntegerField()),
+        )
+
+    @classmethod
+    def get_statistics_changes(cls, previous_stats, current_stats):
+        """
+        Get the rollup fields difference between previous and current installation statistics.
+
+        :param previous_stats: InstallationStatistics instance state before the change or None if it is a new one.
+        :param current_stats: InstallationStatistics instance state after the change.
+        :return: dictionary with the rollup field as a key and the value to add as a value.
+        """
+        changes = {
+            rollup_field: (getattr(current_stats, field) or 0) - (getattr(previous_stats, field, 0) or 0)
+            for rollup_field, field in cls.summarized_fields
+        }
+        changes['instances'] = 0 if previous_stats else 1
+
+        return changes
+
+    @classmethod
+    def apply_statistics_change(cls, previous_stats, current_stats):
+        """
+        Shift the day rollup by the difference between previous and current installation statistics.
+
+        :param previous_stats: InstallationStatistics instance state before the change or None if it is a new one.
+        :param current_stats: InstallationStatistics instance state after the change.
+        """
+        cls.apply_statistics_changes([(previous_stats, current_stats)])
+
+    @classmethod
+    def apply_statistics_changes(cls, statistics_changes):
+        """
+        Shift the days rollup by the summarized difference between previous and current installation statistics.
+
+        :param statistics_changes: InstallationStatistics instance states before and after the change pairs,
+            state before the change is None for a new one.
+        """
+        days = {}
+
+        for previous_stats, current_stats in statistics_changes:
+            day_changes = days.setdefault(get_statistics_day(current_stats.data_created_datetime), {})
+
+            for field, value in cls.get_statistics_changes(previous_stats, current_stats).items():
+                day_changes[field] = day_changes.get(field, 0) + value
+
+        cls.add_statistics({day: changes for day, changes in days.items() if any(changes.values())})
+
+    @classmethod
+    def add_statistics(cls, days):
+        """
+        Add values to the days rollup with a single upsert query.
+
+        :param days: dictionary with the day date or a statistics datetime within the day as a key
+            and the rollup field to value to add accordance as a value.
+        """
+        if not days:
+            return
+
+        statistics_days = {}
+
+        for day, changes in days.items():
+            day_changes = statistics_days.setdefault(
+                get_statistics_day(day) if isinstance(day, datetime) else day, {}
+            )
+
+            for field, value in changes.items():
+                day_changes[field] = day_changes.get(field, 0) + value
+
+        days = statistics_days
+
+        fields = ['instances'] + [rollup_field for rollup_field, _ in cls.summarized_fields]
+        values = ', '.join(['({})'.format(', '.join(['%s'] * (len(fields) + 2)))] * len(days))
+        params = []
+        modified = timezone.now()
+
+        for day, changes in sorted(days.items()):
+            params.append(day)
+            params.extend(changes.get(field, 0) for field in fields)
+            params.append(modified)
+
+        with connection.cursor() as cursor:
+            cursor.execute(ADD_DAILY_STATISTICS_SQL.format(
+                table=cls._meta.db_table,
+                fields=', '.join(fields),
+                values=values,
+                updates=', '.join('{0} = daily.{0} + EXCLUDED.{0}'.format(field) for field in fields),
+            ), params)
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recalculate the rollup from the installation statistics table.
+
+        Days of the months downsampled by the retention don't have the installation statistics anymore,
+        so they are kept as they are.
+        """
+        days = InstallationStatistics.objects.annotate(
+            day=Trunc('data_created_datetime', 'day', output_field=DateField())
+        ).values('day').order_by('day').annotate(
+            instances=Count('id'),
+            **{rollup_field: Sum(field) for rollup_field, field in cls.summarized_fields}
+        )
+        rebuilt_days = cls.objects.all()
+        downsampled_until = MonthlyInstallationStatistics.get_downsampled_until()
+
+        if downsampled_until:
+            days = days.filter(day__gte=downsampled_until)
+            rebuilt_days = rebuilt_days.filter(day__gte=downsampled_until)
+
+        rebuilt_days.delete()
+        cls.objects.bulk_create(cls(**day) for day in days)
+
+
+class MonthlyCountryStatistics(models.Model):
+    """
+    Model that stores students amount per country of all the edx installations summarized per month.
+
+    It is maintained incrementally while statistics are received, so the world map does not need to aggregate
+    the students per country JSON of every statistics row.
+    """
+
+    month = models.DateField(help_text='First day of the month.')
+    country = models.CharField(max_length=255, help_text='Country code as it is received. Example: RU')
+    students = models.IntegerField(default=0)
+    modified = models.DateTimeField(auto_now=True, help_text='Last time the month country students were changed.')
+
+    class Meta:  # pylint: disable=too-few-public-methods
+        """
+        Meta options for MonthlyCountryStatistics model.
+        """
+
+        unique_together = ('month', 'country')
+
+    @classmethod
+    def apply_statistics_change(cls, previous_stats, current_stats):
+        """
+        Shift the month country counts by the difference between previous and current installation statistics.
+
+        :param previous_stats: InstallationStatistics instance state before the change or None if it is a new one.
+        :param current_stats: InstallationStatistics instance state after the change.
+        """
+        cls.apply_statistics_changes([(previous_stats, current_stats)])
+
+    @classmethod
+    def apply_statistics_changes(cls, statistics_changes):
+        """
+        Shift the month country counts by the summarized difference between previous and current statistics.
+
+        Countries from the current statistics are stored even if their amount did not change,
+        so a month with countries reported with zero students is still shown. Countries, that are not reported
+        anymore, are removed from the month if no students are left there.
+
+        :param statistics_changes: InstallationStatistics instance states before and after the change pairs,
+            state before the change is None for a new one.
+        """
+        month_changes = {}
+        reported_countries = set()
+        removed_countries = set()
+
+        for previous_stats, current_stats in statistics_changes:
+            previous_countries = getattr(previous_stats, 'students_per_country', None) or {}
+            current_countries = current_stats.students_per_country or {}
+            month = get_statistics_day(current_stats.data_created_datetime).replace(day=1)
+
+            for country in set(previous_countries) | set(current_countries):
+                change = int(current_countries.get(country, 0)) - int(previous_countries.get(country, 0))
+
+                if change or country in current_countries:
+                    month_changes[month, country] = month_changes.get((month, country), 0) + change
+
+            reported_countries.update((month, country) for country in current_countries)
+            removed_countries.update((month, country) for country in set(previous_countries) - set(current_countries))
+
+        if not month_changes:
+            return
+
+        cls.add_students(month_changes)
+        removed_countries -= reported_countries
+
+        if removed_countries:
+            cls.objects.filter(
+                reduce(or_, (Q(month=month, country=country) for month, country in removed_countries)), students=0
+            ).delete()
+
+    @classmethod
+    def add_students(cls, month_countries):
+        """
+        Add students amounts to the month countries with a single upsert query.
+
+        :param month_countries: dictionary with the first day of the month and the country code pair as a key
+            and the students amount to add as a value.
+        """
+        values = ', '.join(['(%s, %s, %s, %s)'] * len(month_countries))
+        params = []
+        modified = timezone.now()
+
+        for (month, country), students in sorted(month_countries.items()):
+            params.extend([month, country, students, modified])
+
+        with connection.cursor() as cursor:
+            cursor.execute(ADD_MONTHLY_COUNTRY_STATISTICS_SQL.format(table=cls._meta.db_table, values=values), params)
+
+    @classmethod
+    def get_months(cls):
+        """
+        Provide students amount per country for every month.
+
+        Months, that have statistics without any country data, are taken from the days rollup
+        and are present with empty countries.
+
+        Returns:
+            months (dict): Month ordering key to the month label and country-count accordance. Example:
+                {'2017-06': {'label': 'June 2017', 'countries': {'RU': 2632, 'CA': 18543}}}
+        """
+        months = {
+            month.strftime('%Y-%m'): {'countries': {}, 'label': month.strftime('%B %Y')}
+            for month in DailyStatistics.objects.filter(instances__gt=0).dates('day', 'month')
+        }
+
+        for month, country, students in cls.objects.values_list('month', 'country', 'students'):
+            month_data = months.setdefault(
+                month.strftime('%Y-%m'), {'countries': {}, 'label': month.strftime('%B %Y')}
+            )
+            month_data['countries'][country] = students
+
+        return months
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recalculate all the months from the installation statistics table and the downsampled monthly statistics.
+        """
+        cls.objects.all().delete()
+        month_countries = {}
+
+        for month_ordering, month in InstallationStatistics.get_students_per_country_stats().items():
+            for country, students in month['countries'].items():
+                month_countries[datetime.strptime(month_ordering, '%Y-%m').date(), country] = students
+
+        for month, countries in MonthlyInstallationStatistics.get_students_per_country_stats().items():
+            for country, students in countries.items():
+                month_countries[month, country] = month_countries.get((month, country), 0) + students
+
+        if month_countries:
+            cls.add_students(month_countries)
+
+
+class MonthlyInstallationStatistics(models.Model):
+    """
+    Model that stores statistics of the edx installation summarized per month.
+
+    Installation statistics older than the retention period are downsampled to the monthly statistics by the
+    `downsample_statistics` command. Numeric values are summed up, so they can be averaged by the amount of days.
+    The daily and monthly country statistics are kept as they are, so the charts and the world map don't change.
+    """
+
+    edx_installation = models.ForeignKey(EdxInstallation, on_delete=models.CASCADE)
+    month = models.DateField(help_text='First day of the month.')
+    days = models.IntegerField(default=0, help_text='Amount of the summarized installation statistics.')
+    first_data_created_datetime = models.DateTimeField()
+    last_data_created_datetime = models.DateTimeField()
+    active_students_amount_day = models.BigIntegerField(default=0)
+    active_students_amount_week = models.BigIntegerField(default=0)
+    active_students_amount_month = models.BigIntegerField(default=0)
+    courses_amount = models.BigIntegerField(default=0)
+    registered_students = models.BigIntegerField(default=0)
+    enthusiastic_students = models.BigIntegerField(default=0)
+    generated_certificates = models.BigIntegerField(default=0)
+    students_per_country = JSONField(
+        default=dict, blank=True, help_text='Students country-count accordance summed up for the month.'
+    )
+
+    class Meta:  # pylint: disable=too-few-public-methods
+        """
+        Meta options for MonthlyInstallationStatistics model.
+        """
+
+        unique_together = ('edx_installation', 'month')
+
+    # InstallationStatistics fields, that are summed up per month.
+    summarized_fields = (
+        'active_students_amount_day',
+        'active_students_amount_week',
+        'active_students_amount_month',
+        'courses_amount',
+        'registered_students',
+        'enthusiastic_students',
+        'generated_certificates',
+    )
+
+    @classmethod
+    def downsample(cls, before, batch_size):
+        """
+        Move a batch of the oldest installation statistics before the datetime to the monthly statistics.
+
+        Statistics rows, that are locked by the other transactions, are skipped, so the batch can be run concurrently.
+
+        :return: amount of the downsampled installation statistics.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(DOWNSAMPLE_STATISTICS_SQL.format(
+                statistics=InstallationStatistics._meta.db_table,  # pylint: disable=protected-access
+                summaries=cls._meta.db_table,
+                fields=', '.join(cls.summarized_fields),
+                sums=', '.join('SUM(downsampled.{})'.format(field) for field in cls.summarized_fields),
+                updates=', '.join('{0} = summary.{0} + EXCLUDED.{0}'.format(field) for field in cls.summarized_fields),
+            ), {'before': before, 'batch_size': batch_size})
+
+            return cursor.fetchone()[0]
+
+    @classmethod
+    def exclude_downsampled_dates(cls, installations_dates):
+        """
+        Exclude the statistics dates of the months, that are already downsampled for the installations.
+
+        :param installations_dates: list of EdxInstallation instance and dates pairs, dates is a dictionary with
+            the aware statistics datetime as a key, some dates should be given.
+        :return: list of EdxInstallation instance and dates of the not downsampled months only pairs.
+        """
+        downsampled_months = set(cls.objects.filter(
+            edx_installation__in=set(installation.pk for installation, _ in installations_dates),
+            month__gte=get_statistics_day(min(min(dates) for _, dates in installations_dates if dates)).replace(day=1),
+        ).values_list('edx_installation', 'month'))
+
+        return [
+            (edx_installation_object, {
+                statistics_date: stats for statistics_date, stats in dates.items()
+                if (edx_installation_object.pk, get_statistics_day(statistics_date).replace(day=1))
+                not in downsampled_months
+            })
+            for edx_installation_object, dates in installations_dates
+        ]
+
+    @classmethod
+    def get_downsampled_until(cls):
+        """
+        Get the first day after the last downsampled month or None if nothing is downsampled.
+        """
+        last_month = cls.objects.aggregate(Max('month'))['month__max']
+        return last_month and add_months(last_month, 1)
+
+    @classmethod
+    def get_students_per_country_stats(cls):
+        """
+        Get total of students amount per country of all the installations per downsampled month.
+
+        :return: dict with the first day of the month as a key and the country-count accordance as a value.
+        """
+        months = {}
+
+        for month, students_per_country in cls.objects.values_list('month', 'students_per_country'):
+            countries = months.setdefault(month, {})
+
+            for country, students_amount in students_per_country.items():
+                countries[country] = countries.get(country, 0) + students_amount
+
+        return months
+
+
+class ReceivedStatistics(models.Model):
+    """
+    Model that stores raw statistics reports accepted from the edx-platform, but not processed yet.
+
+    Reports are queued here when asynchronous ingestion is enabled and are applied in batches
+    by the `process_statistics_queue` management command.
+    """
+
+    access_token = models.UUIDField()
+    payload = JSONField(help_text='Received statistics as they were posted by the edx-platform.')
+    received_datetime = models.DateTimeField(default=timezone.now)
+    attempts = models.IntegerField(default=0, help_text='Amount of failed processing attempts.')
+    error = models.TextField(blank=True, help_text='Last processing error.')
+
+
+class GeocodedCity(models.Model):
+    """
+    Model that caches coordinates of the platform city names received from the geocoding service.
+
+    City without coordinates is a negative cache entry, that means the city was not found.
+    """
+
+    city_name = models.CharField(max_length=255, unique=True, help_text='Normalized city name. Example: kiev')
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    updated_datetime = models.DateTimeField(default=timezone.now)
+
+    @staticmethod
+    def normalize_city_name(city_name):
+        """
+        Normalize city name, so different spelling cases of the same city share the cache entry.
+        """
+        return ' '.join(city_name.split()).lower()
+
+    def is_expired(self, ttl, negative_ttl):
+        """
+        Check if the cache entry is outdated.
+
+        :param ttl: time to live of the found city as timedelta.
+        :param negative_ttl: time to live of the not found city as timedelta.
+        """
+        found = self.latitude is not None and self.longitude is not None
+        return self.updated_datetime + (ttl if found else negative_ttl) < timezone.now()
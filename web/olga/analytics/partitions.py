@@ -0,0 +1,138 @@
+"""
+Monthly partitions of the installation statistics table.
+
+Statistics table is partitioned by the calendar months in UTC. Statistics of the months without partitions are kept
+by the default partition, they are moved to the partition, when it is created for their month.
+"""
+
+from datetime import date, datetime
+import re
+
+from django.db import connection
+from django.utils import timezone
+
+from olga.analytics.models import InstallationStatistics, add_months
+
+STATISTICS_TABLE = InstallationStatistics._meta.db_table  # pylint: disable=protected-access
+
+PARTITIONS_SQL = '''
+    SELECT partition.relname
+    FROM pg_inherits
+    JOIN pg_class AS partition ON partition.oid = pg_inherits.inhrelid
+    WHERE pg_inherits.inhparent = %s::regclass
+'''
+
+DEFAULT_PARTITION_MONTHS_SQL = '''
+    SELECT DISTINCT date_trunc('month', data_created_datetime AT TIME ZONE 'UTC')::date FROM {default_partition}
+'''
+
+# Partition is attached after the month statistics are moved to it, because the default partition can't keep
+# statistics of the attached partition range.
+CREATE_PARTITION_SQL = '''
+    CREATE TABLE {partition} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS);
+    WITH month_statistics AS (
+        DELETE FROM {default_partition}
+        WHERE data_created_datetime >= %(start)s AND data_created_datetime < %(end)s
+        RETURNING *
+    )
+    INSERT INTO {partition} SELECT * FROM month_statistics;
+    ALTER TABLE {table} ATTACH PARTITION {partition} FOR VALUES FROM (%(start)s) TO (%(end)s);
+'''
+
+# Foreign keys of the archived partition are dropped, so the installations are still removed without it.
+ARCHIVE_PARTITION_SQL = '''
+    ALTER TABLE {table} DETACH PARTITION {partition};
+    ALTER TABLE {partition} RENAME TO {archive};
+    DO $$
+    DECLARE foreign_key record;
+    BEGIN
+        FOR foreign_key IN SELECT conname FROM pg_constraint WHERE conrelid = '{archive}'::regclass AND contype = 'f'
+        LOOP
+            EXECUTE format('ALTER TABLE {archive} DROP CONSTRAINT %I', foreign_key.conname);
+        END LOOP;
+    END $$;
+'''
+
+
+def get_partition_name(month):
+    """
+    Get the name of the statistics table partition, that keeps the month statistics.
+    """
+    return '{table}_y{month:%Y}m{month:%m}'.format(table=STATISTICS_TABLE, month=month)
+
+
+def get_default_partition_name():
+    """
+    Get the name of the statistics table partition, that keeps statistics of the months without partitions.
+    """
+    return '{}_default'.format(STATISTICS_TABLE)
+
+
+def get_partition_months():
+    """
+    Get the sorted months, that have the statistics table partitions.
+    """
+    partition_name_pattern = re.compile(r'^{}_y(\d{{4}})m(\d{{2}})$'.format(STATISTICS_TABLE))
+
+    with connection.cursor() as cursor:
+        cursor.execute(PARTITIONS_SQL, [STATISTICS_TABLE])
+        partition_names = [row[0] for row in cursor.fetchall()]
+
+    return sorted(
+        date(int(match.group(1)), int(match.group(2)), 1)
+        for match in map(partition_name_pattern.match, partition_names) if match
+    )
+
+
+def get_default_partition_months():
+    """
+    Get the months, that have statistics in the default partition.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(DEFAULT_PARTITION_MONTHS_SQL.format(
+            default_partition=connection.ops.quote_name(get_default_partition_name())
+        ))
+        return sorted(row[0] for row in cursor.fetchall())
+
+
+def create_partition(month):
+    """
+    Create the statistics table partition for the month, moving the month statistics out of the default partition.
+
+    :return: True if the partition is created or False if it already exists.
+    """
+    if month in get_partition_months():
+        return False
+
+    start, end = (
+        datetime(bound.year, bound.month, 1, tzinfo=timezone.utc) for bound in (month, add_months(month, 1))
+    )
+
+    with connection.cursor() as cursor:
+        cursor.execute(CREATE_PARTITION_SQL.format(
+            table=connection.ops.quote_name(STATISTICS_TABLE),
+            partition=connection.ops.quote_name(get_partition_name(month)),
+            default_partition=connection.ops.quote_name(get_default_partition_name()),
+        ), {'start': start, 'end': end})
+
+    return True
+
+
+def archive_partition(month):
+    """
+    Detach the statistics table partition of the month and keep it as a standalone archive table.
+
+    Archived statistics are not provided by the model anymore, archive table can be dumped and dropped.
+
+    :return: name of the archive table.
+    """
+    archive_name = '{table}_archive_y{month:%Y}m{month:%m}'.format(table=STATISTICS_TABLE, month=month)
+
+    with connection.cursor() as cursor:
+        cursor.execute(ARCHIVE_PARTITION_SQL.format(
+            table=connection.ops.quote_name(STATISTICS_TABLE),
+            partition=connection.ops.quote_name(get_partition_name(month)),
+            archive=archive_name,
+        ))
+
+    return archive_name
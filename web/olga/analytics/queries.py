@@ -0,0 +1,123 @@
+"""
+Raw SQL queries of the analytics models, that can't be expressed with the ORM or are too slow with it.
+
+Queries are formatted with the quoted table names, the values are passed as the query parameters.
+"""
+
+STUDENTS_PER_COUNTRY_BY_MONTHS_SQL = '''
+    SELECT
+        to_char(statistics.data_created_datetime, 'YYYY-MM'),
+        to_char(statistics.data_created_datetime, 'TMMonth YYYY'),
+        country.key,
+        SUM(country.value::text::numeric)
+    FROM {table} AS statistics
+    LEFT JOIN LATERAL jsonb_each(
+        CASE WHEN jsonb_typeof(statistics.students_per_country) = 'object' THEN statistics.students_per_country END
+    ) AS country ON jsonb_typeof(country.value) = 'number'
+    GROUP BY 1, 2, 3
+'''
+
+ADD_DAILY_STATISTICS_SQL = '''
+    INSERT INTO {table} AS daily (day, {fields}, modified)
+    VALUES {values}
+    ON CONFLICT (day) DO UPDATE SET {updates}, modified = EXCLUDED.modified
+'''
+
+UPSERT_STATISTICS_SQL = '''
+    INSERT INTO {table} AS statistics (
+        edx_installation_id, data_created_datetime, statistics_level,
+        registered_students, enthusiastic_students, generated_certificates,
+        active_students_amount_day, active_students_amount_week, active_students_amount_month, courses_amount,
+        students_per_country
+    )
+    VALUES {values}
+    ON CONFLICT (edx_installation_id, data_created_datetime) DO UPDATE SET
+        statistics_level = EXCLUDED.statistics_level,
+        registered_students = EXCLUDED.registered_students,
+        enthusiastic_students = EXCLUDED.enthusiastic_students,
+        generated_certificates = EXCLUDED.generated_certificates,
+        active_students_amount_day = EXCLUDED.active_students_amount_day,
+        active_students_amount_week = EXCLUDED.active_students_amount_week,
+        active_students_amount_month = EXCLUDED.active_students_amount_month,
+        courses_amount = EXCLUDED.courses_amount,
+        students_per_country = EXCLUDED.students_per_country
+'''
+
+ADD_MONTHLY_COUNTRY_STATISTICS_SQL = '''
+    INSERT INTO {table} AS monthly (month, country, students, modified)
+    VALUES {values}
+    ON CONFLICT (month, country) DO UPDATE SET students = monthly.students + EXCLUDED.students,
+        modified = EXCLUDED.modified
+'''
+
+# Statistics are deleted and summarized within the same query, so a batch is either downsampled as a whole or not.
+DOWNSAMPLE_STATISTICS_SQL = '''
+    WITH downsampled AS (
+        DELETE FROM {statistics}
+        WHERE data_created_datetime < %(before)s AND id IN (
+            SELECT id FROM {statistics}
+            WHERE data_created_datetime < %(before)s
+            ORDER BY data_created_datetime
+            LIMIT %(batch_size)s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING *, date_trunc('month', data_created_datetime)::date AS month
+    ),
+    countries AS (
+        SELECT
+            downsampled.edx_installation_id,
+            downsampled.month,
+            country.key,
+            SUM(country.value::text::numeric) AS students
+        FROM downsampled
+        CROSS JOIN LATERAL jsonb_each(
+            CASE WHEN jsonb_typeof(downsampled.students_per_country) = 'object'
+            THEN downsampled.students_per_country END
+        ) AS country
+        WHERE jsonb_typeof(country.value) = 'number'
+        GROUP BY 1, 2, 3
+    ),
+    summarized AS (
+        INSERT INTO {summaries} AS summary (
+            edx_installation_id, month, days, first_data_created_datetime, last_data_created_datetime,
+            {fields}, students_per_country
+        )
+        SELECT
+            downsampled.edx_installation_id,
+            downsampled.month,
+            COUNT(*),
+            MIN(downsampled.data_created_datetime),
+            MAX(downsampled.data_created_datetime),
+            {sums},
+            COALESCE((
+                SELECT jsonb_object_agg(countries.key, countries.students)
+                FROM countries
+                WHERE countries.edx_installation_id = downsampled.edx_installation_id
+                    AND countries.month = downsampled.month
+            ), '{{}}')
+        FROM downsampled
+        GROUP BY downsampled.edx_installation_id, downsampled.month
+        ON CONFLICT (edx_installation_id, month) DO UPDATE SET
+            days = summary.days + EXCLUDED.days,
+            first_data_created_datetime = LEAST(
+                summary.first_data_created_datetime, EXCLUDED.first_data_created_datetime
+            ),
+            last_data_created_datetime = GREATEST(
+                summary.last_data_created_datetime, EXCLUDED.last_data_created_datetime
+            ),
+            {updates},
+            students_per_country = (
+                SELECT COALESCE(jsonb_object_agg(country.key, country.students), '{{}}')
+                FROM (
+                    SELECT country.key, SUM(country.value::text::numeric) AS students
+                    FROM (
+                        SELECT * FROM jsonb_each(summary.students_per_country)
+                        UNION ALL
+                        SELECT * FROM jsonb_each(EXCLUDED.students_per_country)
+                    ) AS country
+                    GROUP BY country.key
+                ) AS country
+            )
+    )
+    SELECT COUNT(*) FROM downsampled
+'''
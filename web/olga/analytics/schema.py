@@ -0,0 +1,136 @@
+"""
+Schema of the received edX installation statistics.
+
+Only the fields of the received statistics level are validated, field by field in a single pass, and the typed
+values are returned, so neither forms nor model instances are built for every received report.
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+import json
+import re
+
+from django import forms
+from django.core.exceptions import ValidationError
+
+from olga.analytics.models import STATISTICS_LEVEL_CHOICES
+
+# History dates format, that is parsed without `strptime`, which is the slowest part of the history validation.
+DATE_RE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})$')
+
+# Range of the PostgreSQL integer, that the statistics amounts are stored as.
+INTEGER_RANGE = {'min_value': -2 ** 31, 'max_value': 2 ** 31 - 1}
+
+
+class JSONCountsField(forms.Field):
+    """
+    JSON object with integer values, e.g. students per country or the amounts per history date.
+
+    Already decoded objects are accepted as they are.
+    """
+
+    default_error_messages = {
+        'invalid': 'Enter a JSON object with integer values.',
+        'invalid_key': 'Enter a JSON object with dates in YYYY-MM-DD format as the keys.',
+    }
+
+    def __init__(self, date_keys=False, **kwargs):
+        """
+        Initialize the field, that isn't required by default.
+
+        :param date_keys: parse the keys to datetimes of the dates in YYYY-MM-DD format.
+        """
+        kwargs.setdefault('required', False)
+        super(JSONCountsField, self).__init__(**kwargs)
+        self.date_keys = date_keys
+
+    def to_python(self, value):
+        """
+        Decode the JSON object and parse its keys, an empty object is returned for the empty value.
+        """
+        if value in self.empty_values:
+            return {}
+
+        if isinstance(value, (str, bytes)):
+            try:
+                value = json.loads(value)
+            except ValueError as error:
+                raise ValidationError(self.error_messages['invalid'], code='invalid') from error
+
+        is_counts = isinstance(value, dict) and all(
+            isinstance(count, int) and not isinstance(count, bool) for count in value.values()
+        )
+
+        if not is_counts:
+            raise ValidationError(self.error_messages['invalid'], code='invalid')
+
+        if not self.date_keys:
+            return value
+
+        dates = {}
+
+        for key, count in value.items():
+            match = DATE_RE.match(key)
+
+            try:
+                dates[datetime(*map(int, match.groups()))] = count
+            except (AttributeError, ValueError) as error:
+                raise ValidationError(self.error_messages['invalid_key'], code='invalid_key') from error
+
+        return dates
+
+
+PARANOID_FIELDS = OrderedDict([
+    ('access_token', forms.UUIDField()),
+    ('statistics_level', forms.ChoiceField(choices=STATISTICS_LEVEL_CHOICES)),
+    ('active_students_amount_day', forms.IntegerField(**INTEGER_RANGE)),
+    ('active_students_amount_week', forms.IntegerField(**INTEGER_RANGE)),
+    ('active_students_amount_month', forms.IntegerField(**INTEGER_RANGE)),
+    ('courses_amount', forms.IntegerField(**INTEGER_RANGE)),
+    ('registered_students', JSONCountsField(date_keys=True)),
+    ('enthusiastic_students', JSONCountsField(date_keys=True)),
+    ('generated_certificates', JSONCountsField(date_keys=True)),
+])
+
+ENTHUSIAST_FIELDS = OrderedDict(list(PARANOID_FIELDS.items()) + [
+    ('platform_name', forms.CharField(max_length=255, required=False, empty_value=None)),
+    ('platform_url', forms.URLField(required=False, empty_value=None)),
+    ('platform_city_name', forms.CharField(max_length=255, required=False, empty_value=None)),
+    ('latitude', forms.FloatField(required=False)),
+    ('longitude', forms.FloatField(required=False)),
+    ('students_per_country', JSONCountsField()),
+])
+
+# Statistics level to the fields, that are received on that level.
+LEVEL_FIELDS = {
+    'paranoid': PARANOID_FIELDS,
+    'enthusiast': ENTHUSIAST_FIELDS,
+}
+
+
+def validate_statistics(data):
+    """
+    Validate the received statistics fields of their level and provide the typed values.
+
+    :param data: received statistics mapping, e.g. the request POST data.
+    :return: dictionary of the level field names and the cleaned values.
+    :raise ValidationError: with the field names and their errors.
+    """
+    fields = LEVEL_FIELDS.get(data.get('statistics_level'))
+
+    if fields is None:
+        raise ValidationError({'statistics_level': ['Select a valid statistics level.']})
+
+    statistics = {}
+    errors = {}
+
+    for name, field in fields.items():
+        try:
+            statistics[name] = field.clean(data.get(name))
+        except ValidationError as error:
+            errors[name] = error.messages
+
+    if errors:
+        raise ValidationError(errors)
+
+    return statistics
@@ -6,7 +6,7 @@ import uuid
 from datetime import datetime
 from pytz import UTC
 
-from factory import SubFactory
+from factory import LazyFunction, SubFactory
 from factory.django import DjangoModelFactory
 
 
@@ -21,7 +21,7 @@ class EdxInstallationFactory(DjangoModelFactory):
     class Meta:
         model = EdxInstallation
 
-    access_token = uuid.uuid4().hex
+    access_token = LazyFunction(lambda: uuid.uuid4().hex)
     platform_name = 'platform_name'
     platform_url = 'https://platform-url.com'
     latitude = 50.10
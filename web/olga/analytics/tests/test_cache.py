@@ -0,0 +1,102 @@
+"""
+Tests for analytics caches.
+"""
+
+from mock import patch
+
+from django.test import TestCase
+
+from olga.analytics.cache import InstallationCache, installation_cache
+from olga.analytics.models import EdxInstallation
+from olga.analytics.tests.factories import EdxInstallationFactory
+
+# pylint: disable=invalid-name, no-member
+
+
+class TestInstallationCache(TestCase):
+    """
+    Tests for the installations by access tokens cache.
+    """
+
+    def setUp(self):
+        """
+        Create installation and clear the cache.
+        """
+        self.installation = EdxInstallationFactory()
+        self.access_token = self.installation.access_token
+        installation_cache.clear()
+
+    def test_installation_is_queried_once(self):
+        """
+        Verify that the installation is queried on the first lookup only and every lookup provides a copy.
+        """
+        with self.assertNumQueries(1):
+            first_installation = installation_cache.get(self.access_token)
+            second_installation = installation_cache.get(self.access_token.replace('-', '').upper())
+
+        self.assertEqual(self.installation.pk, second_installation.pk)
+        self.assertIsNot(first_installation, second_installation)
+        self.assertEqual({'hits': 1, 'misses': 1, 'size': 1}, installation_cache.stats())
+
+    def test_unknown_access_token(self):
+        """
+        Verify that unknown and invalid access tokens do not provide any installation.
+        """
+        self.assertIsNone(installation_cache.get('00000000-0000-0000-0000-000000000000'))
+
+        with self.assertNumQueries(0):
+            self.assertIsNone(installation_cache.get('not a token'))
+
+    def test_installations_are_queried_at_once(self):
+        """
+        Verify that not cached installations are queried in a single query and cached ones are not queried again.
+        """
+        other_installation = EdxInstallationFactory()
+        installation_cache.get(self.access_token)
+
+        with self.assertNumQueries(1):
+            installations = installation_cache.get_many([
+                self.access_token,
+                other_installation.access_token,
+                '00000000-0000-0000-0000-000000000000',
+                'not a token',
+            ])
+
+        self.assertEqual(
+            {
+                installation_cache.get_key(self.access_token): self.installation.pk,
+                installation_cache.get_key(other_installation.access_token): other_installation.pk,
+            },
+            {access_token: installation.pk for access_token, installation in installations.items()}
+        )
+        self.assertEqual({'hits': 1, 'misses': 3, 'size': 2}, installation_cache.stats())
+
+        with self.assertNumQueries(0):
+            installation_cache.get_many([self.access_token, other_installation.access_token])
+
+    def test_cache_is_invalidated_on_change(self):
+        """
+        Verify that changed and deleted installations are not provided from the cache.
+        """
+        installation_cache.get(self.access_token)
+
+        EdxInstallation.objects.get(pk=self.installation.pk).delete()
+
+        self.assertIsNone(installation_cache.get(self.access_token))
+
+    def test_cache_expiration_and_size(self):
+        """
+        Verify that installations are queried again after the timeout and the least recently used one is evicted.
+        """
+        cache = InstallationCache(max_size=1, timeout=10)
+        other_installation = EdxInstallationFactory()
+
+        with patch('olga.analytics.cache.time.monotonic', return_value=0):
+            cache.get(self.access_token)
+            cache.get(other_installation.access_token)
+            cache.get(other_installation.access_token)
+
+        with patch('olga.analytics.cache.time.monotonic', return_value=20):
+            cache.get(other_installation.access_token)
+
+        self.assertEqual({'hits': 1, 'misses': 3, 'size': 1}, cache.stats())
@@ -0,0 +1,380 @@
+"""
+Tests for analytics management commands.
+"""
+
+from datetime import date, datetime
+import tempfile
+
+from mock import Mock, patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.six import StringIO
+from pytz import UTC
+import requests
+
+from olga.analytics.cache import installation_cache
+from olga.analytics.countries import COUNTRIES_PATH
+from olga.analytics.models import (
+    DailyStatistics, EdxInstallation, GeocodedCity, InstallationStatistics, MonthlyCountryStatistics,
+    MonthlyInstallationStatistics, ReceivedStatistics, add_months,
+)
+from olga.analytics.partitions import get_default_partition_months, get_partition_months
+from olga.analytics.tests.factories import EdxInstallationFactory, InstallationStatisticsFactory
+from olga.analytics.tests.test_views import InstallationDefaultData
+from olga.analytics.utils import GeocodingError
+
+# pylint: disable=invalid-name, no-member
+
+
+class TestProcessStatisticsQueue(TestCase):
+    """
+    Tests for process_statistics_queue management command.
+    """
+
+    def setUp(self):
+        """
+        Queue installation default data, that was received yesterday.
+        """
+        self.received_data, _, __ = InstallationDefaultData().create_installation_default_data()
+        self.received_data['latitude'] = self.received_data['longitude'] = '1.0'
+
+        EdxInstallationFactory(access_token=self.received_data['access_token'])
+        installation_cache.clear()
+
+        self.report = ReceivedStatistics.objects.create(
+            access_token=self.received_data['access_token'],
+            payload=self.received_data,
+            received_datetime=datetime(2018, 5, 2, 10, tzinfo=UTC),
+        )
+
+    def test_queued_statistics_are_processed(self):
+        """
+        Verify that queued statistics are applied for the day they were received and removed from the queue.
+        """
+        out = StringIO()
+        call_command('process_statistics_queue', stdout=out)
+
+        received_day_statistics = InstallationStatistics.objects.get(data_created_datetime__date=datetime(2018, 5, 2))
+
+        self.assertEqual(10, received_day_statistics.active_students_amount_day)
+        self.assertEqual(6, InstallationStatistics.objects.count())
+        self.assertFalse(ReceivedStatistics.objects.exists())
+        self.assertEqual('Processed 1 reports, 0 failed.\n', out.getvalue())
+
+    def test_failed_statistics_are_kept_in_queue(self):
+        """
+        Verify that failed statistics are kept in the queue with the error until attempts are exhausted.
+        """
+        self.report.payload['registered_students'] = 'wrong json'
+        self.report.save()
+
+        with self.settings(STATISTICS_QUEUE_MAX_ATTEMPTS=2):
+            for _ in range(3):
+                call_command('process_statistics_queue', stdout=StringIO())
+
+        self.report.refresh_from_db()
+
+        self.assertEqual(2, self.report.attempts)
+        self.assertIn('ValidationError', self.report.error)
+        self.assertFalse(InstallationStatistics.objects.exists())
+
+
+class TestManagePartitions(TestCase):
+    """
+    Tests for manage_partitions management command.
+    """
+
+    def setUp(self):
+        """
+        Create statistics, that are kept by the default partition.
+        """
+        self.statistics = InstallationStatisticsFactory(data_created_datetime=datetime(2017, 6, 5, tzinfo=UTC))
+
+    def test_partitions_are_created(self):
+        """
+        Verify that partitions are created for the next months and for the months of the default partition statistics.
+        """
+        current_month = timezone.now().date().replace(day=1)
+        out = StringIO()
+
+        call_command('manage_partitions', ahead=5, stdout=out)
+
+        self.assertTrue(set(
+            [date(2017, 6, 1)] + [add_months(current_month, months) for months in range(6)]
+        ).issubset(get_partition_months()))
+        self.assertEqual([], get_default_partition_months())
+        self.assertIn('Created partition analytics_installationstatistics_y2017m06.\n', out.getvalue())
+
+    def test_old_partitions_are_archived(self):
+        """
+        Verify that partitions of the months before the given one are archived.
+        """
+        out = StringIO()
+
+        call_command('manage_partitions', archive_before='2017-07', stdout=out)
+
+        self.assertIn('Archived partition analytics_installationstatistics_archive_y2017m06.\n', out.getvalue())
+        self.assertNotIn(date(2017, 6, 1), get_partition_months())
+        self.assertFalse(InstallationStatistics.objects.exists())
+
+    def test_wrong_archived_month(self):
+        """
+        Verify that the archived month format is validated.
+        """
+        with self.assertRaises(CommandError):
+            call_command('manage_partitions', archive_before='2017', stdout=StringIO())
+
+
+class TestDownsampleStatistics(TestCase):
+    """
+    Tests for downsample_statistics management command.
+    """
+
+    def setUp(self):
+        """
+        Create statistics of the current and the previous months.
+        """
+        current_month = timezone.localdate().replace(day=1)
+        self.edx_installation = EdxInstallationFactory()
+
+        for month in (current_month, add_months(current_month, -1), add_months(current_month, -2)):
+            InstallationStatisticsFactory(
+                edx_installation=self.edx_installation,
+                data_created_datetime=timezone.make_aware(datetime.combine(month, datetime.min.time())),
+            )
+
+    def test_old_statistics_are_downsampled(self):
+        """
+        Verify that statistics older than the retention period are downsampled in batches.
+        """
+        out = StringIO()
+
+        call_command('downsample_statistics', months=2, batch_size=1, stdout=out)
+
+        self.assertEqual(2, InstallationStatistics.objects.count())
+        self.assertEqual(1, MonthlyInstallationStatistics.objects.count())
+        self.assertIn('Downsampled 1 statistics before', out.getvalue())
+
+    def test_current_month_is_kept(self):
+        """
+        Verify that the current month statistics can't be downsampled.
+        """
+        with self.assertRaises(CommandError):
+            call_command('downsample_statistics', months=0, stdout=StringIO())
+
+
+class TestRebuildStatistics(TestCase):
+    """
+    Tests for rebuild_statistics management command.
+    """
+
+    def test_rollups_are_rebuilt(self):
+        """
+        Verify that rollups of the deleted installation are removed and the remaining statistics are summarized.
+        """
+        InstallationStatisticsFactory(data_created_datetime=datetime(2018, 5, 2, tzinfo=UTC), students_per_country={
+            'RU': 5
+        })
+        deleted_installation = EdxInstallationFactory()
+        InstallationStatisticsFactory(
+            edx_installation=deleted_installation, data_created_datetime=datetime(2018, 5, 1, tzinfo=UTC)
+        )
+        DailyStatistics.objects.create(day=date(2018, 5, 1), instances=1)
+        EdxInstallation.objects.filter(id=deleted_installation.id).delete()
+        out = StringIO()
+
+        call_command('rebuild_statistics', stdout=out)
+
+        self.assertEqual(
+            [(date(2018, 5, 2), 1, 5)], list(DailyStatistics.objects.values_list('day', 'instances', 'students'))
+        )
+        self.assertEqual([('RU', 5)], list(MonthlyCountryStatistics.objects.values_list('country', 'students')))
+        self.assertIn('Rebuilt 1 days and 1 month countries.', out.getvalue())
+
+
+class TestGenerateStatistics(TestCase):
+    """
+    Tests for generate_statistics management command.
+    """
+
+    def test_statistics_are_generated(self):
+        """
+        Verify that installations and their statistics are copied in chunks and the rollups are rebuilt.
+        """
+        out = StringIO()
+
+        call_command('generate_statistics', installations=3, days=40, seed=1, chunk_size=2, stdout=out)
+
+        self.assertEqual(3, EdxInstallation.objects.count())
+        self.assertTrue(InstallationStatistics.objects.exists())
+        self.assertEqual([], get_default_partition_months())
+        self.assertTrue(DailyStatistics.objects.exists())
+        self.assertIn(
+            'Generated 3 installations and {} statistics'.format(InstallationStatistics.objects.count()),
+            out.getvalue()
+        )
+
+
+@patch('olga.analytics.management.commands.load_test.requests.Session')
+class TestLoadTest(TestCase):
+    """
+    Tests for load_test management command.
+    """
+
+    def test_traffic_is_replayed(self, mock_session):
+        """
+        Verify that every installation is registered and sends the authorization and the statistics per report.
+        """
+        session = mock_session.return_value.__enter__.return_value
+        session.post.return_value.json.return_value = {'access_token': 'token'}
+        out = StringIO()
+
+        call_command('load_test', installations=3, reports=2, concurrency=2, seed=1, stdout=out)
+
+        self.assertEqual(15, session.post.call_count)
+        self.assertEqual(
+            6, len([call for call in session.post.call_args_list if call[1].get('data', {}).get('courses_amount')])
+        )
+        self.assertIn('Sent 15 requests', out.getvalue())
+        self.assertIn('statistics              6         0', out.getvalue())
+
+    def test_failed_registration(self, mock_session):
+        """
+        Verify that installations, that failed to register, don't send reports and are counted as errors.
+        """
+        session = mock_session.return_value.__enter__.return_value
+        session.post.return_value = Mock(raise_for_status=Mock(side_effect=requests.HTTPError()))
+        out = StringIO()
+
+        call_command('load_test', installations=3, reports=2, stdout=out)
+
+        self.assertEqual(3, session.post.call_count)
+        self.assertIn('registration            3         3', out.getvalue())
+
+
+@patch('olga.analytics.utils.request_coordinates_by_platform_city_name')
+class TestResolveCoordinates(TestCase):
+    """
+    Tests for resolve_coordinates management command.
+    """
+
+    def setUp(self):
+        """
+        Create installations, that are pending to be geocoded.
+        """
+        self.kiev_installations = [
+            EdxInstallationFactory(
+                platform_city_name=city_name, coordinates_pending=True, latitude=None, longitude=None
+            ) for city_name in ('Kiev', ' kiev')
+        ]
+        self.unknown_installation = EdxInstallationFactory(
+            platform_city_name='Lmnasasfabqwrqrn', coordinates_pending=True, latitude=None, longitude=None
+        )
+
+    def test_pending_installations_are_resolved(self, mock_request_coordinates):
+        """
+        Verify that every city is requested once and installations are not pending anymore.
+        """
+        mock_request_coordinates.side_effect = lambda city_name: (
+            ('50.45', '30.52') if city_name == 'kiev' else ('', '')
+        )
+        out = StringIO()
+
+        with self.settings(GEOCODING_REQUEST_INTERVAL=0):
+            call_command('resolve_coordinates', batch_size=2, stdout=out)
+
+        self.assertEqual(2, mock_request_coordinates.call_count)
+        self.assertEqual(
+            [(50.45, 30.52, False)] * 2,
+            [
+                (installation.latitude, installation.longitude, installation.coordinates_pending)
+                for installation in EdxInstallation.objects.filter(pk__in=[i.pk for i in self.kiev_installations])
+            ]
+        )
+        self.assertFalse(EdxInstallation.objects.filter(coordinates_pending=True).exists())
+        self.assertEqual(
+            'Resolved coordinates for 2 installations.\nResolved coordinates for 1 installations.\n', out.getvalue()
+        )
+
+    def test_failed_installations_are_retried(self, mock_request_coordinates):
+        """
+        Verify that installations stay pending after the service failure until the attempts are exhausted.
+        """
+        mock_request_coordinates.side_effect = GeocodingError('Nominatim API status: 503')
+        out = StringIO()
+
+        with self.settings(GEOCODING_REQUEST_INTERVAL=0, GEOCODING_MAX_ATTEMPTS=2):
+            call_command('resolve_coordinates', stdout=out, stderr=StringIO())
+            self.assertEqual(
+                [(True, 1)] * 3,
+                list(EdxInstallation.objects.values_list('coordinates_pending', 'coordinates_attempts'))
+            )
+
+            call_command('resolve_coordinates', stdout=out, stderr=StringIO())
+
+        self.assertEqual(4, mock_request_coordinates.call_count)
+        self.assertEqual(
+            [(False, 2)] * 3, list(EdxInstallation.objects.values_list('coordinates_pending', 'coordinates_attempts'))
+        )
+        self.assertEqual('Failed to resolve coordinates for 3 installations.\n' * 2, out.getvalue())
+
+    def test_cached_city_is_not_requested(self, mock_request_coordinates):
+        """
+        Verify that city resolved since the installation was marked as pending is not requested again.
+        """
+        GeocodedCity.objects.create(city_name='kiev', latitude=50.45, longitude=30.52)
+        GeocodedCity.objects.create(city_name='lmnasasfabqwrqrn')
+
+        call_command('resolve_coordinates', stdout=StringIO())
+
+        self.unknown_installation.refresh_from_db()
+
+        self.assertFalse(mock_request_coordinates.called)
+        self.assertEqual((None, None, False), (
+            self.unknown_installation.latitude,
+            self.unknown_installation.longitude,
+            self.unknown_installation.coordinates_pending,
+        ))
+
+
+class TestUpdateCountries(TestCase):
+    """
+    Tests for update_countries management command.
+    """
+
+    def test_shipped_countries_are_up_to_date(self):
+        """
+        Verify that the shipped countries table is the one generated from the installed pycountry databases.
+        """
+        with tempfile.NamedTemporaryFile() as countries_file:
+            with patch('olga.analytics.management.commands.update_countries.COUNTRIES_PATH', countries_file.name):
+                call_command('update_countries', stdout=StringIO())
+
+            with open(COUNTRIES_PATH, 'rb') as shipped_countries_file:
+                self.assertEqual(shipped_countries_file.read(), countries_file.read())
+
+
+class TestMeasureStartup(TestCase):
+    """
+    Tests for measure_startup management command.
+    """
+
+    def test_models_do_not_load_pycountry(self):
+        """
+        Verify that the startup is measured and the analytics models import does not load pycountry databases.
+        """
+        out = StringIO()
+        call_command('measure_startup', 'olga.analytics.models', repeat=1, stdout=out)
+
+        self.assertIn('Imported olga.analytics.models in 1 processes:', out.getvalue())
+        self.assertIn('pycountry loaded: no', out.getvalue())
+
+    def test_failed_worker_process(self):
+        """
+        Verify that the import error of the measured modules fails the command.
+        """
+        with self.assertRaises(CommandError):
+            call_command('measure_startup', 'olga.not_existing_module', repeat=1, stdout=StringIO())
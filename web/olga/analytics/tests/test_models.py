@@ -4,17 +4,26 @@ Tests for analytics models.
 """
 from collections import OrderedDict
 from copy import deepcopy
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from importlib import import_module
 
 from ddt import ddt, data, unpack
-from mock import patch
+from mock import Mock, patch
 
+from django.db import connection
 from django.test import TestCase
 
-from olga.analytics.tests.factories import InstallationStatisticsFactory
-from olga.analytics.models import InstallationStatistics, get_last_calendar_day
+from pytz import UTC
 
-# pylint: disable=invalid-name, attribute-defined-outside-init
+from olga.analytics.tests.factories import EdxInstallationFactory, InstallationStatisticsFactory
+from olga.analytics.countries import get_countries
+from olga.analytics.models import (
+    DailyStatistics, EdxInstallation, InstallationStatistics, MonthlyCountryStatistics, MonthlyInstallationStatistics,
+    get_last_calendar_day,
+)
+from olga.analytics.partitions import STATISTICS_TABLE, create_partition, get_partition_name
+
+# pylint: disable=invalid-name, attribute-defined-outside-init, no-member
 
 EXPECTED_CLEAN_DATAMAP_FORMAT_COUNTRIES_LIST = [
     ['ALA', 2922],
@@ -102,20 +111,23 @@ class TestInstallationStatisticsMethods(TestCase):
             datetime(2017, 6, 5, 15, 30, 30),
         ]
 
+        # Statistics are unique per installation and datetime, so take the fourth and fifth installations once.
+        acquainted_edx_installations = [
+            statistics.edx_installation for statistics in InstallationStatistics.objects.order_by('pk')[3:5]
+        ]
+
         for data_created_datetime in data_created_datetimes_for_acquainted_edx_installation:
             mock_timezone_now.return_value = data_created_datetime
 
-            InstallationStatisticsFactory(
-                data_created_datetime=data_created_datetime,
-                edx_installation=InstallationStatistics.objects.all()[4].edx_installation,
-                students_per_country=students_division_by_2_part
-            )
+            for edx_installation in acquainted_edx_installations:
+                InstallationStatisticsFactory(
+                    data_created_datetime=data_created_datetime,
+                    edx_installation=edx_installation,
+                    students_per_country=students_division_by_2_part
+                )
 
-            InstallationStatisticsFactory(
-                data_created_datetime=data_created_datetime,
-                edx_installation=InstallationStatistics.objects.all()[5].edx_installation,
-                students_per_country=students_division_by_2_part
-            )
+        DailyStatistics.rebuild()
+        MonthlyCountryStatistics.rebuild()
 
     def test_timeline(self):
         """
@@ -137,6 +149,27 @@ class TestInstallationStatisticsMethods(TestCase):
             ([10, 5, 10, 10, 10], [2, 1, 2, 2, 2], [2, 1, 2, 2, 2]), result
         )
 
+    def test_timeline_and_data_per_period_range(self):
+        """
+        Verify that timeline and data_per_period methods provide only the days within the range.
+        """
+        self.assertEqual(
+            ['2017-06-02', '2017-06-03'], InstallationStatistics.timeline(date(2017, 6, 2), date(2017, 6, 3))
+        )
+        self.assertEqual(
+            ([5, 10], [1, 2], [1, 2]), InstallationStatistics.data_per_period(date(2017, 6, 2), date(2017, 6, 3))
+        )
+
+    def test_timeline_and_data_per_period_resolution(self):
+        """
+        Verify that daily values are averaged per period of the coarser resolution.
+        """
+        self.assertEqual(['2017-05-29', '2017-06-05'], InstallationStatistics.timeline(resolution='week'))
+        self.assertEqual(
+            ([9, 10], [2, 2], [2, 2]), InstallationStatistics.data_per_period(resolution='week')
+        )
+        self.assertEqual(['2017-04-01'], InstallationStatistics.timeline(resolution='quarter'))
+
     @patch('olga.analytics.models.get_last_calendar_day')
     def test_overall_counts(self, mock_get_last_calendar_day):
         """
@@ -157,6 +190,63 @@ class TestInstallationStatisticsMethods(TestCase):
             test_result.keys(), result.keys()
         )
 
+    @patch('olga.analytics.models.get_last_calendar_day')
+    def test_overall_counts_in_single_query(self, mock_get_last_calendar_day):
+        """
+        Verify that overall_counts method calculates all the counters with a single query.
+        """
+        mock_get_last_calendar_day.return_value = date(2017, 6, 1), date(2017, 6, 2)
+
+        with self.assertNumQueries(1):
+            result = InstallationStatistics.overall_counts()
+
+        self.assertEqual(
+            dict(
+                instances_count=2,
+                courses_count=2,
+                students_count=10,
+                generated_certificates_count=0,
+                registered_students_count=0,
+            ),
+            result
+        )
+
+    def test_get_charts_data(self):
+        """
+        Verify that get_charts_data method sums statistics of all the installations per day in a single query.
+
+        Statistics are summed up from the daily statistics rollup.
+        """
+        InstallationStatistics.objects.filter(data_created_datetime__day=1).update(
+            registered_students=2, generated_certificates=1, enthusiastic_students=3
+        )
+        DailyStatistics.rebuild()
+
+        with self.assertNumQueries(1):
+            result = InstallationStatistics.get_charts_data()
+
+        self.assertEqual(
+            [
+                ('17-06-01', [4, 2, 6]),
+                ('17-06-02', [0, 0, 0]),
+                ('17-06-03', [0, 0, 0]),
+                ('17-06-04', [0, 0, 0]),
+                ('17-06-05', [0, 0, 0]),
+            ],
+            list(result.items())
+        )
+
+    def test_get_charts_data_range_and_resolution(self):
+        """
+        Verify that get_charts_data method sums statistics per period of the resolution within the range.
+        """
+        InstallationStatistics.objects.update(registered_students=1)
+        DailyStatistics.rebuild()
+
+        result = InstallationStatistics.get_charts_data(date(2017, 6, 2), None, 'month')
+
+        self.assertEqual([('17-06-01', [7, 0, 0])], list(result.items()))
+
     def test_students_per_country_as_dict(self):
         """
         Verify that get_students_per_country_stats method returns correct accordance as dict.
@@ -169,6 +259,26 @@ class TestInstallationStatisticsMethods(TestCase):
 
         self.assertDictEqual(wanted_result, result['2017-06']['countries'])
 
+    def test_students_per_country_stats_in_single_query(self):
+        """
+        Verify that get_students_per_country_stats method aggregates months in the database with a single query.
+
+        Months without countries data are kept with empty countries, not numeric values are skipped.
+        """
+        InstallationStatisticsFactory(
+            data_created_datetime=datetime(2017, 7, 1, tzinfo=UTC), students_per_country={}
+        )
+        InstallationStatisticsFactory(
+            data_created_datetime=datetime(2017, 8, 1, tzinfo=UTC), students_per_country={'RU': 'wrong', 'UA': 1.5}
+        )
+
+        with self.assertNumQueries(1):
+            result = InstallationStatistics.get_students_per_country_stats()
+
+        self.assertEqual(['2017-06', '2017-07', '2017-08'], sorted(result))
+        self.assertEqual({'label': 'July 2017', 'countries': {}}, result['2017-07'])
+        self.assertEqual({'UA': 1.5}, result['2017-08']['countries'])
+
     def test_datamap_and_tabular_lists(self):
         """
         Verify that view gets datamap and tabular lists with corresponding model method.
@@ -184,6 +294,17 @@ class TestInstallationStatisticsMethods(TestCase):
         self.assertEqual(wanted_datamap, result_datamap)
         self.assertEqual(EXPECTED_CLEAN_TABULAR_FORMAT_COUNTRIES_LIST, result_tabular)
 
+    def test_unknown_countries_are_unspecified(self):
+        """
+        Verify that students of the unknown country codes are summed up as students without country.
+        """
+        result_datamap, result_tabular = InstallationStatistics.create_students_per_country(
+            {'UA': 6, 'null': 2, 'XX': 2}
+        )
+
+        self.assertEqual([['UKR', 6]], result_datamap)
+        self.assertEqual([('Ukraine', [6, 60]), ('Country is not specified', [4, 40])], result_tabular)
+
     @staticmethod
     def sort_datamap_list(datamap_list):
         """
@@ -226,6 +347,483 @@ class TestInstallationStatisticsMethods(TestCase):
         self.assertEqual(top_country_name_empty, '')
 
 
+class TestCountries(TestCase):
+    """
+    Tests for the shipped countries table.
+    """
+
+    def test_countries_table(self):
+        """
+        Verify that countries are looked up by the alpha-2 code in the shipped table.
+        """
+        self.assertEqual(('UKR', 'Ukraine'), get_countries()['UA'])
+        self.assertEqual(249, len(get_countries()))
+
+
+class TestInstallationStatisticsHistory(TestCase):
+    """
+    Tests for InstallationStatistics bulk history saving.
+    """
+
+    def setUp(self):
+        """
+        Create statistics for the first history day.
+        """
+        self.statistics = InstallationStatisticsFactory(
+            data_created_datetime=datetime(2017, 6, 1, 15, 30, tzinfo=UTC),
+            registered_students=3,
+            generated_certificates=2,
+        )
+        DailyStatistics.rebuild()
+
+        self.history = {
+            datetime(2017, 6, day): {
+                'registered_students': day,
+                'enthusiastic_students': 0,
+                'generated_certificates': 0,
+                'statistics_level': 'paranoid',
+            }
+            for day in range(1, 31)
+        }
+
+    def test_save_history_with_constant_queries(self):
+        """
+        Verify that history for any amount of dates is saved with two select and two upsert queries.
+        """
+        with self.assertNumQueries(4):
+            result = InstallationStatistics.save_history(self.statistics.edx_installation, self.history)
+
+        self.assertEqual((29, 1), result)
+        self.assertEqual(30, InstallationStatistics.objects.count())
+
+    def test_save_history_keeps_not_empty_previous_values(self):
+        """
+        Verify that existing statistics are updated in place and empty received values keep the previous ones.
+        """
+        InstallationStatistics.save_history(self.statistics.edx_installation, self.history)
+
+        self.statistics.refresh_from_db()
+
+        self.assertEqual(
+            (1, 2, 5, 'paranoid'),
+            (
+                self.statistics.registered_students,
+                self.statistics.generated_certificates,
+                self.statistics.active_students_amount_day,
+                self.statistics.statistics_level,
+            )
+        )
+
+    def test_statistics_are_saved_at_day_start(self):
+        """
+        Verify that the saved and the history statistics are kept at the start of their day.
+        """
+        statistics = InstallationStatisticsFactory(data_created_datetime=datetime(2017, 7, 1, 15, 30, tzinfo=UTC))
+        InstallationStatistics.save_history(statistics.edx_installation, {
+            datetime(2017, 7, 1, 20, 0): {'registered_students': 3, 'statistics_level': 'paranoid'},
+            datetime(2017, 7, 2, 9, 0): {'registered_students': 4, 'statistics_level': 'paranoid'},
+        })
+
+        self.assertEqual(
+            [(datetime(2017, 7, 1, tzinfo=UTC), 3), (datetime(2017, 7, 2, tzinfo=UTC), 4)],
+            list(InstallationStatistics.objects.filter(edx_installation=statistics.edx_installation).order_by(
+                'data_created_datetime'
+            ).values_list('data_created_datetime', 'registered_students'))
+        )
+
+    def test_save_history_updates_daily_statistics(self):
+        """
+        Verify that the daily statistics rollup matches the saved statistics.
+        """
+        InstallationStatistics.save_history(self.statistics.edx_installation, self.history)
+
+        rollup = list(DailyStatistics.objects.order_by('day').values_list(
+            'day', 'students', 'instances', 'registered_students', 'generated_certificates'
+        ))
+        DailyStatistics.rebuild()
+
+        self.assertEqual((date(2017, 6, 1), 5, 1, 1, 2), rollup[0])
+        self.assertEqual(rollup, list(DailyStatistics.objects.order_by('day').values_list(
+            'day', 'students', 'instances', 'registered_students', 'generated_certificates'
+        )))
+
+
+class TestDailyStatistics(TestCase):
+    """
+    Tests for DailyStatistics rollup model.
+    """
+
+    def setUp(self):
+        """
+        Create installation statistics for a single day.
+        """
+        self.statistics = InstallationStatisticsFactory(
+            data_created_datetime=datetime(2017, 6, 1, 0, 0, 0, tzinfo=UTC),
+            registered_students=3,
+            generated_certificates=2,
+        )
+
+    def test_apply_statistics_change_for_new_statistics(self):
+        """
+        Verify that new installation statistics are added to the day rollup and counted as one more instance.
+        """
+        DailyStatistics.apply_statistics_change(None, self.statistics)
+        DailyStatistics.apply_statistics_change(None, InstallationStatisticsFactory(
+            data_created_datetime=datetime(2017, 6, 1, 15, 30, 30, tzinfo=UTC),
+            edx_installation=EdxInstallationFactory(),
+        ))
+
+        day = DailyStatistics.objects.get(day=date(2017, 6, 1))
+
+        self.assertEqual(
+            (10, 2, 2, 3, 2),
+            (day.students, day.courses, day.instances, day.registered_students, day.generated_certificates)
+        )
+
+    def test_apply_statistics_change_for_updated_statistics(self):
+        """
+        Verify that updated installation statistics replace the previous values in the day rollup.
+        """
+        DailyStatistics.apply_statistics_change(None, self.statistics)
+
+        statistics_before_update = deepcopy(self.statistics)
+        self.statistics.update({'active_students_amount_day': 20, 'registered_students': 1})
+        DailyStatistics.apply_statistics_change(statistics_before_update, self.statistics)
+
+        day = DailyStatistics.objects.get(day=date(2017, 6, 1))
+
+        self.assertEqual((20, 1, 1), (day.students, day.instances, day.registered_students))
+
+    def test_add_statistics_for_datetimes(self):
+        """
+        Verify that values of the statistics datetimes are added to their days.
+        """
+        DailyStatistics.add_statistics({
+            datetime(2017, 6, 1, 10, 0, tzinfo=UTC): {'instances': 1, 'students': 2},
+            datetime(2017, 6, 1, 20, 0, tzinfo=UTC): {'instances': 1},
+        })
+
+        self.assertEqual(
+            [(date(2017, 6, 1), 2, 2)], list(DailyStatistics.objects.values_list('day', 'students', 'instances'))
+        )
+
+    def test_same_day_statistics_migration(self):
+        """
+        Verify that the migration keeps the latest statistics of the same day at the day start and rebuilds rollups.
+        """
+        latest_statistics = InstallationStatisticsFactory(
+            edx_installation=self.statistics.edx_installation, data_created_datetime=datetime(2017, 6, 2, tzinfo=UTC)
+        )
+        InstallationStatistics.objects.filter(pk=latest_statistics.pk).update(
+            data_created_datetime=datetime(2017, 6, 1, 15, 30, tzinfo=UTC)
+        )
+        DailyStatistics.objects.create(day=date(2017, 6, 1), students=100, instances=2)
+
+        import_module('olga.analytics.migrations.0022_statistics_day_start').move_statistics_to_day_start(
+            None, Mock(connection=connection)
+        )
+
+        self.assertEqual(
+            [(latest_statistics.pk, datetime(2017, 6, 1, tzinfo=UTC))],
+            list(InstallationStatistics.objects.values_list('pk', 'data_created_datetime'))
+        )
+        self.assertEqual(
+            [(date(2017, 6, 1), 5, 1)], list(DailyStatistics.objects.values_list('day', 'students', 'instances'))
+        )
+        self.assertEqual(
+            latest_statistics.students_per_country, MonthlyCountryStatistics.get_months()['2017-06']['countries']
+        )
+
+    def test_rebuild(self):
+        """
+        Verify that rebuild recalculates the rollup from the installation statistics.
+        """
+        DailyStatistics.objects.create(day=date(2017, 1, 1), students=100, instances=1)
+
+        DailyStatistics.rebuild()
+
+        self.assertEqual(
+            [(date(2017, 6, 1), 5, 1, 1)],
+            list(DailyStatistics.objects.values_list('day', 'students', 'courses', 'instances'))
+        )
+
+
+class TestMonthlyCountryStatistics(TestCase):
+    """
+    Tests for MonthlyCountryStatistics model.
+    """
+
+    def setUp(self):
+        """
+        Create installation statistics with students per country.
+        """
+        self.statistics = InstallationStatisticsFactory(
+            data_created_datetime=datetime(2017, 6, 15, tzinfo=UTC),
+            students_per_country={'RU': 10, 'UA': 5, 'null': 0},
+        )
+
+    def test_apply_statistics_change_for_new_statistics(self):
+        """
+        Verify that new installation statistics countries are added to the month.
+        """
+        MonthlyCountryStatistics.apply_statistics_change(None, self.statistics)
+        MonthlyCountryStatistics.apply_statistics_change(None, InstallationStatisticsFactory(
+            data_created_datetime=datetime(2017, 6, 20, tzinfo=UTC),
+            edx_installation=EdxInstallationFactory(),
+            students_per_country={'RU': 1, 'CA': 2},
+        ))
+
+        self.assertEqual(
+            {'2017-06': {'label': 'June 2017', 'countries': {'RU': 11, 'UA': 5, 'CA': 2, 'null': 0}}},
+            MonthlyCountryStatistics.get_months()
+        )
+
+    def test_apply_statistics_change_for_updated_statistics(self):
+        """
+        Verify that the previous same-day countries are subtracted on statistics update.
+        """
+        MonthlyCountryStatistics.apply_statistics_change(None, self.statistics)
+
+        statistics_before_update = deepcopy(self.statistics)
+        self.statistics.update({'students_per_country': {'RU': 7, 'CA': 1}})
+
+        with self.assertNumQueries(2):
+            MonthlyCountryStatistics.apply_statistics_change(statistics_before_update, self.statistics)
+
+        self.assertEqual(
+            {'RU': 7, 'CA': 1},
+            MonthlyCountryStatistics.get_months()['2017-06']['countries']
+        )
+
+    def test_months_without_countries(self):
+        """
+        Verify that months with statistics, but without any country data, are provided with empty countries.
+        """
+        MonthlyCountryStatistics.apply_statistics_change(None, self.statistics)
+        DailyStatistics.objects.create(day=date(2017, 7, 3), instances=1)
+
+        self.assertEqual(
+            {'label': 'July 2017', 'countries': {}},
+            MonthlyCountryStatistics.get_months()['2017-07']
+        )
+
+    def test_rebuild(self):
+        """
+        Verify that rebuild recalculates the months from the installation statistics.
+        """
+        MonthlyCountryStatistics.objects.create(month=date(2017, 1, 1), country='RU', students=100)
+
+        MonthlyCountryStatistics.rebuild()
+
+        self.assertEqual(
+            {'2017-06': {'label': 'June 2017', 'countries': {'RU': 10, 'UA': 5, 'null': 0}}},
+            MonthlyCountryStatistics.get_months()
+        )
+
+
+class TestMonthlyInstallationStatistics(TestCase):
+    """
+    Tests for MonthlyInstallationStatistics model, that keeps the downsampled installation statistics.
+    """
+
+    def setUp(self):
+        """
+        Create May, June and July statistics for two installations and the corresponding rollups.
+        """
+        self.edx_installations = [EdxInstallationFactory(), EdxInstallationFactory()]
+
+        for edx_installation in self.edx_installations:
+            for statistics_date in (date(2017, 5, 1), date(2017, 5, 15), date(2017, 5, 31), date(2017, 6, 20),
+                                    date(2017, 7, 3)):
+                InstallationStatisticsFactory(
+                    edx_installation=edx_installation,
+                    data_created_datetime=datetime.combine(statistics_date, datetime.min.time()).replace(tzinfo=UTC),
+                    registered_students=statistics_date.day,
+                    students_per_country={'RU': statistics_date.day, 'null': 1},
+                )
+
+        DailyStatistics.rebuild()
+        MonthlyCountryStatistics.rebuild()
+
+    @staticmethod
+    def get_charts_and_map():
+        """
+        Get all the charts and world map data.
+        """
+        return (
+            InstallationStatistics.timeline(),
+            InstallationStatistics.data_per_period(),
+            InstallationStatistics.data_per_period(resolution='month'),
+            InstallationStatistics.get_charts_data(),
+            InstallationStatistics.get_charts_data(resolution='month'),
+            InstallationStatistics.get_students_per_country(),
+        )
+
+    @staticmethod
+    def downsample():
+        """
+        Downsample statistics before July in batches, that split the installation months.
+        """
+        while MonthlyInstallationStatistics.downsample(datetime(2017, 7, 1, tzinfo=UTC), 4) == 4:
+            pass
+
+    def test_downsample(self):
+        """
+        Verify that statistics are summed up per installation and month and the charts and world map don't change.
+        """
+        charts_and_map = self.get_charts_and_map()
+
+        self.downsample()
+
+        may_statistics = MonthlyInstallationStatistics.objects.get(
+            edx_installation=self.edx_installations[0], month=date(2017, 5, 1)
+        )
+
+        self.assertEqual(charts_and_map, self.get_charts_and_map())
+        self.assertEqual(2, InstallationStatistics.objects.count())
+        self.assertEqual(4, MonthlyInstallationStatistics.objects.count())
+        self.assertEqual(
+            (3, 15, 47, datetime(2017, 5, 1, tzinfo=UTC), datetime(2017, 5, 31, tzinfo=UTC)),
+            (
+                may_statistics.days,
+                may_statistics.active_students_amount_day,
+                may_statistics.registered_students,
+                may_statistics.first_data_created_datetime,
+                may_statistics.last_data_created_datetime,
+            )
+        )
+        self.assertEqual({'RU': 47, 'null': 3}, may_statistics.students_per_country)
+
+    def test_rebuild_keeps_downsampled_statistics(self):
+        """
+        Verify that the rollups rebuild takes the downsampled statistics into account.
+        """
+        charts_and_map = self.get_charts_and_map()
+
+        self.downsample()
+        DailyStatistics.rebuild()
+        MonthlyCountryStatistics.rebuild()
+
+        self.assertEqual(charts_and_map, self.get_charts_and_map())
+
+    def test_downsampled_history_is_skipped(self):
+        """
+        Verify that received history of the downsampled months is not saved again.
+        """
+        self.downsample()
+
+        result = InstallationStatistics.save_history(self.edx_installations[0], {
+            datetime(2017, month, 2): {
+                'registered_students': 1,
+                'enthusiastic_students': 0,
+                'generated_certificates': 0,
+                'statistics_level': 'paranoid',
+            } for month in (5, 7)
+        })
+
+        self.assertEqual((1, 0), result)
+        self.assertEqual(
+            [datetime(2017, 7, 2, tzinfo=UTC)],
+            list(InstallationStatistics.objects.filter(
+                edx_installation=self.edx_installations[0], registered_students=1
+            ).values_list('data_created_datetime', flat=True))
+        )
+
+
+class TestStatisticsIndexes(TestCase):
+    """
+    Tests, that the statistics hot path queries are planned with the corresponding indexes.
+
+    Sequential scans are disabled, because the planner prefers them on the tiny test tables.
+    """
+
+    def setUp(self):
+        """
+        Create a year of installation statistics, the June partition and disable sequential scans for the transaction.
+        """
+        self.statistics = InstallationStatisticsFactory(data_created_datetime=datetime(2017, 6, 1, tzinfo=UTC))
+
+        InstallationStatistics.objects.bulk_create(
+            InstallationStatistics(
+                edx_installation=self.statistics.edx_installation,
+                data_created_datetime=datetime(2017, 1, 1, tzinfo=UTC) + timedelta(days=day),
+            )
+            for day in range(365) if day != 151
+        )
+        create_partition(date(2017, 6, 1))
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE analytics_installationstatistics')
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    @staticmethod
+    def get_partition_index_name(is_index):
+        """
+        Get the name of the June partition index, that is created from the statistics table index by PostgreSQL.
+        """
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, get_partition_name(date(2017, 6, 1))
+            )
+
+        return next(name for name, constraint in constraints.items() if is_index(constraint))
+
+    def get_installation_date_index_name(self):
+        """
+        Get the name of the installation and date unique index.
+        """
+        return self.get_partition_index_name(
+            lambda constraint: (
+                constraint['unique'] and constraint['columns'] == ['edx_installation_id', 'data_created_datetime']
+            )
+        )
+
+    def test_stats_for_the_date_uses_installation_date_index(self):
+        """
+        Verify that installation statistics per day lookup uses the installation and date unique index.
+        """
+        plan = InstallationStatistics.objects.filter(
+            edx_installation=self.statistics.edx_installation,
+            data_created_datetime__gte=date(2017, 6, 1),
+            data_created_datetime__lt=date(2017, 6, 2),
+        ).explain()
+
+        self.assertIn(self.get_installation_date_index_name(), plan)
+
+    def test_date_range_uses_brin_index(self):
+        """
+        Verify that the whole table date range scan uses the BRIN index.
+
+        On a tiny test table a full scan of the installation and date index or the primary key, that includes the
+        partition key, costs the same, so they are dropped within the test transaction to check the BRIN index alone.
+        """
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, STATISTICS_TABLE)
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+            for name, constraint in constraints.items():
+                if constraint['unique'] and 'data_created_datetime' in constraint['columns']:
+                    cursor.execute('ALTER TABLE {} DROP CONSTRAINT {}'.format(STATISTICS_TABLE, name))
+
+        plan = InstallationStatistics.objects.filter(
+            data_created_datetime__gte=date(2017, 6, 1), data_created_datetime__lt=date(2017, 6, 2),
+        ).explain()
+
+        self.assertIn(self.get_partition_index_name(
+            lambda constraint: constraint['index'] and constraint['columns'] == ['data_created_datetime']
+        ), plan)
+
+    def test_installation_lookups_use_unique_indexes(self):
+        """
+        Verify that installation lookups by access token and uid use the unique indexes.
+        """
+        access_token_plan = EdxInstallation.objects.filter(access_token=self.statistics.edx_installation.access_token)
+        uid_plan = EdxInstallation.objects.filter(uid='uid')
+
+        self.assertIn('analytics_edxinstallation_access_token', access_token_plan.explain())
+        self.assertIn('analytics_edxinstallation_uid', uid_plan.explain())
+
+
 @ddt
 class TestInstallationStatisticsHelpMethods(TestCase):
     """
@@ -0,0 +1,113 @@
+"""
+Tests for the statistics table monthly partitions.
+"""
+
+from datetime import date, datetime
+
+from mock import patch
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from pytz import UTC
+
+from olga.analytics.models import InstallationStatistics
+from olga.analytics.partitions import (
+    archive_partition,
+    create_partition,
+    get_default_partition_months,
+    get_default_partition_name,
+    get_partition_months,
+    get_partition_name,
+)
+from olga.analytics.tests.factories import InstallationStatisticsFactory
+
+# pylint: disable=invalid-name, no-member
+
+
+class TestStatisticsPartitions(TestCase):
+    """
+    Tests for the statistics table monthly partitions.
+    """
+
+    def setUp(self):
+        """
+        Create statistics for May, June and July, that are kept by the default partition, and the June partition.
+        """
+        self.statistics = [
+            InstallationStatisticsFactory(data_created_datetime=datetime(2017, month, 5, tzinfo=UTC))
+            for month in (5, 6, 7)
+        ]
+        self.partition_created = create_partition(date(2017, 6, 1))
+        self.partition_name = get_partition_name(date(2017, 6, 1))
+
+    @staticmethod
+    def get_plan(query):
+        """
+        Get the plan of the first captured query.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN ' + query.captured_queries[0]['sql'])
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def assert_partition_is_pruned(self, plan):
+        """
+        Verify that only the June partition is scanned by the plan.
+        """
+        self.assertIn(self.partition_name, plan)
+        self.assertNotIn(get_default_partition_name(), plan)
+
+    def test_create_partition(self):
+        """
+        Verify that the month statistics are moved from the default partition to the created month partition.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT id FROM {}'.format(self.partition_name))
+            partition_ids = [row[0] for row in cursor.fetchall()]
+
+        self.assertTrue(self.partition_created)
+        self.assertFalse(create_partition(date(2017, 6, 1)))
+        self.assertIn(date(2017, 6, 1), get_partition_months())
+        self.assertEqual([date(2017, 5, 1), date(2017, 7, 1)], get_default_partition_months())
+        self.assertEqual([self.statistics[1].pk], partition_ids)
+        self.assertEqual(3, InstallationStatistics.objects.count())
+
+    @patch('olga.analytics.models.get_last_calendar_day')
+    def test_overall_counts_prunes_partitions(self, mock_get_last_calendar_day):
+        """
+        Verify that the overall counts of the last calendar day are aggregated from the day partition only.
+        """
+        mock_get_last_calendar_day.return_value = date(2017, 6, 5), date(2017, 6, 6)
+
+        with CaptureQueriesContext(connection) as query:
+            InstallationStatistics.overall_counts()
+
+        self.assert_partition_is_pruned(self.get_plan(query))
+
+    def test_stats_for_the_date_prunes_partitions(self):
+        """
+        Verify that the installation statistics of the date are looked up in the date partition only.
+        """
+        with CaptureQueriesContext(connection) as query:
+            InstallationStatistics.get_stats_for_the_date(
+                datetime(2017, 6, 5, tzinfo=UTC), self.statistics[1].edx_installation
+            )
+
+        self.assert_partition_is_pruned(self.get_plan(query))
+
+    def test_archive_partition(self):
+        """
+        Verify that the archived statistics are kept by the archive table, that doesn't prevent installations removal.
+        """
+        archive_name = archive_partition(date(2017, 6, 1))
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT id FROM {}'.format(archive_name))
+            archive_ids = [row[0] for row in cursor.fetchall()]
+
+        self.statistics[1].edx_installation.delete()
+
+        self.assertEqual('analytics_installationstatistics_archive_y2017m06', archive_name)
+        self.assertEqual([self.statistics[1].pk], archive_ids)
+        self.assertNotIn(date(2017, 6, 1), get_partition_months())
+        self.assertEqual(2, InstallationStatistics.objects.count())
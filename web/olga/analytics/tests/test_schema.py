@@ -0,0 +1,95 @@
+"""
+Tests for the received statistics schema.
+"""
+
+from datetime import datetime
+import uuid
+
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from olga.analytics.schema import JSONCountsField, validate_statistics
+from olga.analytics.tests.test_views import InstallationDefaultData
+
+# pylint: disable=invalid-name
+
+
+class TestJSONCountsField(TestCase):
+    """
+    Tests for the JSON counts field.
+    """
+
+    def test_counts_are_decoded(self):
+        """
+        Verify that JSON strings and decoded objects are accepted and the empty value is an empty object.
+        """
+        field = JSONCountsField()
+
+        self.assertEqual({'RU': 1}, field.clean('{"RU": 1}'))
+        self.assertEqual({'RU': 1}, field.clean({'RU': 1}))
+        self.assertEqual({}, field.clean(None))
+
+    def test_date_keys_are_parsed(self):
+        """
+        Verify that date keys are parsed to datetimes.
+        """
+        self.assertEqual(
+            {datetime(2018, 5, 1): 1}, JSONCountsField(date_keys=True).clean('{"2018-05-01": 1}')
+        )
+
+    def test_wrong_counts(self):
+        """
+        Verify that not JSON objects, not integer counts and wrong dates are not valid.
+        """
+        for value in ('wrong json', '[1]', '{"RU": "1"}', '{"RU": true}'):
+            with self.assertRaises(ValidationError):
+                JSONCountsField().clean(value)
+
+        with self.assertRaises(ValidationError):
+            JSONCountsField(date_keys=True).clean('{"2018-5": 1}')
+
+
+class TestValidateStatistics(TestCase):
+    """
+    Tests for the received statistics validation.
+    """
+
+    def setUp(self):
+        """
+        Create installation default data.
+        """
+        self.received_data, _, __ = InstallationDefaultData().create_installation_default_data()
+
+    def test_enthusiast_statistics_are_typed(self):
+        """
+        Verify that enthusiast statistics fields are provided as the typed values.
+        """
+        statistics = validate_statistics(self.received_data)
+
+        self.assertEqual(uuid.UUID(self.received_data['access_token']), statistics['access_token'])
+        self.assertEqual(10, statistics['active_students_amount_day'])
+        self.assertEqual((50.1, 40.5), (statistics['latitude'], statistics['longitude']))
+        self.assertEqual({datetime(2018, 5, 1): 1, datetime(2015, 1, 1): 4}, statistics['registered_students'])
+        self.assertEqual({'RU': 10, 'CA': 5, 'UA': 20}, statistics['students_per_country'])
+
+    def test_only_received_level_is_validated(self):
+        """
+        Verify that paranoid statistics are not validated and provided with the enthusiast fields.
+        """
+        self.received_data.update(statistics_level='paranoid', latitude='north', platform_url='not url')
+
+        statistics = validate_statistics(self.received_data)
+
+        self.assertNotIn('latitude', statistics)
+        self.assertNotIn('platform_url', statistics)
+
+    def test_errors_are_collected(self):
+        """
+        Verify that errors of all the wrong fields are reported at once.
+        """
+        self.received_data.update(courses_amount='ten', latitude='north')
+
+        with self.assertRaises(ValidationError) as context:
+            validate_statistics(self.received_data)
+
+        self.assertEqual(['courses_amount', 'latitude'], sorted(context.exception.message_dict))
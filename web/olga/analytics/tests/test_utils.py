@@ -2,18 +2,29 @@
 Tests for analytics utils.
 """
 
+from datetime import timedelta
 from http import HTTPStatus as http
-import unittest
+import tempfile
 
 from mock import call, patch
+import requests
 
+from django.conf import settings
 from django.http import HttpResponse
 from django.test import TestCase
 from django.test.client import RequestFactory
+from django.utils import timezone
 
-from olga.analytics.utils import get_coordinates_by_platform_city_name, validate_instance_stats_forms
+from olga.analytics import utils
+from olga.analytics.models import GeocodedCity
+from olga.analytics.tests.test_views import InstallationDefaultData
+from olga.analytics.utils import (
+    GeocodingError,
+    get_coordinates_by_platform_city_name,
+    validate_instance_stats_forms,
+)
 
-# pylint: disable=invalid-name, attribute-defined-outside-init, protected-access
+# pylint: disable=invalid-name, attribute-defined-outside-init, protected-access, no-member
 
 
 class TestInstallationStatisticsFormsChecker(TestCase):
@@ -25,10 +36,7 @@ class TestInstallationStatisticsFormsChecker(TestCase):
         """
         Provide basic action and common variables as passing method to decorator (it is not intended for testing).
         """
-        factory_request = RequestFactory()
-        self.factory_request = factory_request
-
-        self.factory_request_post = factory_request.post('/api/installation/statistics/', {'kwargs': 'kwargs'})
+        self.received_data, _, __ = InstallationDefaultData().create_installation_default_data()
         self.fake_response = 'fake_response'
 
         with patch('olga.analytics.views.ReceiveInstallationStatistics.post') as self.mock_decorated_method:
@@ -36,120 +44,184 @@ class TestInstallationStatisticsFormsChecker(TestCase):
 
         self.decorator_wrapper = validate_instance_stats_forms(self.mock_decorated_method)
 
-    def change_query_dict(self, key, value):
+    def get_request(self, **changes):
         """
-        Change request post kwarg.
+        Provide the statistics request with the changed received data.
         """
-        self.factory_request_post.POST._mutable = True
-        self.factory_request_post.POST[key] = value
-        self.factory_request_post.POST._mutable = False
+        self.received_data.update(changes)
+        return RequestFactory().post('/api/installation/statistics/', self.received_data)
 
-    @patch('olga.analytics.forms.EdxInstallationParanoidLevelForm.is_valid')
-    @patch('olga.analytics.forms.InstallationStatisticsParanoidLevelForm.is_valid')
-    def test_paranoid_level_forms_are_valid(self, mock_paranoid_installation_form, mock_paranoid_statistics_form):
+    def test_paranoid_level_forms_are_valid(self):
         """
         Verify, that installation_statistics_forms_checker decorator returns correct result if forms are valid.
         """
-        mock_paranoid_installation_form.return_value = mock_paranoid_statistics_form.return_value = True
+        request = self.get_request(statistics_level='paranoid', students_per_country='wrong json')
 
-        self.change_query_dict('statistics_level', 'paranoid')
+        self.decorator_wrapper_response = self.decorator_wrapper(request)
 
-        self.decorator_wrapper_response = self.decorator_wrapper(self.factory_request_post)
         self.assertEqual(self.fake_response, self.decorator_wrapper_response)
+        self.assertNotIn('students_per_country', request.statistics)
 
-    @patch('olga.analytics.forms.EdxInstallationParanoidLevelForm.is_valid')
-    @patch('olga.analytics.forms.InstallationStatisticsParanoidLevelForm.is_valid')
-    def test_paranoid_level_forms_are_not_valid(self, mock_paranoid_installation_form, mock_paranoid_statistics_form):
+    def test_paranoid_level_forms_are_not_valid(self):
         """
         Verify, that installation_statistics_forms_checker decorator returns correct result if forms are not valid.
         """
-        mock_paranoid_installation_form.return_value = mock_paranoid_statistics_form.return_value = False
-
-        self.change_query_dict('statistics_level', 'paranoid')
-
-        self.decorator_wrapper_response = self.decorator_wrapper(self.factory_request_post)
+        self.decorator_wrapper_response = self.decorator_wrapper(
+            self.get_request(statistics_level='paranoid', courses_amount='ten')
+        )
 
         self.assertEqual(http.UNAUTHORIZED, self.decorator_wrapper_response.status_code)
         self.assertEqual(HttpResponse, self.decorator_wrapper_response.__class__)
 
-    @patch('olga.analytics.forms.EdxInstallationEnthusiastLevelForm.is_valid')
-    @patch('olga.analytics.forms.InstallationStatisticsEnthusiastLevelForm.is_valid')
-    def test_enthusiast_level_forms_are_valid(self, mock_enthusiast_installation_form, mock_enthusiast_statistics_form):
+    def test_enthusiast_level_forms_are_valid(self):
         """
         Verify, that installation_statistics_forms_checker decorator returns correct result if forms are valid.
         """
-        mock_enthusiast_installation_form.return_value = mock_enthusiast_statistics_form.return_value = True
+        request = self.get_request()
 
-        self.change_query_dict('statistics_level', 'enthusiast')
+        self.decorator_wrapper_response = self.decorator_wrapper(request)
 
-        self.decorator_wrapper_response = self.decorator_wrapper(self.factory_request_post)
         self.assertEqual(self.fake_response, self.decorator_wrapper_response)
+        self.assertEqual({'RU': 10, 'CA': 5, 'UA': 20}, request.statistics['students_per_country'])
 
-    @patch('olga.analytics.forms.EdxInstallationEnthusiastLevelForm.is_valid')
-    @patch('olga.analytics.forms.InstallationStatisticsEnthusiastLevelForm.is_valid')
-    def test_enthusiast_level_forms_are_not_valid(
-            self, mock_enthusiast_installation_form, mock_enthusiast_statistics_form
-    ):
+    def test_enthusiast_level_forms_are_not_valid(self):
         """
         Verify, that installation_statistics_forms_checker decorator returns correct result if forms are not valid.
         """
-        mock_enthusiast_installation_form.return_value = mock_enthusiast_statistics_form.return_value = False
+        self.decorator_wrapper_response = self.decorator_wrapper(self.get_request(latitude='north'))
 
-        self.change_query_dict('statistics_level', 'enthusiast')
+        self.assertEqual(http.UNAUTHORIZED, self.decorator_wrapper_response.status_code)
+        self.assertEqual(HttpResponse, self.decorator_wrapper_response.__class__)
 
-        self.decorator_wrapper_response = self.decorator_wrapper(self.factory_request_post)
+    def test_unknown_statistics_level(self):
+        """
+        Verify, that installation_statistics_forms_checker decorator rejects an unknown statistics level.
+        """
+        self.decorator_wrapper_response = self.decorator_wrapper(self.get_request(statistics_level='unknown'))
 
         self.assertEqual(http.UNAUTHORIZED, self.decorator_wrapper_response.status_code)
-        self.assertEqual(HttpResponse, self.decorator_wrapper_response.__class__)
 
-    @patch('olga.analytics.forms.EdxInstallationParanoidLevelForm.is_valid')
-    @patch('olga.analytics.forms.InstallationStatisticsParanoidLevelForm.is_valid')
-    def test_decorated_method_if_forms_are_valid(self, mock_paranoid_installation_form, mock_paranoid_statistics_form):
+    def test_decorated_method_if_forms_are_valid(self):
         """
         Verify, that decorated REST method called once with corresponding request, agrs and kwargs.
         """
-        mock_paranoid_installation_form.return_value = mock_paranoid_statistics_form.return_value = True
+        request = self.get_request(statistics_level='paranoid')
 
-        self.change_query_dict('statistics_level', 'paranoid')
+        self.decorator_wrapper(request)
+        self.mock_decorated_method.assert_called_once_with(request)
 
-        self.decorator_wrapper(self.factory_request_post)
-        self.mock_decorated_method.assert_called_once_with(self.factory_request_post)
 
-
-@patch('olga.analytics.utils.requests.get')
-class TestPlatformCoordinates(unittest.TestCase):
+@patch('olga.analytics.utils.get_geocoding_session')
+class TestPlatformCoordinates(TestCase):
     """
     Test for platform coordinates method, that gather latitude and longitude.
     """
 
-    def tests_sending_requests(self, mock_request):
+    def setUp(self):
+        """
+        Reset the offline gazetteer, that is loaded once per process.
+        """
+        utils.gazetteer = None
+
+    def tests_sending_requests(self, mock_session):
         """
         Test to prove that method send request to needed corresponding URL.
         """
+        mock_session.return_value.get.return_value.status_code = 200
+        mock_session.return_value.get.return_value.json.return_value = []
+
         # Verify that get_coordinates_by_platform_city_name sends request to API with address as parameter.
         get_coordinates_by_platform_city_name('Kiev')
 
         expected_calls = [
-            call('https://nominatim.openstreetmap.org/search/', params={'city': 'Kiev', 'format': 'json'}),
+            call(
+                'https://nominatim.openstreetmap.org/search/',
+                params={'city': 'Kiev', 'format': 'json'},
+                timeout=settings.GEOCODING_TIMEOUT,
+            ),
         ]
 
-        self.assertEqual(mock_request.call_args_list, expected_calls)
+        self.assertEqual(mock_session.return_value.get.call_args_list, expected_calls)
 
-    def test_platform_city_name_if_wrong_city_name(self, mock_request):
+    def test_platform_city_name_if_wrong_city_name(self, mock_session):
         """
         Verify that get_coordinates_by_platform_city_name returns None if platform city name in settings is wrong.
         """
-        mock_request.return_value.json.return_value = {'results': []}
+        mock_session.return_value.get.return_value.status_code = 200
+        mock_session.return_value.get.return_value.json.return_value = []
 
         result_without_city_name = get_coordinates_by_platform_city_name('Lmnasasfabqwrqrn')
         self.assertEqual(('', ''), result_without_city_name)
 
-    def test_platform_city_name_if_api_changed(self, mock_request):
+    def test_platform_city_name_if_api_changed(self, mock_session):
         """
         Verify return value if the keys in the API has been changed.
         """
-        mock_request.return_value.status_code = 200
-        mock_request.return_value.json.return_value = [{'some_other_key': "30", 'some_other_key2': "20"}]
+        mock_session.return_value.get.return_value.status_code = 200
+        mock_session.return_value.get.return_value.json.return_value = [
+            {'some_other_key': "30", 'some_other_key2': "20"}
+        ]
 
         result_without_city_name = get_coordinates_by_platform_city_name('Kharkov')
         self.assertEqual(('', ''), result_without_city_name)
+
+    def test_coordinates_are_cached(self, mock_session):
+        """
+        Verify that found coordinates are requested once for the same city, regardless of its spelling.
+        """
+        mock_session.return_value.get.return_value.status_code = 200
+        mock_session.return_value.get.return_value.json.return_value = [{'lat': '49.99', 'lon': '36.27'}]
+
+        get_coordinates_by_platform_city_name('Kharkiv')
+        result = get_coordinates_by_platform_city_name(' kharkiv ')
+
+        self.assertEqual((49.99, 36.27), result)
+        self.assertEqual(1, mock_session.return_value.get.call_count)
+
+    def test_not_found_city_is_cached(self, mock_session):
+        """
+        Verify that not found city is not requested again until the negative cache expires.
+        """
+        mock_session.return_value.get.return_value.status_code = 200
+        mock_session.return_value.get.return_value.json.return_value = []
+
+        get_coordinates_by_platform_city_name('Kharkiv')
+        result = get_coordinates_by_platform_city_name('Kharkiv')
+
+        GeocodedCity.objects.update(updated_datetime=timezone.now() - timedelta(days=2))
+        get_coordinates_by_platform_city_name('Kharkiv')
+
+        self.assertEqual(('', ''), result)
+        self.assertEqual(2, mock_session.return_value.get.call_count)
+
+    def test_service_failure_is_not_cached(self, mock_session):
+        """
+        Verify that the city is requested again after the timeout and the error response of the service.
+        """
+        mock_session.return_value.get.side_effect = requests.Timeout()
+
+        with self.assertRaises(GeocodingError):
+            get_coordinates_by_platform_city_name('Kharkiv')
+
+        mock_session.return_value.get.side_effect = None
+        mock_session.return_value.get.return_value.status_code = 503
+
+        with self.assertRaises(GeocodingError):
+            get_coordinates_by_platform_city_name('Kharkiv')
+
+        self.assertEqual(2, mock_session.return_value.get.call_count)
+        self.assertFalse(GeocodedCity.objects.exists())
+
+    def test_gazetteer_lookup(self, mock_session):
+        """
+        Verify that city from the offline gazetteer is not requested from the service.
+        """
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as gazetteer_file:
+            gazetteer_file.write('Kharkiv,49.99,36.27\n')
+            gazetteer_file.flush()
+
+            with self.settings(GEOCODING_GAZETTEER_PATH=gazetteer_file.name):
+                result = get_coordinates_by_platform_city_name('KHARKIV')
+
+        self.assertEqual((49.99, 36.27), result)
+        self.assertFalse(mock_session.return_value.get.called)
@@ -2,21 +2,28 @@
 Tests for analytics views.
 """
 
-import copy
+import gzip
 import hashlib
 from http import HTTPStatus as http
 import json
 import uuid
 from datetime import datetime
 
-from mock import patch, call
+from mock import Mock, patch, call
 
-from django.http import HttpResponse, QueryDict
+from django.db import connection
+from django.http import HttpResponse
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils.encoding import force_text
 from django.utils.crypto import get_random_string
 
-from olga.analytics.models import EdxInstallation, InstallationStatistics
+from olga.analytics.cache import get_statistics_generation, installation_cache
+from olga.analytics.models import (
+    DailyStatistics, EdxInstallation, GeocodedCity, InstallationStatistics, MonthlyCountryStatistics,
+    ReceivedStatistics,
+)
+from olga.analytics.schema import validate_statistics
 from olga.analytics.tests.factories import EdxInstallationFactory
 
 from olga.analytics.views import (
@@ -191,8 +198,9 @@ class TestAccessTokenRegistration(TestCase):
 
         x_forward_for = '123.0.0.2'
         uid = hashlib.md5(x_forward_for.encode('utf-8')).hexdigest()
+        # Access tokens are unique, so the second installation gets another one.
+        mock_uuid4.return_value = Mock(hex=uuid.uuid4().hex)
         self.client.post('/api/token/registration/', HTTP_X_FORWARDED_FOR=x_forward_for)
-        mock_uuid4.return_value = MockUUID4()
 
         mock_logger_debug.assert_any_call(
             'OLGA registered edX installation with token %s for uid %s',
@@ -268,8 +276,10 @@ class TestReceiveInstallationStatisticsHelpers(TestCase):
         """
         self.received_data, self.installation_statistics, self.enthusiast_edx_installation = \
             InstallationDefaultData().create_installation_default_data()
+        self.statistics = validate_statistics(self.received_data)
 
         self.access_token = self.received_data.get('access_token')
+        installation_cache.clear()
 
     def test_update_students_with_no_country(self):
         """
@@ -296,7 +306,7 @@ class TestReceiveInstallationStatisticsHelpers(TestCase):
         Test get_students_per_country method correctly return students per country value.
         """
         active_students_amount_day = 40
-        students_per_country = "{\"RU\": 10, \"CA\": 5, \"UA\": 20}"
+        students_per_country = {'RU': 10, 'CA': 5, 'UA': 20}
 
         result = ReceiveInstallationStatistics().get_students_per_country(
             students_per_country, active_students_amount_day
@@ -315,7 +325,7 @@ class TestReceiveInstallationStatisticsHelpers(TestCase):
         )
 
         ReceiveInstallationStatistics().extend_stats_to_enthusiast(
-            self.received_data, self.installation_statistics, edx_installation_object
+            self.statistics, self.installation_statistics, edx_installation_object
         )
 
         extended_edx_installation_object_attributes = EdxInstallation.objects.first().__dict__
@@ -328,20 +338,62 @@ class TestReceiveInstallationStatisticsHelpers(TestCase):
 
         When received data hasn't latitude, longitude but has platform_city_name.
         """
+        GeocodedCity.objects.create(city_name='kiev', latitude=50.4500644, longitude=30.5241037)
         edx_installation_object = EdxInstallationFactory(
             platform_name=None, platform_url=None, latitude=None, longitude=None
         )
 
-        self.received_data['latitude'] = ''
-        self.received_data['longitude'] = ''
+        self.statistics['latitude'] = self.statistics['longitude'] = None
 
         ReceiveInstallationStatistics().extend_stats_to_enthusiast(
-            self.received_data, self.installation_statistics, edx_installation_object,
+            self.statistics, self.installation_statistics, edx_installation_object,
         )
 
         stats = EdxInstallation.objects.last()
 
         self.assertEqual((50.4500644, 30.5241037), (stats.latitude, stats.longitude))
+        self.assertFalse(stats.coordinates_pending)
+
+    @patch('olga.analytics.utils.request_coordinates_by_platform_city_name')
+    def test_extend_stats_with_not_cached_platform_city_name(self, mock_request_coordinates):
+        """
+        Verify that not cached platform city name is left to be resolved in the background.
+        """
+        edx_installation_object = EdxInstallationFactory(
+            platform_name=None, platform_url=None, latitude=None, longitude=None
+        )
+
+        self.statistics['latitude'] = self.statistics['longitude'] = None
+
+        ReceiveInstallationStatistics().extend_stats_to_enthusiast(
+            self.statistics, self.installation_statistics, edx_installation_object,
+        )
+
+        stats = EdxInstallation.objects.last()
+
+        self.assertEqual((None, None), (stats.latitude, stats.longitude))
+        self.assertEqual(('Kiev', True), (stats.platform_city_name, stats.coordinates_pending))
+        self.assertFalse(mock_request_coordinates.called)
+
+    def test_extend_stats_keeps_resolved_coordinates(self):
+        """
+        Verify that coordinates resolved in the background are not overwritten by the cached installation copy.
+        """
+        edx_installation_object = EdxInstallationFactory(latitude=None, longitude=None, coordinates_pending=True)
+        installation_cache.get(edx_installation_object.access_token)
+        GeocodedCity.objects.create(city_name='kiev')
+        EdxInstallation.objects.update(latitude=50.45, longitude=30.52, coordinates_pending=False)
+
+        self.statistics['latitude'] = self.statistics['longitude'] = None
+
+        ReceiveInstallationStatistics().extend_stats_to_enthusiast(
+            self.statistics, self.installation_statistics, edx_installation_object,
+        )
+
+        stats = EdxInstallation.objects.get()
+
+        self.assertEqual((50.45, 30.52, False), (stats.latitude, stats.longitude, stats.coordinates_pending))
+        self.assertEqual(1, installation_cache.stats()['size'])
 
     def test_extend_stats_without_platform_city_name(self):
         """
@@ -353,12 +405,11 @@ class TestReceiveInstallationStatisticsHelpers(TestCase):
             platform_name=None, platform_url=None, latitude=None, longitude=None
         )
 
-        self.received_data['latitude'] = ''
-        self.received_data['longitude'] = ''
-        self.received_data['platform_city_name'] = ''
+        self.statistics['latitude'] = self.statistics['longitude'] = None
+        self.statistics['platform_city_name'] = None
 
         ReceiveInstallationStatistics().extend_stats_to_enthusiast(
-            self.received_data, self.installation_statistics, edx_installation_object,
+            self.statistics, self.installation_statistics, edx_installation_object,
         )
 
         stats = EdxInstallation.objects.first()
@@ -377,17 +428,19 @@ class TestReceiveInstallationStatisticsHelpers(TestCase):
         edx_installation_object = EdxInstallationFactory()
         mock_edx_installation_objects_get.return_value = edx_installation_object
         ReceiveInstallationStatistics().process_instance_datas(
-            self.received_data, self.received_data['access_token']
+            validate_statistics(self.received_data), self.received_data['access_token']
         )
 
         self.assertEqual(0, mock_receive_installation_statistics_extend_stats_to_enthusiast.call_count)
 
+    @patch('olga.analytics.views.DailyStatistics.apply_statistics_change')
     @patch('olga.analytics.models.InstallationStatistics.objects.create')
     @patch('olga.analytics.models.EdxInstallation.objects.get')
     def test_installation_stats_creation_occurs(
             self,
             mock_edx_installation_objects_get,
-            mock_installation_statistics_installation_objects_create
+            mock_installation_statistics_installation_objects_create,
+            mock_daily_statistics_apply_statistics_change
     ):
         """
         Verify that installation statistic creation was successfully called via `objects.create` method.
@@ -404,6 +457,9 @@ class TestReceiveInstallationStatisticsHelpers(TestCase):
         # I did debug, all passed arguments as `edx_installation_object` and `installation_statistics` equal
         # the same parameters in `create_instance_data` method. But tests did not passed.
         mock_installation_statistics_installation_objects_create.assert_called_once()
+        mock_daily_statistics_apply_statistics_change.assert_called_once_with(
+            None, mock_installation_statistics_installation_objects_create.return_value
+        )
 
     @patch('olga.analytics.views.logging.Logger.debug')
     @patch('olga.analytics.models.EdxInstallation.objects.get')
@@ -420,7 +476,7 @@ class TestReceiveInstallationStatisticsHelpers(TestCase):
         mock_edx_installation_objects_get.return_value = edx_installation_object
 
         ReceiveInstallationStatistics().process_instance_datas(
-            self.received_data, edx_installation_object.access_token
+            self.statistics, edx_installation_object.access_token
         )
 
         mock_logger_debug.assert_called_with('Corresponding data was %s in OLGA database.', 'created')
@@ -440,35 +496,35 @@ class TestReceiveInstallationStatisticsHelpers(TestCase):
         mock_edx_installation_objects_get.return_value = edx_installation_object
 
         ReceiveInstallationStatistics().process_instance_datas(
-            self.received_data, edx_installation_object.access_token
+            self.statistics, edx_installation_object.access_token
         )
 
         ReceiveInstallationStatistics().process_instance_datas(
-            self.received_data, edx_installation_object.access_token
+            self.statistics, edx_installation_object.access_token
         )
 
         mock_logger_debug.assert_any_call('Corresponding data was %s in OLGA database.', 'updated')
 
-    @patch('olga.analytics.models.EdxInstallation.objects.filter')
-    def test_is_token_authorized_if_instance_is_authorized(self, mock_edx_installation_objects_filter):
+    @patch('olga.analytics.models.EdxInstallation.objects.get')
+    def test_is_token_authorized_if_instance_is_authorized(self, mock_edx_installation_objects_get):
         """
         Verify that is_token_authorized method return True if token is authorized.
         """
-        mock_edx_installation_objects_filter.return_value = True
+        mock_edx_installation_objects_get.return_value = EdxInstallation(pk=1, access_token=self.access_token)
 
         result = AccessTokenAuthorization().is_token_authorized(self.access_token)
 
         self.assertTrue(result)
 
     @patch('olga.analytics.views.logging.Logger.debug')
-    @patch('olga.analytics.models.EdxInstallation.objects.filter')
+    @patch('olga.analytics.models.EdxInstallation.objects.get')
     def test_logger_debug_occurs_if_instance_is_authorized(
-            self, mock_edx_installation_objects_filter, mock_logger_debug
+            self, mock_edx_installation_objects_get, mock_logger_debug
     ):
         """
         Test logger`s debug output occurs if installation is authorized.
         """
-        mock_edx_installation_objects_filter.return_value = True
+        mock_edx_installation_objects_get.return_value = EdxInstallation(pk=1, access_token=self.access_token)
 
         AccessTokenAuthorization().is_token_authorized(self.access_token)
 
@@ -508,12 +564,15 @@ class TestReceiveInstallationStatisticsHelpers(TestCase):
         """
         Test logger`s debug output occurs installation details.
         """
-        ReceiveInstallationStatistics().log_debug_instance_details(self.received_data)
+        with self.settings(STATISTICS_LOG_FIELDS=['statistics_level', 'courses_amount', 'unknown']):
+            ReceiveInstallationStatistics().log_debug_instance_details(self.received_data)
 
+        statistics = {
+            'statistics_level': self.received_data['statistics_level'],
+            'courses_amount': self.received_data['courses_amount'],
+        }
         expected_logger_debugs = [
-            call((
-                json.dumps(self.received_data, sort_keys=True, indent=4)
-            ),),
+            call('Received statistics %s', statistics, extra={'statistics': statistics}),
         ]
 
         self.assertEqual(expected_logger_debugs, mock_logger_debug.call_args_list)
@@ -530,21 +589,23 @@ class TestReceiveInstallationStatistics(TestCase):
         """
         self.received_data, _, __ = InstallationDefaultData().create_installation_default_data()
         self.access_token = self.received_data.get('access_token')
-        self.received_data_as_query_dict = self.create_query_dict_from_dict(self.received_data)
 
         EdxInstallationFactory(access_token=self.access_token)
+        installation_cache.clear()
 
-    @staticmethod
-    def create_query_dict_from_dict(simple_dict):
+    def get_json_received_data(self):
         """
-        Convert common dictionary to query dictionary, that uses in request processes.
+        Provide the received data as a JSON object with the decoded values, as the JSON body is sent.
         """
-        simple_dict_deep_copy = copy.deepcopy(simple_dict)
+        received_data = dict(self.received_data)
+
+        for field in ('students_per_country', 'registered_students', 'enthusiastic_students', 'generated_certificates'):
+            received_data[field] = json.loads(received_data[field])
 
-        query_dict = QueryDict('', mutable=True)
-        query_dict.update(simple_dict_deep_copy)
+        for field in ('active_students_amount_day', 'active_students_amount_week', 'courses_amount'):
+            received_data[field] = int(received_data[field])
 
-        return query_dict
+        return received_data
 
     def test_post_method(self):
         """
@@ -555,6 +616,56 @@ class TestReceiveInstallationStatistics(TestCase):
         self.assertEqual(http.CREATED, response.status_code)
         self.assertEqual(HttpResponse, response.__class__)
 
+    def test_post_json_body(self):
+        """
+        Verify that statistics are received as the JSON body with the decoded values.
+        """
+        response = self.client.post(
+            '/api/installation/statistics/', json.dumps(self.get_json_received_data()), content_type='application/json'
+        )
+
+        self.assertEqual(http.CREATED, response.status_code)
+        self.assertEqual(6, InstallationStatistics.objects.count())
+        self.assertEqual(
+            {'RU': 10, 'CA': 5, 'UA': 20},
+            InstallationStatistics.objects.get(data_created_datetime__date=datetime.now()).students_per_country
+        )
+
+    def test_post_gzip_compressed_json_body(self):
+        """
+        Verify that statistics are received as the gzip-compressed JSON body.
+        """
+        response = self.client.post(
+            '/api/installation/statistics/',
+            gzip.compress(json.dumps(self.get_json_received_data()).encode()),
+            content_type='application/json',
+            HTTP_CONTENT_ENCODING='gzip',
+        )
+
+        self.assertEqual(http.CREATED, response.status_code)
+        self.assertEqual(6, InstallationStatistics.objects.count())
+
+    def test_post_wrong_json_body(self):
+        """
+        Verify that not decoded, not JSON object and too large decompressed bodies are not valid.
+        """
+        wrong_bodies = [
+            ('{"access_token": ', {}),
+            ('[]', {}),
+            ('{}', {'HTTP_CONTENT_ENCODING': 'gzip'}),
+            (gzip.compress(json.dumps(self.get_json_received_data()).encode()), {'HTTP_CONTENT_ENCODING': 'gzip'}),
+        ]
+
+        with self.settings(DATA_UPLOAD_MAX_MEMORY_SIZE=500):
+            for body, headers in wrong_bodies:
+                response = self.client.post(
+                    '/api/installation/statistics/', body, content_type='application/json', **headers
+                )
+
+                self.assertEqual(http.UNAUTHORIZED, response.status_code)
+
+        self.assertFalse(InstallationStatistics.objects.exists())
+
     @patch('olga.analytics.views.AccessTokenAuthorization.is_token_authorized')
     def test_post_method_if_token_is_unauthorized(self, mock_is_token_authorized):
         """
@@ -575,13 +686,35 @@ class TestReceiveInstallationStatistics(TestCase):
         self.client.post('/api/installation/statistics/', self.received_data)
         mock_is_token_authorized.assert_called_once_with(self.access_token)
 
+    @patch('olga.analytics.views.ReceiveInstallationStatistics.is_request_logged', Mock(return_value=True))
     @patch('olga.analytics.views.ReceiveInstallationStatistics.log_debug_instance_details')
     def test_log_debug_instance_details(self, mock_logger_debug_instance_details):
         """
         Verify that logger`s debug output occurs.
         """
         self.client.post('/api/installation/statistics/', self.received_data)
-        mock_logger_debug_instance_details.assert_called_once_with(self.received_data_as_query_dict)
+        mock_logger_debug_instance_details.assert_called_once_with(self.received_data)
+
+    @patch('olga.analytics.views.ReceiveInstallationStatistics.log_debug_instance_details')
+    def test_instance_details_are_not_logged_without_debug(self, mock_logger_debug_instance_details):
+        """
+        Verify that received statistics are not logged, if debug logging is disabled.
+        """
+        with patch('olga.analytics.views.logger.isEnabledFor', return_value=False):
+            self.client.post('/api/installation/statistics/', self.received_data)
+
+        mock_logger_debug_instance_details.assert_not_called()
+
+    @patch('olga.analytics.views.logger.isEnabledFor', Mock(return_value=True))
+    def test_requests_are_logged_by_sample_rate(self):
+        """
+        Verify that requests are sampled by the sample rate, if debug logging is enabled.
+        """
+        with self.settings(STATISTICS_LOG_SAMPLE_RATE=0):
+            self.assertFalse(ReceiveInstallationStatistics.is_request_logged())
+
+        with self.settings(STATISTICS_LOG_SAMPLE_RATE=1):
+            self.assertTrue(ReceiveInstallationStatistics.is_request_logged())
 
     @patch('olga.analytics.views.ReceiveInstallationStatistics.process_instance_datas')
     def test_process_instance_datas_occurs(self, mock_process_intance_data):
@@ -590,7 +723,7 @@ class TestReceiveInstallationStatistics(TestCase):
         """
         self.client.post('/api/installation/statistics/', self.received_data)
         mock_process_intance_data.assert_called_with(
-            self.received_data_as_query_dict, self.received_data.get('access_token')
+            validate_statistics(self.received_data), self.received_data.get('access_token')
         )
 
     def test_multiply_process_instance_datas_in_same_day(self):
@@ -608,3 +741,207 @@ class TestReceiveInstallationStatistics(TestCase):
             int(self.received_data['active_students_amount_day']),
             stats.order_by('-data_created_datetime').first().active_students_amount_day
         )
+
+    def test_daily_statistics_are_updated(self):
+        """
+        Verify that received statistics are added to the daily statistics rollup once per installation and day.
+        """
+        self.client.post('/api/installation/statistics/', self.received_data)
+        self.received_data['active_students_amount_day'] = '30'
+        self.client.post('/api/installation/statistics/', self.received_data)
+
+        today = DailyStatistics.objects.order_by('day').last()
+
+        self.assertEqual(6, DailyStatistics.objects.count())
+        self.assertEqual((30, 10, 1), (today.students, today.courses, today.instances))
+
+    def test_monthly_country_statistics_are_updated(self):
+        """
+        Verify that overwritten same-day students per country replace the previous ones in the month statistics.
+        """
+        self.client.post('/api/installation/statistics/', self.received_data)
+        self.received_data['students_per_country'] = '{"RU": 1, "CA": 2}'
+        self.client.post('/api/installation/statistics/', self.received_data)
+
+        months = MonthlyCountryStatistics.get_months().values()
+
+        self.assertEqual([{'RU': 1, 'CA': 2}], [month['countries'] for month in months if month['countries']])
+
+    def test_post_method_with_async_ingestion(self):
+        """
+        Verify that statistics are stored for the later processing and accepted, when asynchronous ingestion is enabled.
+        """
+        with self.settings(STATISTICS_ASYNC_INGESTION=True):
+            response = self.client.post('/api/installation/statistics/', self.received_data)
+
+        self.assertEqual(http.ACCEPTED, response.status_code)
+        self.assertFalse(InstallationStatistics.objects.exists())
+        self.assertEqual(self.received_data, ReceivedStatistics.objects.get().payload)
+
+    def test_statistics_generation_is_changed(self):
+        """
+        Verify that saved statistics change the statistics data generation, so the cached charts are recomputed.
+        """
+        generation = get_statistics_generation()
+
+        self.client.post('/api/installation/statistics/', self.received_data)
+
+        self.assertEqual(generation + 1, get_statistics_generation())
+
+
+class TestReceiveInstallationStatisticsBatch(TestCase):
+    """
+    Tests for receive installation statistics batch.
+    """
+
+    def setUp(self):
+        """
+        Create reports of two installations.
+        """
+        self.reports = []
+
+        for _ in range(2):
+            received_data, _, __ = InstallationDefaultData().create_installation_default_data()
+            received_data['access_token'] = str(uuid.uuid4())
+            EdxInstallationFactory(access_token=received_data['access_token'])
+            self.reports.append(received_data)
+
+        installation_cache.clear()
+
+    def post_reports(self, reports):
+        """
+        Post the reports batch.
+        """
+        return self.client.post(
+            '/api/installation/statistics/batch/', json.dumps({'reports': reports}), content_type='application/json'
+        )
+
+    def test_reports_are_processed(self):
+        """
+        Verify that authorized reports are applied and results are provided in the reports order.
+        """
+        unknown_report = dict(self.reports[0], access_token=str(uuid.uuid4()))
+        wrong_report = dict(self.reports[0], courses_amount='ten')
+        generation = get_statistics_generation()
+
+        response = self.post_reports(self.reports + [unknown_report, wrong_report])
+
+        self.assertEqual(http.OK, response.status_code)
+        self.assertEqual(
+            [
+                {'status': 201},
+                {'status': 201},
+                {'status': 401},
+                {'status': 401, 'errors': {'courses_amount': ['Enter a whole number.']}},
+            ],
+            response.json()['reports']
+        )
+        self.assertEqual(12, InstallationStatistics.objects.count())
+        # Access tokens are authorized at once and the authorized installations are processed as they are,
+        # the cache is kept, as the enthusiast installations are updated without the invalidation.
+        self.assertEqual({'hits': 0, 'misses': 3, 'size': 2}, installation_cache.stats())
+        self.assertEqual(generation + 1, get_statistics_generation())
+
+    @patch('olga.analytics.views.ReceiveInstallationStatistics.get_all_stats_by_dates')
+    def test_failed_report_does_not_affect_others(self, mock_get_all_stats_by_dates):
+        """
+        Verify that a failed report is reported and the other reports are still applied.
+        """
+        mock_get_all_stats_by_dates.side_effect = [ValueError('Failure'), {}]
+
+        response = self.post_reports(self.reports)
+
+        self.assertEqual([{'status': 500}, {'status': 201}], response.json()['reports'])
+        self.assertEqual(
+            [self.reports[1]['access_token']],
+            [str(stats.edx_installation.access_token) for stats in InstallationStatistics.objects.all()]
+        )
+
+    @patch('olga.analytics.models.InstallationStatistics.save_statistics')
+    def test_failed_reports_saving(self, mock_save_statistics):
+        """
+        Verify that all the prepared reports are reported as failed, if their statistics were not saved.
+        """
+        mock_save_statistics.side_effect = ValueError('Failure')
+
+        response = self.post_reports(self.reports)
+
+        self.assertEqual([{'status': 500}, {'status': 500}], response.json()['reports'])
+
+    def test_reports_are_saved_with_constant_queries(self):
+        """
+        Verify that statistics, history and rollups of any amount of reports are saved with the same queries amount.
+        """
+        reports = []
+
+        for _ in range(6):
+            received_data, _, __ = InstallationDefaultData().create_installation_default_data()
+            received_data.update(access_token=str(uuid.uuid4()), statistics_level='paranoid')
+            EdxInstallationFactory(access_token=received_data['access_token'])
+            reports.append(received_data)
+
+        with CaptureQueriesContext(connection) as two_reports_queries:
+            self.post_reports(reports[:2])
+
+        with CaptureQueriesContext(connection) as six_reports_queries:
+            self.post_reports(reports[2:])
+
+        self.assertEqual(len(two_reports_queries), len(six_reports_queries))
+        self.assertEqual(6 * 6, InstallationStatistics.objects.count())
+
+    def test_same_installation_reports(self):
+        """
+        Verify that reports of the same installation are applied in order and the rollups match the statistics.
+        """
+        updated_report = dict(self.reports[0], courses_amount='20', students_per_country='{"RU": 10, "UA": 5}')
+
+        response = self.post_reports(self.reports + [updated_report])
+
+        self.assertEqual([{'status': 201}] * 3, response.json()['reports'])
+        self.assertEqual(12, InstallationStatistics.objects.count())
+        self.assertEqual(
+            [10, 20], sorted(InstallationStatistics.objects.filter(courses_amount__gt=0).values_list(
+                'courses_amount', flat=True
+            ))
+        )
+
+        daily_statistics = list(DailyStatistics.objects.order_by('day').values_list(
+            'day', 'students', 'courses', 'instances', 'registered_students', 'generated_certificates'
+        ))
+        months = MonthlyCountryStatistics.get_months()
+        DailyStatistics.rebuild()
+        MonthlyCountryStatistics.rebuild()
+
+        self.assertEqual(daily_statistics, list(DailyStatistics.objects.order_by('day').values_list(
+            'day', 'students', 'courses', 'instances', 'registered_students', 'generated_certificates'
+        )))
+        self.assertEqual(months, MonthlyCountryStatistics.get_months())
+
+    def test_reports_are_queued(self):
+        """
+        Verify that authorized reports are queued at once, when asynchronous ingestion is enabled.
+        """
+        with self.settings(STATISTICS_ASYNC_INGESTION=True):
+            response = self.post_reports(self.reports)
+
+        self.assertEqual([{'status': 202}, {'status': 202}], response.json()['reports'])
+        self.assertFalse(InstallationStatistics.objects.exists())
+        self.assertEqual(
+            sorted(report['access_token'] for report in self.reports),
+            sorted(str(report.access_token) for report in ReceivedStatistics.objects.all())
+        )
+
+    def test_wrong_batch(self):
+        """
+        Verify that the body should be a JSON object with the list of the limited amount of the reports.
+        """
+        self.assertEqual(
+            http.BAD_REQUEST, self.client.post('/api/installation/statistics/batch/', self.reports[0]).status_code
+        )
+        self.assertEqual(http.BAD_REQUEST, self.post_reports(self.reports[0]).status_code)
+        self.assertEqual(http.BAD_REQUEST, self.post_reports(['report']).status_code)
+
+        with self.settings(STATISTICS_BATCH_MAX_REPORTS=1):
+            self.assertEqual(http.BAD_REQUEST, self.post_reports(self.reports).status_code)
+
+        self.assertFalse(InstallationStatistics.objects.exists())
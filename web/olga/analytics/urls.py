@@ -23,5 +23,11 @@ urlpatterns = [
         r'^api/installation/statistics/$',
         views.ReceiveInstallationStatistics.as_view(),
         name='api_installation_statistics'
-    )
+    ),
+
+    url(
+        r'^api/installation/statistics/batch/$',
+        views.ReceiveInstallationStatisticsBatch.as_view(),
+        name='api_installation_statistics_batch'
+    ),
 ]
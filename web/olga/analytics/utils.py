@@ -2,56 +2,148 @@
 Helpers for the analytics part of OLGA application.
 """
 
+import csv
+from datetime import timedelta
 from http import HTTPStatus as http
 import logging
+import zlib
+
 import requests
 
 
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.http import HttpResponse
+from django.utils import timezone
+
+from olga.analytics.models import GeocodedCity
+from olga.analytics.schema import validate_statistics
 
-from olga.analytics.forms import (
-    EdxInstallationParanoidLevelForm,
-    EdxInstallationEnthusiastLevelForm,
-    InstallationStatisticsParanoidLevelForm,
-    InstallationStatisticsEnthusiastLevelForm
-)
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    try:
+        from ujson import loads as json_loads
+    except ImportError:
+        from json import loads as json_loads
 
 logger = logging.getLogger(__name__)
 
-# pylint: disable=invalid-name
+# pylint: disable=invalid-name, global-statement
+
+geocoding_session = None
+gazetteer = None
+
+
+class GeocodingError(Exception):
+    """
+    Geocoding service failure, e.g. a timeout or an error response, that doesn't mean the city is not found.
+    """
+
+
+def decompress_body(body):
+    """
+    Decompress the gzip-compressed request body, that is limited by the `DATA_UPLOAD_MAX_MEMORY_SIZE` setting.
+
+    :raise ValueError: if the body isn't gzip-compressed or is too large after decompression.
+    """
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    try:
+        decompressed_body = decompressor.decompress(body, settings.DATA_UPLOAD_MAX_MEMORY_SIZE)
+    except zlib.error as error:
+        raise ValueError('Request body is not gzip-compressed: {}.'.format(error)) from error
+
+    if decompressor.unconsumed_tail:
+        raise ValueError('Decompressed request body is too large.')
+
+    return decompressed_body
+
+
+def get_received_data(request):
+    """
+    Provide the received statistics of the form-encoded or JSON request body, that may be gzip-compressed.
+
+    JSON body is decoded once by the fastest available parser, JSON encoded values of the form-encoded body
+    are decoded by the statistics validation.
+
+    :return: dictionary of the received fields.
+    :raise ValueError: if the JSON body can't be decoded.
+    """
+    if request.content_type != 'application/json':
+        return request.POST.dict()
+
+    body = request.body
+
+    if request.META.get('HTTP_CONTENT_ENCODING') == 'gzip':
+        body = decompress_body(body)
+
+    received_data = json_loads(body)
+
+    if not isinstance(received_data, dict):
+        raise ValueError('Request body is not a JSON object.')
+
+    return received_data
 
 
 def validate_instance_stats_forms(receive_instance_stats_method):
     """
-    Check if edX overall installation info and statistics are valid with corresponding forms.
+    Check if edX overall installation info and statistics of the received statistics level are valid.
+
+    Received fields and typed statistics values are provided to the decorated method as the `received_data`
+    and the `statistics` request attributes.
 
-    Returns HTTP-response with status 401, that means at least one of two forms is not valid.
+    Returns HTTP-response with status 401, that means the received statistics are not valid.
     """
     def wrapper(request, *args, **kwargs):
         """
         Wrapper.
         """
-        paranoid_installation_form = EdxInstallationParanoidLevelForm(request.POST)
-        enthusiast_installation_form = EdxInstallationEnthusiastLevelForm(request.POST)
-        paranoid_statistics_form = InstallationStatisticsParanoidLevelForm(request.POST)
-        enthusiast_statistics_form = InstallationStatisticsEnthusiastLevelForm(request.POST)
+        try:
+            request.received_data = get_received_data(request)
+            request.statistics = validate_statistics(request.received_data)
+        except (ValueError, ValidationError):
+            return HttpResponse(status=http.UNAUTHORIZED)
 
-        statistics_level = request.POST.get('statistics_level')
+        return receive_instance_stats_method(request, *args, **kwargs)
+
+    return wrapper
 
-        level_valid_forms = {
-            'paranoid': paranoid_installation_form.is_valid() and paranoid_statistics_form.is_valid(),
-            'enthusiast': enthusiast_installation_form.is_valid() and enthusiast_statistics_form.is_valid()
-        }
 
-        if level_valid_forms[statistics_level]:
-            return receive_instance_stats_method(request, *args, **kwargs)
+def get_geocoding_session():
+    """
+    Provide the pooled HTTP session for the geocoding service, that is created once per process.
+    """
+    global geocoding_session
 
-        return HttpResponse(status=http.UNAUTHORIZED)
+    if geocoding_session is None:
+        geocoding_session = requests.Session()
+        geocoding_session.headers['User-Agent'] = 'OLGA'
+        geocoding_session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=4, max_retries=1))
 
-    return wrapper
+    return geocoding_session
 
 
-def get_coordinates_by_platform_city_name(city_name):
+def get_gazetteer():
+    """
+    Provide the offline gazetteer as normalized city name to coordinates accordance, that is loaded once per process.
+
+    Gazetteer is an optional CSV file with `city_name,latitude,longitude` rows set by `GEOCODING_GAZETTEER_PATH`.
+    """
+    global gazetteer
+
+    if gazetteer is None:
+        gazetteer = {}
+
+        if settings.GEOCODING_GAZETTEER_PATH:
+            with open(settings.GEOCODING_GAZETTEER_PATH, encoding='utf-8') as gazetteer_file:
+                for city_name, latitude, longitude in csv.reader(gazetteer_file):
+                    gazetteer[GeocodedCity.normalize_city_name(city_name)] = float(latitude), float(longitude)
+
+    return gazetteer
+
+
+def request_coordinates_by_platform_city_name(city_name):
     """
     Gather coordinates from Nominatim service by the platform city name.
 
@@ -72,13 +164,84 @@ def get_coordinates_by_platform_city_name(city_name):
             'icon': 'https://nominatim.openstreetmap.org/images/mapicons/poi_place_city.p.20.png'
         }, ...
     ]
+
+    :return: tuple with latitude and longitude or two empty strings if the city was not found.
+    :raise GeocodingError: if the service wasn't reached or didn't provide the search result.
+    """
+    try:
+        geo_api = get_geocoding_session().get(
+            'https://nominatim.openstreetmap.org/search/',
+            params={'city': city_name, 'format': 'json'},
+            timeout=settings.GEOCODING_TIMEOUT,
+        )
+    except requests.RequestException as error:
+        raise GeocodingError('Nominatim API error: {}, City name: {}'.format(error, city_name)) from error
+
+    if geo_api.status_code != http.OK:
+        raise GeocodingError('Nominatim API status: {}, City name: {}'.format(geo_api.status_code, city_name))
+
+    try:
+        locations = geo_api.json()
+    except ValueError as error:
+        raise GeocodingError('Nominatim API response: {}, City name: {}'.format(error, city_name)) from error
+
+    if not locations:
+        logger.debug('Nominatim API did not find the city: %s', city_name)
+        return '', ''
+
+    return locations[0].get('lat', ''), locations[0].get('lon', '')
+
+
+def get_cached_coordinates_by_platform_city_name(city_name):
     """
-    geo_api = requests.get('https://nominatim.openstreetmap.org/search/', params={'city': city_name, 'format': 'json'})
+    Provide coordinates by the platform city name without requesting the geocoding service.
+
+    Coordinates are looked up in the offline gazetteer and then in the geocoding cache.
+
+    :return: tuple with latitude and longitude, two empty strings if the city is known to be not found
+        or None if the city has to be requested from the service.
+    """
+    normalized_city_name = GeocodedCity.normalize_city_name(city_name)
+
+    if normalized_city_name in get_gazetteer():
+        return get_gazetteer()[normalized_city_name]
+
+    cached_city = GeocodedCity.objects.filter(city_name=normalized_city_name).first()
+
+    if cached_city is None or cached_city.is_expired(
+            timedelta(days=settings.GEOCODING_CACHE_TTL_DAYS),
+            timedelta(days=settings.GEOCODING_NEGATIVE_CACHE_TTL_DAYS),
+    ):
+        return None
+
+    if cached_city.latitude is None or cached_city.longitude is None:
+        return '', ''
+
+    return cached_city.latitude, cached_city.longitude
+
+
+def get_coordinates_by_platform_city_name(city_name):
+    """
+    Provide coordinates by the platform city name.
+
+    Coordinates are requested from Nominatim service only if the city is neither in the offline gazetteer
+    nor in the geocoding cache. Service response is cached, including a not found city for a shorter time,
+    service failures are not cached.
+
+    :return: tuple with latitude and longitude or two empty strings if the city was not found.
+    :raise GeocodingError: if the service failed to search the city.
+    """
+    coordinates = get_cached_coordinates_by_platform_city_name(city_name)
+
+    if coordinates is not None:
+        return coordinates
 
-    if geo_api.status_code == 200 and geo_api.json():
-        location = geo_api.json()[0]
+    latitude, longitude = request_coordinates_by_platform_city_name(city_name)
 
-        return location.get('lat', ''), location.get('lon', '')
+    GeocodedCity.objects.update_or_create(city_name=GeocodedCity.normalize_city_name(city_name), defaults={
+        'latitude': float(latitude) if latitude and longitude else None,
+        'longitude': float(longitude) if latitude and longitude else None,
+        'updated_datetime': timezone.now(),
+    })
 
-    logger.debug('Nominatim API status: %s, City name: %s', geo_api.status_code, city_name)
-    return '', ''
+    return latitude, longitude
@@ -5,11 +5,13 @@ Views for the analytics application.
 import copy
 import hashlib
 from http import HTTPStatus as http
-import json
 import logging
+import random
 from uuid import uuid4
 
 import datetime
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db.transaction import atomic
 from django.http import HttpResponse
 from django.http import JsonResponse
@@ -17,15 +19,20 @@ from django.views.generic import View
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 
+from olga.analytics.cache import bump_statistics_generation, installation_cache
 from olga.analytics.forms import AccessTokenForm
-from olga.analytics.models import EdxInstallation, InstallationStatistics
-from olga.analytics.utils import get_coordinates_by_platform_city_name, validate_instance_stats_forms
+from olga.analytics.models import (
+    DailyStatistics, EdxInstallation, InstallationStatistics, MonthlyCountryStatistics, ReceivedStatistics,
+)
+from olga.analytics.schema import validate_statistics
+from olga.analytics.utils import (
+    get_cached_coordinates_by_platform_city_name,
+    get_received_data,
+    validate_instance_stats_forms,
+)
 
 
-logging.basicConfig()
-
 logger = logging.getLogger(__name__)
-logger.setLevel(logging.DEBUG)
 
 
 @method_decorator(csrf_exempt, name='dispatch')
@@ -92,7 +99,7 @@ class AccessTokenAuthorization(View):
         """
         Check if access token belongs to any EdxInstallation object.
         """
-        if EdxInstallation.objects.filter(access_token=access_token):
+        if installation_cache.get(access_token) is not None:
             logger.debug('edX installation with token %s was successfully authorized', access_token)
             return True
 
@@ -152,22 +159,15 @@ class ReceiveInstallationStatistics(View):
 
     def get_students_per_country(self, students_per_country, active_students_amount_day):
         """
-        Get students per country in json-based encoded string for saving to database.
-
-        Method's flow:
-        1. Load json-based students per country string and save to `students_per_country_decoded` variable.
-        2. Calculate students without country value via `update_students_with_no_country` method.
-        3. Dumps students per country dictionary to json-based string for storing in database.
+        Get students per country with the students without country for saving to database.
         """
-        students_per_country_decoded = json.loads(students_per_country)
-
         students_per_country_updated = self.update_students_with_no_country(
-            active_students_amount_day, students_per_country_decoded
+            active_students_amount_day, students_per_country
         )
 
         return students_per_country_updated
 
-    def extend_stats_to_enthusiast(self, received_data, stats, edx_installation_object):
+    def extend_stats_to_enthusiast(self, statistics, stats, edx_installation_object):
         """
         Extend installation statistics level from `Paranoid` to `Enthusiast`.
 
@@ -175,16 +175,18 @@ class ReceiveInstallationStatistics(View):
             - latitude, longitude;
             - platform name, platform url;
             - students per country.
+
+        :param statistics: validated statistics values.
         """
         students_per_country = self.get_students_per_country(
-            received_data.get('students_per_country'), int(received_data.get('active_students_amount_day'))
+            statistics['students_per_country'], statistics['active_students_amount_day']
         )
         enthusiast_edx_installation = {
-            'latitude': received_data.get('latitude'),
-            'longitude': received_data.get('longitude'),
-            'platform_name': received_data.get('platform_name'),
-            'platform_city_name': received_data.get('platform_city_name'),
-            'platform_url': received_data.get('platform_url'),
+            'latitude': statistics['latitude'],
+            'longitude': statistics['longitude'],
+            'platform_name': statistics['platform_name'],
+            'platform_city_name': statistics['platform_city_name'],
+            'platform_url': statistics['platform_url'],
         }
 
         if 'null' in students_per_country and students_per_country['null']:
@@ -196,37 +198,88 @@ class ReceiveInstallationStatistics(View):
         }
         stats.update(enthusiast_statistics)
 
-        # Checks the latitude and longitude that are not empty strings
-        if enthusiast_edx_installation['latitude'] and enthusiast_edx_installation['longitude']:
-            edx_installation_object.latitude = float(enthusiast_edx_installation['latitude'])
-            edx_installation_object.longitude = float(enthusiast_edx_installation['longitude'])
+        installation_updates = {
+            'platform_name': enthusiast_edx_installation['platform_name'],
+            'platform_url': enthusiast_edx_installation['platform_url'],
+            'platform_city_name': enthusiast_edx_installation['platform_city_name'],
+            'coordinates_pending': False,
+        }
+
+        # Checks the latitude and longitude that are received
+        if enthusiast_edx_installation['latitude'] is not None and enthusiast_edx_installation['longitude'] is not None:
+            installation_updates['latitude'] = enthusiast_edx_installation['latitude']
+            installation_updates['longitude'] = enthusiast_edx_installation['longitude']
 
         elif enthusiast_edx_installation['platform_city_name']:
-            latitude, longitude = get_coordinates_by_platform_city_name(
+            # Geocoding service is not requested within the request, not cached city is left
+            # for the `resolve_coordinates` management command.
+            coordinates = get_cached_coordinates_by_platform_city_name(
                 enthusiast_edx_installation['platform_city_name']
             )
-            if latitude and longitude:
-                edx_installation_object.latitude = float(latitude)
-                edx_installation_object.longitude = float(longitude)
 
-        edx_installation_object.platform_name = enthusiast_edx_installation['platform_name']
-        edx_installation_object.platform_url = enthusiast_edx_installation['platform_url']
-        edx_installation_object.save()
+            if coordinates is None:
+                installation_updates['coordinates_pending'] = True
+                installation_updates['coordinates_attempts'] = 0
+            elif all(coordinates):
+                installation_updates['latitude'], installation_updates['longitude'] = coordinates
+
+        # Installation is updated without saving the cached copy, so the coordinates resolved in the background
+        # are not overwritten and the installation cache isn't invalidated by the `post_save` signal.
+        EdxInstallation.objects.filter(pk=edx_installation_object.pk).update(**installation_updates)
+
+        for field, value in installation_updates.items():
+            setattr(edx_installation_object, field, value)
+
+    @staticmethod
+    def get_today_date(received_datetime=None):
+        """
+        Get the datetime of the day start, that today's statistics are saved at.
+
+        :param received_datetime: datetime the statistics were received, now by default.
+            Queued statistics are processed later, but belong to the day they were received.
+        """
+        return (received_datetime or datetime.datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def get_instance_dates(self, statistics, edx_installation_object, today_date):
+        """
+        Provide statistics data for all received dates, today's statistics carry all the fields.
+
+        :param statistics: validated statistics values, see `validate_statistics`.
+        :return: dictionary with the statistics datetime as a key and the statistics fields to save as a value.
+        """
+        today_stats = self.get_today_stats(statistics, edx_installation_object)
+        dates = self.get_all_stats_by_dates(statistics)
+        self.add_today_to_dates(today_date, today_stats, dates)
+
+        return dates
 
     @atomic
-    def process_instance_datas(self, received_data, access_token):
+    def process_instance_datas(self, statistics, access_token, received_datetime=None):
         """
         Add statistics data for all received dates.
+
+        History dates are saved in bulk, today's statistics, that carry all the fields, are saved on their own.
+
+        :param statistics: validated statistics values, see `validate_statistics`.
+
+        :param received_datetime: datetime the statistics were received, now by default.
+            Queued statistics are processed later, but belong to the day they were received.
         """
-        today_date = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        edx_installation_object = EdxInstallation.objects.get(access_token=access_token)
-        today_stats = self.get_today_stats(received_data, edx_installation_object)
-        dates = self.get_all_stats_by_dates(received_data)
-        self.add_today_to_dates(today_date, today_stats, dates)
+        today_date = self.get_today_date(received_datetime)
+        edx_installation_object = installation_cache.get(access_token)
 
-        for date in dates:
-            statistics = dates[date]
-            self.create_instance_data(statistics, edx_installation_object, date)
+        if edx_installation_object is None:
+            raise EdxInstallation.DoesNotExist('edX installation with token {} does not exist.'.format(access_token))
+
+        dates = self.get_instance_dates(statistics, edx_installation_object, today_date)
+
+        today_stats = dates.pop(today_date)
+        created_amount, updated_amount = InstallationStatistics.save_history(edx_installation_object, dates)
+        logger.debug(
+            'History data for %s dates was created and for %s dates was updated.', created_amount, updated_amount
+        )
+
+        self.create_instance_data(today_stats, edx_installation_object, today_date)
 
     @staticmethod
     def add_today_to_dates(today_date, today_stats, dates):
@@ -243,7 +296,7 @@ class ReceiveInstallationStatistics(View):
         dates[today_date] = today_stats
 
     @staticmethod
-    def get_all_stats_by_dates(received_data):
+    def get_all_stats_by_dates(statistics):
         """
         Return a dictionary of dates and stats (as the keys and the values respectively) to create the object.
         """
@@ -252,52 +305,53 @@ class ReceiveInstallationStatistics(View):
             'registered_students': 0,
             'enthusiastic_students': 0,
             'generated_certificates': 0,
-            'statistics_level': received_data.get('statistics_level'),
+            'statistics_level': statistics['statistics_level'],
         }
-        registered_students_dates = json.loads(received_data.get('registered_students', '{}'))
-        enthusiastic_students_dates = json.loads(received_data.get('enthusiastic_students', '{}'))
-        generated_certificates_dates = json.loads(received_data.get('generated_certificates', '{}'))
+        registered_students_dates = statistics['registered_students']
+        enthusiastic_students_dates = statistics['enthusiastic_students']
+        generated_certificates_dates = statistics['generated_certificates']
         all_dates = set(registered_students_dates.keys())
         all_dates.update(enthusiastic_students_dates.keys())
         all_dates.update(generated_certificates_dates.keys())
 
-        for str_date in all_dates:
-            date = datetime.datetime.strptime(str_date, '%Y-%m-%d')
+        for date in all_dates:
             dates[date] = data_template.copy()
-            dates[date]['registered_students'] += registered_students_dates.get(str_date, 0)
-            dates[date]['enthusiastic_students'] += enthusiastic_students_dates.get(str_date, 0)
-            dates[date]['generated_certificates'] += generated_certificates_dates.get(str_date, 0)
+            dates[date]['registered_students'] += registered_students_dates.get(date, 0)
+            dates[date]['enthusiastic_students'] += enthusiastic_students_dates.get(date, 0)
+            dates[date]['generated_certificates'] += generated_certificates_dates.get(date, 0)
 
         return dates
 
-    def get_today_stats(self, received_data, edx_installation_object):
+    def get_today_stats(self, statistics, edx_installation_object):
         """
-        Return a dictionary for today's stats from the received data to create the object.
+        Return a dictionary for today's stats from the validated statistics to create the object.
         """
         today_stats = {
-            'active_students_amount_day': int(received_data.get('active_students_amount_day')),
-            'active_students_amount_week': int(received_data.get('active_students_amount_week')),
-            'active_students_amount_month': int(received_data.get('active_students_amount_month')),
-            'courses_amount': int(received_data.get('courses_amount')),
-            'statistics_level': received_data.get('statistics_level'),
+            'active_students_amount_day': statistics['active_students_amount_day'],
+            'active_students_amount_week': statistics['active_students_amount_week'],
+            'active_students_amount_month': statistics['active_students_amount_month'],
+            'courses_amount': statistics['courses_amount'],
+            'statistics_level': statistics['statistics_level'],
         }
 
         if today_stats['statistics_level'] == 'enthusiast':
-            self.extend_stats_to_enthusiast(received_data, today_stats, edx_installation_object)
+            self.extend_stats_to_enthusiast(statistics, today_stats, edx_installation_object)
 
         return today_stats
 
     @staticmethod
     def create_instance_data(stats, edx_installation_object, statistics_date):
         """
-        Save edX installation data into a database.
+        Save edX installation data into a database and keep the daily and monthly country statistics up to date.
+
+        On update the previous same-day values are subtracted from the aggregated statistics before the new ones
+        are added.
 
         Arguments:
             :param stats: Dict object with statistics for current date.
             :param edx_installation_object: EdxInstallation instance for current platform.
             :param statistics_date: Datetime object. Date and time when statistics was send.
         """
-        statistics_date.replace(hour=0, minute=0, second=0, microsecond=0)
         stats['data_created_datetime'] = statistics_date
         previous_stats = InstallationStatistics.get_stats_for_the_date(
             statistics_date,
@@ -305,6 +359,7 @@ class ReceiveInstallationStatistics(View):
         )
         log_msg = 'Corresponding data was %s in OLGA database.'
         if previous_stats:
+            stats_before_update = copy.copy(previous_stats)
             previous_stats.registered_students = (
                 stats.pop('registered_students', 0) or previous_stats.registered_students
             )
@@ -316,17 +371,35 @@ class ReceiveInstallationStatistics(View):
             )
 
             previous_stats.update(stats)
+            DailyStatistics.apply_statistics_change(stats_before_update, previous_stats)
+            MonthlyCountryStatistics.apply_statistics_change(stats_before_update, previous_stats)
             logger.debug(log_msg, 'updated')
         else:
-            InstallationStatistics.objects.create(edx_installation=edx_installation_object, **stats)
+            created_stats = InstallationStatistics.objects.create(edx_installation=edx_installation_object, **stats)
+            DailyStatistics.apply_statistics_change(None, created_stats)
+            MonthlyCountryStatistics.apply_statistics_change(None, created_stats)
             logger.debug(log_msg, 'created')
 
+    @staticmethod
+    def is_request_logged():
+        """
+        Check if the received statistics request is logged, requests are sampled by `STATISTICS_LOG_SAMPLE_RATE`.
+
+        Sampling is checked only if debug logging is enabled, so no work is done for the request otherwise.
+        """
+        return logger.isEnabledFor(logging.DEBUG) and random.random() < settings.STATISTICS_LOG_SAMPLE_RATE
+
     @staticmethod
     def log_debug_instance_details(received_data):
         """
-        Log edx installation information and statistics.
+        Log edx installation information and statistics, that are allowed by `STATISTICS_LOG_FIELDS`.
+
+        Fields are passed as the `statistics` extra as well, so they are available to structured log formatters.
         """
-        logger.debug(json.dumps(received_data, sort_keys=True, indent=4))
+        statistics = {
+            field: received_data[field] for field in settings.STATISTICS_LOG_FIELDS if field in received_data
+        }
+        logger.debug('Received statistics %s', statistics, extra={'statistics': statistics})
 
     def log_client_ip(self, request):
         """
@@ -353,17 +426,162 @@ class ReceiveInstallationStatistics(View):
         """
         Receive edX installation statistics and create corresponding data in database.
 
+        Statistics are received as the form-encoded or the `application/json`, optionally gzip-compressed, body.
+
         Returns HTTP-response with status 201, that means object (installation data) was successfully created.
+        Returns HTTP-response with status 202, that means installation data was stored to be processed later,
+        when asynchronous ingestion is enabled.
         Returns HTTP-response with status 401, that means edX installation is not authorized via token.
         """
-        received_data = request.POST
-        access_token = received_data.get('access_token')
+        received_data = request.received_data
+        access_token = str(request.statistics['access_token'])
 
         if AccessTokenAuthorization().is_token_authorized(access_token):
-            self.log_debug_instance_details(received_data)
-            self.log_client_ip(request)
+            if self.is_request_logged():
+                self.log_debug_instance_details(received_data)
+                self.log_client_ip(request)
 
-            self.process_instance_datas(received_data, access_token)
+            if settings.STATISTICS_ASYNC_INGESTION:
+                ReceivedStatistics.objects.create(access_token=access_token, payload=received_data)
+                return HttpResponse(status=http.ACCEPTED)
+
+            self.process_instance_datas(request.statistics, access_token)
+            bump_statistics_generation()
             return HttpResponse(status=http.CREATED)
 
         return HttpResponse(status=http.UNAUTHORIZED)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ReceiveInstallationStatisticsBatch(View):
+    """
+    Provide reception of the statistics of many edX installations at once, e.g. from a relay of several platforms.
+    """
+
+    @staticmethod
+    def get_reports(request):
+        """
+        Provide the statistics reports of the JSON request body, that may be gzip-compressed.
+
+        :raise ValueError: if the body isn't a JSON object with the list of at most `STATISTICS_BATCH_MAX_REPORTS`
+            reports.
+        """
+        reports = get_received_data(request).get('reports')
+
+        if not isinstance(reports, list) or not all(isinstance(report, dict) for report in reports):
+            raise ValueError('Request body is not a JSON object with the list of the reports.')
+
+        if len(reports) > settings.STATISTICS_BATCH_MAX_REPORTS:
+            raise ValueError('Request body has more than {} reports.'.format(settings.STATISTICS_BATCH_MAX_REPORTS))
+
+        return reports
+
+    @staticmethod
+    def prepare_reports(authorized_reports, installations, results):
+        """
+        Provide the statistics dates of the authorized reports, every report is prepared on its own.
+
+        :return: tuple with the list of the installations and their statistics dates pairs
+            and the list of the prepared reports indexes.
+        """
+        receiver = ReceiveInstallationStatistics()
+        today_date = receiver.get_today_date()
+        installations_dates = []
+        prepared_indexes = []
+
+        for index, statistics, access_token in authorized_reports:
+            edx_installation_object = installations[access_token]
+
+            try:
+                dates = receiver.get_instance_dates(statistics, edx_installation_object, today_date)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception('Statistics of the edX installation with token %s were not processed.', access_token)
+                results[index] = {'status': http.INTERNAL_SERVER_ERROR.value}
+            else:
+                installations_dates.append((edx_installation_object, dates))
+                prepared_indexes.append(index)
+
+        return installations_dates, prepared_indexes
+
+    def process_reports(self, authorized_reports, installations, results):
+        """
+        Apply the authorized reports within a single transaction, statistics of all the reports are saved at once.
+
+        Reports are prepared one by one, so a report, that fails, is reported and the other reports are still
+        applied. Statistics, history and rollups of all the prepared reports are written with a constant amount
+        of queries, reports of the same installation are applied in the reports order.
+
+        :param authorized_reports: list of the reports indexes, their validated statistics and access tokens.
+        :param installations: dictionary of the access tokens and the authorized installations.
+        :param results: list of the reports results, that are set for the applied and failed reports.
+        """
+        prepared_indexes = []
+
+        try:
+            with atomic():
+                installations_dates, prepared_indexes = self.prepare_reports(authorized_reports, installations, results)
+                created_amount, updated_amount = InstallationStatistics.save_statistics(installations_dates)
+        except Exception:  # pylint: disable=broad-except
+            logger.exception('Statistics of %s reports were not processed.', len(prepared_indexes))
+            status = http.INTERNAL_SERVER_ERROR.value
+        else:
+            logger.debug(
+                'Statistics for %s dates were created and for %s dates were updated.', created_amount, updated_amount
+            )
+            status = http.CREATED.value
+
+        for index in prepared_indexes:
+            results[index] = {'status': status}
+
+    def post(self, request):
+        """
+        Receive edX installations statistics reports and create corresponding data in database.
+
+        Reports are validated as `ReceiveInstallationStatistics` does it, access tokens of all the reports are
+        authorized by a single query. Reports results are provided in the reports order with the statuses
+        `ReceiveInstallationStatistics` would respond for the same reports, status 500 means the report
+        was not processed.
+
+        Returns HTTP-response with status 200 and the reports results.
+        Returns HTTP-response with status 400, that means the body is not a JSON object with the list of the reports.
+        """
+        try:
+            reports = self.get_reports(request)
+        except ValueError:
+            return HttpResponse(status=http.BAD_REQUEST)
+
+        results = [None] * len(reports)
+        validated_reports = []
+
+        for index, report in enumerate(reports):
+            try:
+                statistics = validate_statistics(report)
+            except ValidationError as error:
+                results[index] = {'status': http.UNAUTHORIZED.value, 'errors': error.message_dict}
+            else:
+                validated_reports.append((index, statistics, str(statistics['access_token'])))
+
+        installations = installation_cache.get_many(access_token for _, __, access_token in validated_reports)
+        authorized_reports = []
+
+        for index, statistics, access_token in validated_reports:
+            if access_token in installations:
+                authorized_reports.append((index, statistics, access_token))
+            else:
+                results[index] = {'status': http.UNAUTHORIZED.value}
+
+        logger.debug('Received %s reports, %s of them are authorized.', len(reports), len(authorized_reports))
+
+        if settings.STATISTICS_ASYNC_INGESTION:
+            ReceivedStatistics.objects.bulk_create([
+                ReceivedStatistics(access_token=access_token, payload=reports[index])
+                for index, _, access_token in authorized_reports
+            ])
+
+            for index, _, __ in authorized_reports:
+                results[index] = {'status': http.ACCEPTED.value}
+        elif authorized_reports:
+            self.process_reports(authorized_reports, installations, results)
+            bump_statistics_generation()
+
+        return JsonResponse({'reports': results})
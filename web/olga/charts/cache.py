@@ -0,0 +1,69 @@
+"""
+Cache of the computed charts contexts.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from olga.analytics.cache import get_statistics_generation
+
+
+# Seconds between the checks of the context, that is computed by another request.
+CONTEXT_POLL_INTERVAL = 0.1
+
+
+def wait_for_context(context_key):
+    """
+    Wait for the context, that is computed by another request, no longer than the computation lock is held.
+
+    :return: computed context or None if it is not computed in time.
+    """
+    deadline = time.monotonic() + settings.CHARTS_CACHE_LOCK_TIMEOUT
+
+    while time.monotonic() < deadline:
+        time.sleep(CONTEXT_POLL_INTERVAL)
+        cached = cache.get(context_key)
+
+        if cached is not None:
+            return cached[2]
+
+    return None
+
+
+def get_cached_context(name, get_context):
+    """
+    Provide the charts context from the cache, recomputing it when the statistics data generation is changed.
+
+    Only the request, that acquired the lock, recomputes the context. Outdated context is served meanwhile
+    (stale-while-revalidate) and without any cached context the other requests wait for it, so a burst of
+    the dashboard viewers after the statistics change or restart triggers only one recomputation.
+
+    :param name: name of the cached context.
+    :param get_context: function, that computes the context.
+    """
+    context_key = 'charts:context:{}'.format(name)
+    lock_key = '{}:lock'.format(context_key)
+    generation = get_statistics_generation()
+    cached = cache.get(context_key)
+
+    if cached is not None:
+        cached_generation, computed_time, context = cached
+
+        if cached_generation == generation and computed_time + settings.CHARTS_CACHE_MAX_AGE > time.time():
+            return context
+
+    if not cache.add(lock_key, True, settings.CHARTS_CACHE_LOCK_TIMEOUT):
+        context = cached[2] if cached is not None else wait_for_context(context_key)
+
+        # Context is computed without the lock, if the request holding it failed or is too slow.
+        return get_context() if context is None else context
+
+    try:
+        context = get_context()
+        cache.set(context_key, (generation, time.time(), context), None)
+    finally:
+        cache.delete(lock_key)
+
+    return context
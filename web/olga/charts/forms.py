@@ -0,0 +1,63 @@
+"""
+Forms for the charts data requests.
+"""
+
+from datetime import date, timedelta
+
+from django import forms
+from django.conf import settings
+
+from olga.analytics.models import DailyStatistics
+
+
+class ChartsDataForm(forms.Form):
+    """
+    Validate the charts data range and resolution, all of them are optional.
+    """
+
+    period_from = forms.DateField(required=False)
+    period_to = forms.DateField(required=False)
+    resolution = forms.ChoiceField(
+        required=False, choices=[(resolution, resolution) for resolution in DailyStatistics.resolutions]
+    )
+
+    @classmethod
+    def from_query(cls, query):
+        """
+        Create the form from the `from`, `to` and `resolution` query parameters.
+        """
+        return cls({
+            'period_from': query.get('from'),
+            'period_to': query.get('to'),
+            'resolution': query.get('resolution'),
+        })
+
+    def clean(self):
+        """
+        Check that the range is not reversed.
+        """
+        cleaned_data = super(ChartsDataForm, self).clean()
+        period_from, period_to = cleaned_data.get('period_from'), cleaned_data.get('period_to')
+
+        if period_from and period_to and period_from > period_to:
+            raise forms.ValidationError('Range start is later than its end.')
+
+        return cleaned_data
+
+    def get_range(self):
+        """
+        Provide the requested range and resolution of the valid form.
+
+        Days of the last `CHARTS_DEFAULT_DAYS` days are provided by default, the coarser resolutions
+        are provided for the whole history by default.
+
+        :return: tuple with the range start and end dates, that are None for the history start and end,
+            and the resolution.
+        """
+        resolution = self.cleaned_data['resolution'] or 'day'
+        period_from, period_to = self.cleaned_data['period_from'], self.cleaned_data['period_to']
+
+        if resolution == 'day' and not period_from:
+            period_from = (period_to or date.today()) - timedelta(days=settings.CHARTS_DEFAULT_DAYS - 1)
+
+        return period_from, period_to, resolution
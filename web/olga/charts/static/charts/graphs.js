@@ -5,7 +5,7 @@
 
 /**
  * Makes three chart for instances, courses and students based on back-end data as timeline (array of dates)
- * and corresponding counts (array of counts).
+ * and corresponding counts (array of counts), that is fetched from `graphsDataUrl`.
  */
 (function() {
     var WIDTH_IN_PERCENT_OF_PARENT = 100,
@@ -33,10 +33,11 @@
     /**
      * Appends data to chart
      * @param {Object} chart : Plotly object.
+     * @param {Array} timeline : Array of dates.
      * @param {Array} chart_data : Array of data to corresponding chart.
      * @param {String} chart_title : Char title.
      */
-    function appendChartData(chart, chart_data, chart_title) {
+    function appendChartData(chart, timeline, chart_data, chart_title) {
         layout = {
             title: chart_title,
             yaxis: {
@@ -115,7 +116,7 @@
             traceStudents,
         ];
 
-        Plotly.plot(chart, data, layout, {displayModeBar: false});
+        Plotly.newPlot(chart, data, layout, {displayModeBar: false});
     }
 
     function appendSecChart(chart, chart_data, chart_title) {
@@ -164,8 +165,28 @@
         Plotly.newPlot(chart, data, layout);
     }
 
-    appendChartData(instances_gd, [instances,courses,students], 'Instances, Courses, Students');
-    appendSecChart(courses_gd, [], 'Student engagement');
+    /**
+     * Fetches graphs data and plots the charts.
+     * Browser revalidates the fetched data with the server, that responds with 304 if the data is not changed.
+     * @param {String} query : Query string with the range and resolution, last days by default.
+     */
+    function plotCharts(query) {
+        fetch(graphsDataUrl + query, {credentials: 'same-origin'}).then(function(response) {
+            return response.json();
+        }).then(function(data) {
+            newData.monthly = data.charts;
+            appendChartData(
+                instances_gd, data.timeline, [data.instances, data.courses, data.students],
+                'Instances, Courses, Students'
+            );
+            appendSecChart(courses_gd, [], 'Student engagement');
+        });
+    }
+
+    plotCharts(document.getElementById('js-charts-period').value);
+    document.getElementById('js-charts-period').addEventListener('change', function() {
+        plotCharts(this.value);
+    });
     document.getElementById('js-total-cert').innerHTML = newData.total_generated_certificates;
     document.getElementById('js-total-stud').innerHTML = newData.total_registered_students;
 
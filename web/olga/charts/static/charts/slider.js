@@ -1,7 +1,10 @@
 var handle;
 var loop_slider_timeout = null;
 
-$(document).ready(function() {
+/**
+ * Creates months slider, when the map data is fetched.
+ */
+function create_slider() {
     handle = $("#custom-handle");
 
     $( "#slider" ).slider({
@@ -34,7 +37,7 @@ $(document).ready(function() {
 
     prepare_months_table();
     select_month(months_keys_sorted[months_keys_sorted.length - 1]);
-});
+}
 
 function make_tr_from_tabular_countries(month_key, countries) {
     var countries_trs = '';
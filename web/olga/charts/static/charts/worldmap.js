@@ -4,10 +4,12 @@
  */
 
 /**
- * Creates statistics world map with data per country based on back-end data as arrays of country-count accordance.
- * For creation a difference method uses shades of color.
+ * Creates statistics world map with data per country based on back-end data as arrays of country-count accordance,
+ * that is fetched from `mapDataUrl`. For creation a difference method uses shades of color.
  */
 var datamap;
+var months;
+var months_keys_sorted;
 
 function compose_dataset(datamap_data) {
     var result = {};
@@ -24,7 +26,7 @@ function compose_dataset(datamap_data) {
 
     return result;
 }
-(function () {
+function create_datamap(countries_list) {
     var dataset = compose_dataset(countries_list);
     // Render map.
     datamap = new Datamap({
@@ -69,4 +71,14 @@ function compose_dataset(datamap_data) {
             width: $(this).parent().width(),
             height: $(this).parent().height()
         });
-}());
+}
+
+// Browser revalidates the fetched data with the server, that responds with 304 if the data is not changed.
+$.getJSON(mapDataUrl, function(data) {
+    months = data.months;
+    months_keys_sorted = Object.keys(months).sort();
+    var last_month_key = months_keys_sorted[months_keys_sorted.length - 1];
+
+    create_datamap(months[last_month_key]['datamap_countries_list']);
+    create_slider();
+});
@@ -0,0 +1,86 @@
+"""
+Tests for charts cache.
+"""
+
+from mock import Mock, patch
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from olga.analytics.cache import bump_statistics_generation
+from olga.charts.cache import get_cached_context
+
+# pylint: disable=invalid-name
+
+
+class TestGetCachedContext(TestCase):
+    """
+    Tests for the cached charts contexts.
+    """
+
+    def setUp(self):
+        """
+        Clear the cache and cache the first context.
+        """
+        cache.clear()
+        self.get_context = Mock(side_effect=[{'version': 1}, {'version': 2}])
+        get_cached_context('graphs', self.get_context)
+
+    def test_context_is_computed_once(self):
+        """
+        Verify that the context is not computed again while the statistics are not changed.
+        """
+        self.assertEqual({'version': 1}, get_cached_context('graphs', self.get_context))
+        self.assertEqual(1, self.get_context.call_count)
+
+    def test_context_is_recomputed_after_statistics_change(self):
+        """
+        Verify that the context is recomputed after the statistics change and when it is too old.
+        """
+        bump_statistics_generation()
+
+        self.assertEqual({'version': 2}, get_cached_context('graphs', self.get_context))
+        self.assertEqual({'version': 2}, get_cached_context('graphs', self.get_context))
+
+        with self.settings(CHARTS_CACHE_MAX_AGE=-1):
+            self.get_context.side_effect = [{'version': 3}]
+            self.assertEqual({'version': 3}, get_cached_context('graphs', self.get_context))
+
+    def test_stale_context_is_served_during_recomputation(self):
+        """
+        Verify that the outdated context is served while the other request recomputes it.
+        """
+        bump_statistics_generation()
+
+        with patch('olga.charts.cache.cache.add', return_value=False):
+            self.assertEqual({'version': 1}, get_cached_context('graphs', self.get_context))
+
+        self.assertEqual(1, self.get_context.call_count)
+
+    def test_missing_context_is_awaited_during_computation(self):
+        """
+        Verify that without cached context the request waits for the other one to compute it instead of computing.
+        """
+        cache.clear()
+        cache.add('charts:context:graphs:lock', True)
+        cached_context = (0, 0, {'version': 1})
+
+        with patch('olga.charts.cache.cache.get', side_effect=[None, None, cached_context]), \
+                patch('olga.charts.cache.time.sleep') as mock_sleep:
+            self.assertEqual({'version': 1}, get_cached_context('graphs', self.get_context))
+
+        self.assertEqual(2, mock_sleep.call_count)
+        self.assertEqual(1, self.get_context.call_count)
+        self.assertTrue(cache.get('charts:context:graphs:lock'))
+
+    def test_context_is_computed_if_not_awaited(self):
+        """
+        Verify that the context is computed without the lock, if the other request didn't compute it in time.
+        """
+        cache.clear()
+        cache.add('charts:context:graphs:lock', True)
+
+        with self.settings(CHARTS_CACHE_LOCK_TIMEOUT=0):
+            self.assertEqual({'version': 2}, get_cached_context('graphs', self.get_context))
+
+        self.assertTrue(cache.get('charts:context:graphs:lock'))
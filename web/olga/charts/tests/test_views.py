@@ -2,14 +2,17 @@
 Tests for charts views.
 """
 
-import json
 from datetime import datetime
 
 from mock import patch
+from pytz import UTC
 
+from django.core.cache import cache
 from django.test import TestCase
 
-from olga.analytics.models import InstallationStatistics
+from olga.analytics.cache import bump_statistics_generation
+from olga.analytics.models import DailyStatistics, InstallationStatistics, MonthlyCountryStatistics
+from olga.analytics.tests.factories import InstallationStatisticsFactory
 from olga.charts.views import (
     get_data_created_datetime_scope,
     GraphsView,
@@ -28,6 +31,7 @@ class TestMapView(TestCase):
         """
         Set up common response.
         """
+        cache.clear()
         self.response = self.client.get('/map/')
 
     def test_map_url(self):
@@ -118,6 +122,7 @@ class TestGraphsView(TestCase):
         """
         Set up common response.
         """
+        cache.clear()
         self.response = self.client.get('/')
 
     def test_graphs_url(self):
@@ -139,29 +144,16 @@ class TestGraphsView(TestCase):
         self.assertTemplateUsed(self.response, 'charts/graphs.html')
 
     @patch('olga.charts.views.get_data_created_datetime_scope')
-    @patch('olga.analytics.models.InstallationStatistics.timeline')
-    @patch('olga.analytics.models.InstallationStatistics.data_per_period')
     @patch('olga.analytics.models.InstallationStatistics.overall_counts')
-    def test_map_view_context_fields_values(
-            self,
-            mock_installation_statistics_model_overall_counts,
-            mock_installation_statistics_model_data_per_period,
-            mock_installation_statistics_model_timeline,
-            mock_get_data_created_datetime_scope
-    ):  # pylint: disable=too-many-locals
+    def test_graphs_view_context_fields_values(
+            self, mock_installation_statistics_model_overall_counts, mock_get_data_created_datetime_scope
+    ):
         """
         Verify that graphs view render correct context fields values.
         """
-        mock_timeline = ['2017-05-14', '2017-05-15', '2017-05-16']
-        mock_students, mock_courses, mock_instances = [4124, 5122, 6412], [110, 211, 167], [30, 20, 25]
-        mock_instances_count, mock_courses_count, mock_students_count, mock_certificates_count = 6412, 167, 25, 0
         mock_first_datetime_of_update_data = datetime(2017, 6, 1, 14, 56, 18)
         mock_last_datetime_of_update_data = datetime(2017, 7, 2, 23, 12, 8)
 
-        mock_installation_statistics_model_timeline.return_value = mock_timeline
-
-        mock_installation_statistics_model_data_per_period.return_value = mock_students, mock_courses, mock_instances
-
         mock_installation_statistics_model_overall_counts.return_value = {
             "instances_count": 6412,
             "courses_count": 167,
@@ -172,15 +164,157 @@ class TestGraphsView(TestCase):
         mock_get_data_created_datetime_scope.return_value = \
             mock_first_datetime_of_update_data, mock_last_datetime_of_update_data
 
+        # Drop the context cached by the common response.
+        cache.clear()
         response = self.client.get('/')
 
-        self.assertEqual(json.loads(response.context['timeline']), mock_timeline)
-        self.assertEqual(json.loads(response.context['students']), mock_students)
-        self.assertEqual(json.loads(response.context['courses']), mock_courses)
-        self.assertEqual(json.loads(response.context['instances']), mock_instances)
-        self.assertEqual(response.context['instances_count'], mock_instances_count)
-        self.assertEqual(response.context['students_count'], mock_students_count)
-        self.assertEqual(response.context['courses_count'], mock_courses_count)
-        self.assertEqual(response.context['generated_certificates_count'], mock_certificates_count)
+        self.assertEqual(response.context['instances_count'], 6412)
+        self.assertEqual(response.context['students_count'], 25)
+        self.assertEqual(response.context['courses_count'], 167)
+        self.assertEqual(response.context['generated_certificates_count'], 0)
         self.assertEqual(response.context['first_datetime_of_update_data'], mock_first_datetime_of_update_data)
         self.assertEqual(response.context['last_datetime_of_update_data'], mock_last_datetime_of_update_data)
+
+
+class TestChartsDataViews(TestCase):
+    """
+    Tests for graphs and map data views, that provide charts data as JSON.
+    """
+
+    def setUp(self):
+        """
+        Create statistics and clear the cache.
+        """
+        cache.clear()
+        InstallationStatisticsFactory(data_created_datetime=datetime(2017, 7, 2, 23, 12, 8, tzinfo=UTC))
+
+        with patch('django.utils.timezone.now', return_value=datetime(2017, 7, 3, 1, 2, 3, tzinfo=UTC)):
+            DailyStatistics.rebuild()
+            MonthlyCountryStatistics.rebuild()
+
+    @patch('olga.analytics.models.InstallationStatistics.get_charts_data')
+    @patch('olga.analytics.models.InstallationStatistics.timeline')
+    @patch('olga.analytics.models.InstallationStatistics.data_per_period')
+    def test_graphs_data_values(
+            self,
+            mock_installation_statistics_model_data_per_period,
+            mock_installation_statistics_model_timeline,
+            mock_installation_statistics_model_get_charts_data,
+    ):
+        """
+        Verify that graphs data view provides timeline, students, courses, instances and charts.
+        """
+        mock_timeline = ['2017-05-14', '2017-05-15', '2017-05-16']
+        mock_students, mock_courses, mock_instances = [4124, 5122, 6412], [110, 211, 167], [30, 20, 25]
+        mock_charts = {'17-05-14': [1, 2, 3]}
+
+        mock_installation_statistics_model_timeline.return_value = mock_timeline
+        mock_installation_statistics_model_data_per_period.return_value = mock_students, mock_courses, mock_instances
+        mock_installation_statistics_model_get_charts_data.return_value = mock_charts
+
+        response = self.client.get('/api/charts/graphs/')
+
+        self.assertEqual({
+            'timeline': mock_timeline,
+            'students': mock_students,
+            'courses': mock_courses,
+            'instances': mock_instances,
+            'charts': mock_charts,
+        }, response.json())
+
+    @patch('olga.charts.forms.date')
+    def test_graphs_data_range_and_resolution(self, mock_date):
+        """
+        Verify that graphs data is provided for the last days by default and for the requested range and resolution.
+        """
+        mock_date.today.return_value = datetime(2017, 7, 10).date()
+
+        with self.settings(CHARTS_DEFAULT_DAYS=10):
+            last_days_response = self.client.get('/api/charts/graphs/')
+
+        self.assertEqual(['2017-07-02'], last_days_response.json()['timeline'])
+        self.assertEqual([], self.client.get('/api/charts/graphs/?to=2017-07-01').json()['timeline'])
+        self.assertEqual(['2017-07-01'], self.client.get('/api/charts/graphs/?resolution=month').json()['timeline'])
+        self.assertEqual(
+            ['2017-07-01'], self.client.get('/api/charts/graphs/?from=2017-07-01&resolution=quarter').json()['timeline']
+        )
+
+    def test_graphs_data_invalid_parameters(self):
+        """
+        Verify that graphs data is not provided for the unknown resolution and reversed range.
+        """
+        self.assertEqual(400, self.client.get('/api/charts/graphs/?resolution=year').status_code)
+        self.assertEqual(400, self.client.get('/api/charts/graphs/?from=2017-07-02&to=2017-07-01').status_code)
+
+    def test_map_data_values(self):
+        """
+        Verify that map data view provides students per country for every month.
+        """
+        response = self.client.get('/api/charts/map/')
+
+        self.assertEqual(['July 2017'], [month['label'] for month in response.json()['months'].values()])
+
+    def test_conditional_request(self):
+        """
+        Verify that unchanged charts data is not transferred again and changed one is.
+        """
+        response = self.client.get('/api/charts/graphs/')
+
+        self.assertEqual('Mon, 03 Jul 2017 01:02:03 GMT', response['Last-Modified'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        not_modified_response = self.client.get('/api/charts/graphs/', HTTP_IF_NONE_MATCH=response['ETag'])
+
+        bump_statistics_generation()
+        modified_response = self.client.get('/api/charts/graphs/', HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(304, not_modified_response.status_code)
+        self.assertEqual(200, modified_response.status_code)
+        self.assertNotEqual(response['ETag'], modified_response['ETag'])
+
+    def test_last_modified_is_changed_with_same_day_statistics(self):
+        """
+        Verify that the charts data last modification is moved by the statistics update within the same day.
+        """
+        first_response = self.client.get('/api/charts/graphs/')
+
+        with patch('django.utils.timezone.now', return_value=datetime(2017, 7, 5, 10, 0, 0, tzinfo=UTC)):
+            DailyStatistics.add_statistics({datetime(2017, 7, 2).date(): {'students': 1}})
+
+        bump_statistics_generation()
+        second_response = self.client.get('/api/charts/graphs/', HTTP_IF_MODIFIED_SINCE=first_response['Last-Modified'])
+
+        self.assertEqual(200, second_response.status_code)
+        self.assertEqual('Wed, 05 Jul 2017 10:00:00 GMT', second_response['Last-Modified'])
+
+    @patch('olga.charts.forms.date')
+    def test_etag_is_changed_with_default_range(self, mock_date):
+        """
+        Verify that the default graphs data range isn't answered as not modified after the day change.
+        """
+        mock_date.today.return_value = datetime(2017, 7, 10).date()
+        response = self.client.get('/api/charts/graphs/')
+
+        mock_date.today.return_value = datetime(2017, 7, 11).date()
+        next_day_response = self.client.get('/api/charts/graphs/', HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(200, next_day_response.status_code)
+        self.assertNotEqual(response['ETag'], next_day_response['ETag'])
+
+    def test_etag_is_kept_without_cache(self):
+        """
+        Verify that the charts data ETag doesn't depend on the process cache, e.g. after restart.
+        """
+        bump_statistics_generation()
+        response = self.client.get('/api/charts/graphs/')
+        cache.clear()
+
+        self.assertEqual(304, self.client.get('/api/charts/graphs/', HTTP_IF_NONE_MATCH=response['ETag']).status_code)
+
+    def test_gzip(self):
+        """
+        Verify that charts data is compressed for the clients, that accept it.
+        """
+        response = self.client.get('/api/charts/map/', HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual('gzip', response['Content-Encoding'])
@@ -10,5 +10,7 @@ app_name = 'charts'
 
 urlpatterns = [
     url(r'^$', views.GraphsView.as_view(), name='charts'),
-    url(r'^map/$', views.MapView.as_view(), name='map')
+    url(r'^map/$', views.MapView.as_view(), name='map'),
+    url(r'^api/charts/graphs/$', views.GraphsDataView.as_view(), name='graphs_data'),
+    url(r'^api/charts/map/$', views.MapDataView.as_view(), name='map_data'),
 ]
@@ -2,79 +2,229 @@
 Views for the charts application.
 """
 
-import json
+import hashlib
 from datetime import datetime
+from http import HTTPStatus as http
 
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.utils.decorators import method_decorator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition
 from django.views.generic import View
 from django.db.models import Max, Min
 
-from olga.analytics.models import InstallationStatistics
+from olga.analytics.cache import get_statistics_generation
+from olga.analytics.models import (
+    DailyStatistics,
+    InstallationStatistics,
+    MonthlyCountryStatistics,
+    MonthlyInstallationStatistics,
+)
+from olga.charts.cache import get_cached_context
+from olga.charts.forms import ChartsDataForm
 
 
 def get_data_created_datetime_scope():
     """
-    Get the first and last datetimes for the entire time of gathering statistics.
+    Get the first and last datetimes for the entire time of gathering statistics, downsampled statistics included.
     """
     data_created_datetime_scope = InstallationStatistics.objects.aggregate(
         Min('data_created_datetime'), Max('data_created_datetime')
     )
+    downsampled_scope = MonthlyInstallationStatistics.objects.aggregate(
+        Min('first_data_created_datetime'), Max('last_data_created_datetime')
+    )
 
-    first_dt = data_created_datetime_scope['data_created_datetime__min'] or datetime.now()
-    last_dt = data_created_datetime_scope['data_created_datetime__max'] or datetime.now()
+    first_dt = min(
+        filter(None, [
+            data_created_datetime_scope['data_created_datetime__min'],
+            downsampled_scope['first_data_created_datetime__min'],
+        ]),
+        default=datetime.now()
+    )
+    last_dt = max(
+        filter(None, [
+            data_created_datetime_scope['data_created_datetime__max'],
+            downsampled_scope['last_data_created_datetime__max'],
+        ]),
+        default=datetime.now()
+    )
 
     return first_dt, last_dt
 
 
+def get_statistics_modified():
+    """
+    Get the last datetime the charts statistics rollups were changed, the last statistics datetime if there are none.
+    """
+    modified_datetimes = list(filter(None, [
+        DailyStatistics.objects.aggregate(Max('modified'))['modified__max'],
+        MonthlyCountryStatistics.objects.aggregate(Max('modified'))['modified__max'],
+    ]))
+
+    if not modified_datetimes:
+        return get_data_created_datetime_scope()[1]
+
+    return max(modified_datetimes)
+
+
+def get_charts_data_etag(request, *args, **kwargs):  # pylint: disable=unused-argument
+    """
+    Provide the charts data ETag, that is changed with the statistics data scope and generation.
+
+    Same day statistics updates do not change the scope, so the statistics data generation, that is kept
+    in the database and is the same for all the processes, is taken into account too. Default charts range
+    is moved with the current date, so the resolved range is taken into account instead of the query only.
+    """
+    first_datetime_of_update_data, last_datetime_of_update_data = get_cached_context(
+        'scope', get_data_created_datetime_scope
+    )
+    form = ChartsDataForm.from_query(request.GET)
+
+    return hashlib.md5('{}-{}-{}-{}-{}'.format(
+        request.get_full_path(),
+        form.get_range() if form.is_valid() else None,
+        first_datetime_of_update_data.isoformat(),
+        last_datetime_of_update_data.isoformat(),
+        get_statistics_generation(),
+    ).encode('utf-8')).hexdigest()
+
+
+def get_charts_data_last_modified(request, *args, **kwargs):  # pylint: disable=unused-argument
+    """
+    Provide the charts data last modification datetime, that is the last time the statistics rollups were changed.
+
+    Statistics may be received for the past days and updated within the same day, so the statistics data scope
+    doesn't show when the data was changed.
+    """
+    return get_cached_context('modified', get_statistics_modified)
+
+
+# Charts data is revalidated on every use, so the unchanged data is not transferred again.
+charts_data_decorators = [  # pylint: disable=invalid-name
+    gzip_page,
+    cache_control(public=True, no_cache=True),
+    condition(etag_func=get_charts_data_etag, last_modified_func=get_charts_data_last_modified),
+]
+
+
 class MapView(View):
     """
     Display information on a world map and tabular view.
     """
 
     @staticmethod
-    def get(request):
+    def get_context():
         """
-        Pass graph data to frontend.
+        Compute world map page data, the map data itself is fetched from the MapDataView.
         """
         first_datetime_of_update_data, last_datetime_of_update_data = get_data_created_datetime_scope()
 
-        context = {
-            'months': json.dumps(InstallationStatistics().get_students_per_country()),
+        return {
             'first_datetime_of_update_data': first_datetime_of_update_data,
             'last_datetime_of_update_data': last_datetime_of_update_data,
         }
-        return render(request, 'charts/worldmap.html', context)
 
+    def get(self, request):
+        """
+        Pass graph data to frontend.
+        """
+        return render(request, 'charts/worldmap.html', get_cached_context('map', self.get_context))
 
-class GraphsView(View):
+
+@method_decorator(charts_data_decorators, name='get')
+class MapDataView(View):
     """
-    Provide data and plot 3 main graphs: number of, students, courses and instances per date.
+    Provide students per country for every month as JSON.
     """
 
     @staticmethod
-    def get(request):
+    def get_data():
         """
-        Pass graph data to frontend.
+        Compute world map data.
+        """
+        return {
+            'months': InstallationStatistics().get_students_per_country(),
+        }
+
+    def get(self, request):  # pylint: disable=unused-argument
+        """
+        Pass world map data to frontend.
         """
-        timeline = InstallationStatistics.timeline()
+        return JsonResponse(get_cached_context('map_data', self.get_data))
 
-        students, courses, instances = InstallationStatistics.data_per_period()
 
-        first_datetime_of_update_data, last_datetime_of_update_data = get_data_created_datetime_scope()
+class GraphsView(View):
+    """
+    Provide data and plot 3 main graphs: number of, students, courses and instances per date.
+    """
 
-        charts = InstallationStatistics.get_charts_data()
+    @staticmethod
+    def get_context():
+        """
+        Compute graphs page data, the graphs data itself is fetched from the GraphsDataView.
+        """
+        first_datetime_of_update_data, last_datetime_of_update_data = get_data_created_datetime_scope()
 
         context = {
-            'timeline': json.dumps(timeline),
-            'students': json.dumps(students),
-            'courses': json.dumps(courses),
-            'instances': json.dumps(instances),
             'first_datetime_of_update_data': first_datetime_of_update_data,
             'last_datetime_of_update_data': last_datetime_of_update_data,
-            'charts': json.dumps(charts),
         }
 
         # Update context with this data: instances_count, courses_count, students_count, generated_certificates_count
         context.update(InstallationStatistics.overall_counts())
 
-        return render(request, 'charts/graphs.html', context)
+        return context
+
+    def get(self, request):
+        """
+        Pass graph data to frontend.
+        """
+        return render(request, 'charts/graphs.html', get_cached_context('graphs', self.get_context))
+
+
+@method_decorator(charts_data_decorators, name='get')
+class GraphsDataView(View):
+    """
+    Provide timeline with students, courses and instances per period and the students engagement as JSON.
+
+    Query parameters:
+        - `from`, `to`: range dates in `YYYY-MM-DD` format, both are included;
+        - `resolution`: `day`, `week`, `month` or `quarter`.
+
+    Days of the last `CHARTS_DEFAULT_DAYS` days are provided by default, the coarser resolutions
+    are provided for the whole history by default.
+    """
+
+    @staticmethod
+    def get_data(period_from, period_to, resolution):
+        """
+        Compute graphs data.
+        """
+        students, courses, instances = InstallationStatistics.data_per_period(period_from, period_to, resolution)
+
+        return {
+            'timeline': InstallationStatistics.timeline(period_from, period_to, resolution),
+            'students': students,
+            'courses': courses,
+            'instances': instances,
+            'charts': InstallationStatistics.get_charts_data(period_from, period_to, resolution),
+        }
+
+    def get(self, request):
+        """
+        Pass graphs data to frontend.
+        """
+        form = ChartsDataForm.from_query(request.GET)
+
+        if not form.is_valid():
+            return JsonResponse({'errors': form.errors}, status=http.BAD_REQUEST)
+
+        period_from, period_to, resolution = form.get_range()
+
+        return JsonResponse(get_cached_context(
+            'graphs_data:{}:{}:{}'.format(period_from, period_to, resolution),
+            lambda: self.get_data(period_from, period_to, resolution),
+        ))
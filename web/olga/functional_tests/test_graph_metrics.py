@@ -4,6 +4,7 @@ Test for graphs metrics.
 
 from ddt import ddt, data, unpack
 
+from django.core.cache import cache
 from django.test import TestCase
 
 from olga.analytics.tests.factories import InstallationStatisticsFactory
@@ -21,6 +22,12 @@ class TestGraphsMetricsWithoutStatistics(TestCase):
     Test html render graphs metrics if statistics does not exist.
     """
 
+    def setUp(self):
+        """
+        Drop the charts cached with statistics.
+        """
+        cache.clear()
+
     @data([0, 'Instances'], [0, 'Courses'], [0, 'Active Students'])
     @unpack
     def test_activity_metrics_if_no_statistics(self, amount, label):
@@ -4,6 +4,7 @@ Test for map metrics.
 
 from ddt import ddt, data, unpack
 
+from django.core.cache import cache
 from django.test import TestCase
 
 from olga.functional_tests.utils import SetUp, html_target
@@ -21,6 +22,7 @@ class TestMapMetricsWithoutStatistics(TestCase):
         """
         Provide common response.
         """
+        cache.clear()
         self.response = self.client.get('/map/')
 
     @data(
@@ -10,6 +10,7 @@ import pytz
 
 from mock import patch
 
+from django.core.cache import cache
 from django.test import TestCase
 
 from olga.analytics.tests.factories import InstallationStatisticsFactory
@@ -25,8 +26,9 @@ class SetUp(TestCase):
     @staticmethod
     def setUp():
         """
-        Create one installation statistics object with factory data.
+        Create one installation statistics object with factory data and drop the charts cached without it.
         """
+        cache.clear()
         last_calendar_day = datetime.now() - timedelta(days=1)
         mock_data_created_datetime = pytz.utc.localize(last_calendar_day)
 